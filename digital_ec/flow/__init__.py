@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""This package contains drivers that run the layout generators over many specifications."""
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a process-pool driver that generates many StdCellWrapper specifications.
+
+Each worker process builds the BAG project and all routing grids once in its initializer, then
+generates the wrapped cells assigned to it.  The finished masters are sent back to the parent
+process, which merges them into one ``batch_layout`` call, or one GDS file, per target library.
+Every library is written with its master dependency graph; see :func:`write_library`.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Sequence, Union, Optional
+
+import os
+import glob
+import importlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from bag.layout import RoutingGrid, TemplateDB
+
+from .deps import DependencyGraph, get_deps_fname, get_lib_deps_fname
+from ..layout.cache import dump_masters, load_masters
+from ..layout.gds import write_masters_gds
+from ..layout.lef import write_lef
+from ..layout.params import freeze
+from ..layout.stdcells.core import StdCellWrapper
+
+if TYPE_CHECKING:
+    from bag.core import BagProject
+    from bag.layout.core import TechInfo
+
+SpecList = List[Tuple[str, Dict[str, Any]]]
+
+# per-process worker state, created by _init_worker().
+_worker_state = None  # type: Optional[Dict[str, Any]]
+
+
+def make_grid(tech_info, grid_specs):
+    # type: (TechInfo, Dict[str, Any]) -> RoutingGrid
+    """Creates a routing grid from the given routing grid specification dictionary."""
+    return RoutingGrid(tech_info, grid_specs['layers'], grid_specs['spaces'],
+                       grid_specs['widths'], grid_specs['bot_dir'])
+
+
+def make_tdb(grid, target_lib, use_cybagoa=True):
+    # type: (RoutingGrid, str, bool) -> TemplateDB
+    """Creates a template database from the given routing grid."""
+    return TemplateDB('template_libs.def', grid, target_lib, use_cybagoa=use_cybagoa)
+
+
+def write_library(prj, temp_db, master_list, name_list, gds_fname=None, lay_map=None,
+                  via_map=None):
+    # type: (...) -> Optional[str]
+    """Writes the given masters to a library, together with their master dependency graph.
+
+    The layouts are created in OpenAccess with ``batch_layout``, or written to a GDS file.  The
+    dependency graph of a GDS file is written next to it, with the extension replaced by
+    ``.deps.json``.  The dependency graph of an OpenAccess library is the file
+    ``<lib_name>.deps.json`` in the default library path of the project, and is updated with
+    the given masters.  See :class:`~digital_ec.flow.deps.DependencyGraph`.
+
+    Parameters
+    ----------
+    prj : BagProject
+        the BAG project instance.
+    temp_db : TemplateDB
+        the template database of the masters.
+    master_list : Sequence[TemplateBase]
+        the top masters.
+    name_list : Sequence[str]
+        the top cell names.
+    gds_fname : Optional[str]
+        if given, write the layouts to this GDS file instead of creating them in OpenAccess.
+    lay_map : Optional[Dict[Tuple[str, str], Tuple[int, int]]]
+        the GDS layer map.  Defaults to the layer map of the technology.
+    via_map : Optional[Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]]
+        the GDS via map.  Defaults to the via map of the technology.
+
+    Returns
+    -------
+    deps_fname : Optional[str]
+        the dependency graph file name, or None if the project does not write OpenAccess
+        libraries to disk.
+    """
+    lib_name = temp_db.lib_name
+    if gds_fname is None:
+        temp_db.batch_layout(prj, master_list, name_list)
+        deps_fname = get_lib_deps_fname(prj, lib_name)
+        if deps_fname is None:
+            return None
+        if os.path.isfile(deps_fname):
+            graph = DependencyGraph.load(deps_fname)
+        else:
+            graph = DependencyGraph(lib_name)
+    else:
+        dir_name = os.path.dirname(gds_fname)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        write_masters_gds(temp_db, master_list, gds_fname, name_list=name_list, lay_map=lay_map,
+                          via_map=via_map)
+        deps_fname = get_deps_fname(gds_fname)
+        graph = DependencyGraph(lib_name)
+
+    graph.add_masters(temp_db, master_list, name_list=name_list)
+    graph.write(deps_fname)
+    return deps_fname
+
+
+def get_spec_generator(specs, module=None, cls_name=None):
+    # type: (Dict[str, Any], Optional[str], Optional[str]) -> Tuple[Any, Dict[str, Any]]
+    """Returns the generator class and the normalized parameters of a cell specification.
+
+    Parameters
+    ----------
+    specs : Dict[str, Any]
+        the cell specification dictionary.
+    module : Optional[str]
+        the generator module name.
+    cls_name : Optional[str]
+        the generator class name.  If module or cls_name is not given, the generator is a
+        StdCellWrapper.  Its parameters are the specification parameters, as in
+        :func:`generate_batch`, or, if the specification has module and class entries, wrap
+        the given standard cell, as in ``StdCellWrapper.generate_cells``.
+
+    Returns
+    -------
+    temp_cls : Any
+        the generator class.
+    params : Dict[str, Any]
+        the generator parameters.
+    """
+    params = specs['params']
+    if module is None or cls_name is None:
+        temp_cls = StdCellWrapper
+        if 'module' in specs and 'class' in specs:
+            params = {'module': specs['module'], 'class': specs['class'], 'params': params}
+    else:
+        temp_cls = getattr(importlib.import_module(module), cls_name)
+    if hasattr(temp_cls, 'normalize_params'):
+        params = temp_cls.normalize_params(params)
+    return temp_cls, params
+
+
+class TemplateDBTable(object):
+    """Template databases shared by all cells with the same routing grid and library.
+
+    Routing grids are created once per grid specification.
+
+    Parameters
+    ----------
+    tech_info : TechInfo
+        the technology information object.
+    use_cybagoa : bool
+        True to use cybagoa to write layouts.
+    """
+
+    def __init__(self, tech_info, use_cybagoa=True):
+        # type: (TechInfo, bool) -> None
+        self._tech_info = tech_info
+        self._use_cybagoa = use_cybagoa
+        self._grid_table = {}  # type: Dict[Any, RoutingGrid]
+        self._tdb_table = {}  # type: Dict[Any, TemplateDB]
+
+    @property
+    def num_grids(self):
+        # type: () -> int
+        return len(self._grid_table)
+
+    @property
+    def num_tdbs(self):
+        # type: () -> int
+        return len(self._tdb_table)
+
+    def get_tdb(self, grid_specs, lib_name):
+        # type: (Dict[str, Any], str) -> TemplateDB
+        """Returns the template database of the given routing grid and library."""
+        grid_id = _get_grid_id(grid_specs)
+        tdb_key = (grid_id, lib_name)
+        temp_db = self._tdb_table.get(tdb_key, None)
+        if temp_db is None:
+            grid = self._grid_table.get(grid_id, None)
+            if grid is None:
+                self._grid_table[grid_id] = grid = make_grid(self._tech_info, grid_specs)
+            self._tdb_table[tdb_key] = temp_db = make_tdb(grid, lib_name,
+                                                          use_cybagoa=self._use_cybagoa)
+        return temp_db
+
+    def clear(self):
+        # type: () -> None
+        """Drops all template databases.  Routing grids are kept."""
+        self._tdb_table.clear()
+
+
+def load_spec_files(spec_paths):
+    # type: (Union[str, Sequence[str]]) -> SpecList
+    """Loads StdCellWrapper specification files.
+
+    Parameters
+    ----------
+    spec_paths : Union[str, Sequence[str]]
+        a directory containing YAML specification files, or a list of specification files.
+
+    Returns
+    -------
+    spec_list : List[Tuple[str, Dict[str, Any]]]
+        a list of (file name, specification dictionary) tuples.
+    """
+    if isinstance(spec_paths, str):
+        if os.path.isdir(spec_paths):
+            spec_paths = sorted(glob.glob(os.path.join(spec_paths, '*.yaml')))
+        else:
+            spec_paths = [spec_paths]
+
+    spec_list = []
+    for fname in spec_paths:
+        with open(fname, 'r') as f:
+            spec_list.append((fname, yaml.safe_load(f)))
+    return spec_list
+
+
+def _get_grid_id(grid_specs):
+    # type: (Dict[str, Any]) -> Any
+    return freeze(grid_specs)
+
+
+def _init_worker(grid_specs_list, use_cybagoa):
+    # type: (List[Dict[str, Any]], bool) -> None
+    """Initializes a worker process by creating the BAG project and all routing grids."""
+    from bag.core import BagProject
+
+    global _worker_state
+    prj = BagProject()
+    grid_table = {_get_grid_id(grid_specs): make_grid(prj.tech_info, grid_specs)
+                  for grid_specs in grid_specs_list}
+    _worker_state = dict(
+        prj=prj,
+        grid_table=grid_table,
+        tdb_table={},
+        use_cybagoa=use_cybagoa,
+    )
+
+
+def get_worker_tdb(grid_specs, lib_name):
+    # type: (Dict[str, Any], str) -> TemplateDB
+    """Returns the template database of the current worker process.
+
+    Template databases are shared by all jobs of a worker with the same routing grid and library,
+    so leaf masters are only generated once per worker.
+    """
+    grid_id = _get_grid_id(grid_specs)
+    tdb_table = _worker_state['tdb_table']
+    tdb_key = (grid_id, lib_name)
+    temp_db = tdb_table.get(tdb_key, None)
+    if temp_db is None:
+        grid = _worker_state['grid_table'][grid_id]
+        tdb_table[tdb_key] = temp_db = make_tdb(grid, lib_name,
+                                                use_cybagoa=_worker_state['use_cybagoa'])
+    return temp_db
+
+
+def _generate_spec(specs):
+    # type: (Dict[str, Any]) -> Tuple[bytes, Any]
+    """Generates one wrapped cell in a worker process and returns the serialized master."""
+    temp_db = get_worker_tdb(specs['routing_grid'], specs['impl_lib'])
+    params = StdCellWrapper.normalize_params(specs['params'])
+    master = temp_db.new_template(params=params, temp_cls=StdCellWrapper)
+    return dump_masters(temp_db, [master]), master.sch_params
+
+
+def generate_batch(prj, spec_list, num_workers=None, use_cybagoa=True, debug=False,
+                   gds_dir=None, lef_dir=None, lay_map=None, via_map=None):
+    # type: (...) -> List[Dict[str, Any]]
+    """Generates the given StdCellWrapper specifications in parallel.
+
+    Each specification must contain the entries ``impl_lib``, ``impl_cell``, ``routing_grid``,
+    and ``params``, as in ``specs_test_sample/stdcell_wrapper.yaml``.  All cells of the same
+    library must use the same routing grid.
+
+    Parameters
+    ----------
+    prj : BagProject
+        the BAG project instance.
+    spec_list : List[Tuple[str, Dict[str, Any]]]
+        a list of (name, specification dictionary) tuples, as returned by
+        :func:`load_spec_files`.
+    num_workers : Optional[int]
+        number of worker processes.  Defaults to the number of CPUs.
+    use_cybagoa : bool
+        True to use cybagoa to write layouts.
+    debug : bool
+        True to print debug messages.
+    gds_dir : Optional[str]
+        if given, write each library to the GDS file ``<gds_dir>/<lib_name>.gds`` instead of
+        creating the layouts in OpenAccess.  The layer map of the technology is used.  The
+        master dependency graph is written next to each library; see :func:`write_library`.
+    lef_dir : Optional[str]
+        if given, also write the LEF abstracts of each library to ``<lef_dir>/<lib_name>.lef``.
+    lay_map : Optional[Dict[Tuple[str, str], Tuple[int, int]]]
+        the GDS layer map.  Defaults to the layer map of the technology.
+    via_map : Optional[Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]]
+        the GDS via map.  Defaults to the via map of the technology.
+
+    Returns
+    -------
+    result_list : List[Dict[str, Any]]
+        the generation results, in the same order as spec_list.  Each entry contains the
+        library name, the cell name, and the schematic parameters of the wrapped cell.
+    """
+    # group specifications by library, keeping the original order.
+    lib_table = OrderedDict()  # type: Dict[str, Tuple[Dict[str, Any], List[str]]]
+    for name, specs in spec_list:
+        lib_name = specs['impl_lib']
+        cell_name = specs['impl_cell']
+        grid_specs = specs['routing_grid']
+        if lib_name in lib_table:
+            lib_grid_specs, cell_list = lib_table[lib_name]
+            if _get_grid_id(grid_specs) != _get_grid_id(lib_grid_specs):
+                raise ValueError('%s: all cells in library %s must use the same '
+                                 'routing grid.' % (name, lib_name))
+            if cell_name in cell_list:
+                raise ValueError('%s: duplicate cell %s in library %s' % (name, cell_name,
+                                                                        lib_name))
+            cell_list.append(cell_name)
+        else:
+            lib_table[lib_name] = (grid_specs, [cell_name])
+
+    grid_specs_list = list(OrderedDict((_get_grid_id(grid_specs), grid_specs)
+                                       for grid_specs, _ in lib_table.values()).values())
+    grid_table = {_get_grid_id(grid_specs): make_grid(prj.tech_info, grid_specs)
+                  for grid_specs in grid_specs_list}
+    tdb_table = {lib_name: make_tdb(grid_table[_get_grid_id(grid_specs)], lib_name,
+                                    use_cybagoa=use_cybagoa)
+                 for lib_name, (grid_specs, _) in lib_table.items()}
+
+    job_list = [specs for _, specs in spec_list]
+    if num_workers == 1:
+        # generate directly in the template databases of this process.
+        out_list = []
+        for specs in job_list:
+            params = StdCellWrapper.normalize_params(specs['params'])
+            master = tdb_table[specs['impl_lib']].new_template(params=params,
+                                                              temp_cls=StdCellWrapper)
+            out_list.append((master, master.sch_params))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(grid_specs_list, use_cybagoa)) as executor:
+            out_list = list(executor.map(_generate_spec, job_list))
+
+    # merge results in specification order, so cell names are deterministic.
+    lib_masters = OrderedDict((lib_name, ([], [])) for lib_name in lib_table)
+    result_list = []
+    for (name, specs), (data, sch_params) in zip(spec_list, out_list):
+        lib_name = specs['impl_lib']
+        if num_workers == 1:
+            master = data
+        else:
+            master = load_masters(tdb_table[lib_name], data)[0]
+        master_list, name_list = lib_masters[lib_name]
+        master_list.append(master)
+        name_list.append(specs['impl_cell'])
+        result_list.append(dict(lib_name=lib_name, cell_name=specs['impl_cell'],
+                                sch_params=sch_params))
+
+    for lib_name, (master_list, name_list) in lib_masters.items():
+        if gds_dir is None:
+            gds_fname = None
+            if debug:
+                print('creating %d layouts in library %s' % (len(master_list), lib_name))
+        else:
+            gds_fname = os.path.join(gds_dir, lib_name + '.gds')
+            if debug:
+                print('writing %d layouts to %s' % (len(master_list), gds_fname))
+        write_library(prj, tdb_table[lib_name], master_list, name_list, gds_fname=gds_fname,
+                      lay_map=lay_map, via_map=via_map)
+        if lef_dir is not None:
+            write_lef(master_list, os.path.join(lef_dir, lib_name + '.lef'), name_list=name_list)
+
+    return result_list
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the generator benchmark suite.
+
+Generators are run on the headless BAG stand-in (see :mod:`digital_ec.headless`), so the suite
+runs without a BAG installation.  A benchmark suite is a YAML file with the routing grid, the
+shared laygo configuration and track dictionaries, and a list of cases; see
+``specs_test_sample/benchmark.yaml``.  Each case is generated once for every point of the
+cartesian product of its sweep values.
+
+For each run, the wall time, the peak traced memory, the number of masters created and the
+number of routing calls are recorded.  Every run uses a new template database, while the
+process-wide row layout and track table caches stay warm, as in a batch generation run.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Sequence, Iterable, Optional
+
+import os
+import csv
+import copy
+import json
+import time
+import platform
+import datetime
+import importlib
+import itertools
+import statistics
+import tracemalloc
+
+import yaml
+
+from ..layout.params import set_param
+from ..layout.trace import get_tracer, set_tracer, trace_span
+
+if TYPE_CHECKING:
+    from ..headless import RoutingGrid
+    from ..layout.trace import Tracer
+
+RunInfo = Tuple[str, Any, Dict[str, Any], Dict[str, Any]]
+
+# TemplateDB.stats entries that count routing calls.
+routing_stats = ('add_wires', 'connect_to_tracks', 'connect_wires', 'connect_to_track_wires',
+                 'extend_wires')
+
+# columns of the CSV result file.
+csv_columns = ('case', 'class', 'sweep', 'wall_time', 'wall_time_median', 'peak_mem_kb',
+               'num_masters', 'num_routing_calls', 'num_instances', 'num_pins')
+
+
+def load_suite(fname):
+    # type: (str) -> Dict[str, Any]
+    """Loads a benchmark suite specification file."""
+    with open(fname, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def _add_common_params(params, temp_cls, common):
+    # type: (Dict[str, Any], Any, Dict[str, Any]) -> None
+    """Adds the shared suite parameters accepted by the given generator.
+
+    The parameters of wrapped generators, given by the module, class and params entries, are
+    updated as well.
+    """
+    params_info = temp_cls.get_params_info()
+    for key, val in common.items():
+        if key in params_info and key not in params:
+            params[key] = val
+    if 'module' in params and 'class' in params and isinstance(params.get('params'), dict):
+        inner_cls = getattr(importlib.import_module(params['module']), params['class'])
+        _add_common_params(params['params'], inner_cls, common)
+
+
+def iter_runs(suite, case_names=None):
+    # type: (Dict[str, Any], Optional[Sequence[str]]) -> Iterable[RunInfo]
+    """Iterates over all runs of the given benchmark suite.
+
+    Parameters
+    ----------
+    suite : Dict[str, Any]
+        the benchmark suite specification.
+    case_names : Optional[Sequence[str]]
+        if given, only run cases with these names.
+
+    Yields
+    ------
+    case_name : str
+        the case name.
+    temp_cls : Any
+        the generator class.
+    sweep_point : Dict[str, Any]
+        the swept parameter values of this run.
+    params : Dict[str, Any]
+        the generator parameters.
+    """
+    common = dict(
+        config=suite['config'],
+        tr_widths=suite['tr_widths'],
+        tr_spaces=suite['tr_spaces'],
+    )
+    for case in suite['cases']:
+        case_name = case['name']
+        if case_names is not None and case_name not in case_names:
+            continue
+        temp_cls = getattr(importlib.import_module(case['module']), case['class'])
+        sweep = case.get('sweep', {})
+        sweep_keys = list(sweep.keys())
+        for values in itertools.product(*(sweep[key] for key in sweep_keys)):
+            params = copy.deepcopy(case.get('params', {}))
+            sweep_point = dict(zip(sweep_keys, values))
+            for key, val in sweep_point.items():
+                set_param(params, key, val)
+            _add_common_params(params, temp_cls, common)
+            yield case_name, temp_cls, sweep_point, params
+
+
+def run_once(grid, temp_cls, params, trace_mem=False):
+    # type: (RoutingGrid, Any, Dict[str, Any], bool) -> Dict[str, Any]
+    """Generates one master in a new template database, and returns the run statistics.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    temp_cls : Any
+        the generator class.
+    params : Dict[str, Any]
+        the generator parameters.
+    trace_mem : bool
+        True to record the peak traced memory.  This slows down generation, so the wall time
+        of a traced run should not be reported.
+
+    Returns
+    -------
+    info : Dict[str, Any]
+        the run statistics.
+    """
+    from ..headless import TemplateDB
+
+    temp_db = TemplateDB('', grid, 'BENCH')
+    if trace_mem:
+        tracemalloc.start()
+    try:
+        t_start = time.perf_counter()
+        with trace_span(temp_cls.__name__, cat='master') as span:
+            master = temp_db.new_template(params=params, temp_cls=temp_cls)
+            span.args.update(basename=master.get_layout_basename(), cell_name=master.cell_name)
+        wall_time = time.perf_counter() - t_start
+        peak_mem = tracemalloc.get_traced_memory()[1] if trace_mem else None
+    finally:
+        if trace_mem:
+            tracemalloc.stop()
+
+    stats = temp_db.stats
+    return dict(
+        wall_time=wall_time,
+        peak_mem_kb=None if peak_mem is None else peak_mem / 1024,
+        num_masters=stats['masters'],
+        num_routing_calls=sum(stats[key] for key in routing_stats),
+        num_instances=stats['add_instance'],
+        num_pins=stats['add_pin'],
+        stats=dict(stats),
+    )
+
+
+def run_suite(suite, case_names=None, repeat=3, trace_mem=True, log_fun=None, tracer=None):
+    # type: (...) -> List[Dict[str, Any]]
+    """Runs the given benchmark suite.
+
+    Each run is generated once with memory tracing and master tracing, if enabled, then repeat
+    more times to measure the wall time.
+
+    Parameters
+    ----------
+    suite : Dict[str, Any]
+        the benchmark suite specification.
+    case_names : Optional[Sequence[str]]
+        if given, only run cases with these names.
+    repeat : int
+        number of timed runs.  The minimum and median wall times are reported.
+    trace_mem : bool
+        True to record peak memory.
+    log_fun : Any
+        if given, called with a message after each run.
+    tracer : Optional[Tracer]
+        if given, record the first generation of every run with this tracer.
+
+    Returns
+    -------
+    results : List[Dict[str, Any]]
+        one result dictionary per run.
+    """
+    from ..headless import BagProject, RoutingGrid
+
+    prj = BagProject()
+    grid_specs = suite['routing_grid']
+    grid = RoutingGrid(prj.tech_info, grid_specs['layers'], grid_specs['spaces'],
+                       grid_specs['widths'], grid_specs['bot_dir'])
+
+    results = []
+    old_tracer = get_tracer()
+    for case_name, temp_cls, sweep_point, params in iter_runs(suite, case_names=case_names):
+        set_tracer(tracer)
+        try:
+            with trace_span(case_name, cat='run', sweep=sweep_point):
+                info = run_once(grid, temp_cls, params, trace_mem=trace_mem)
+        finally:
+            set_tracer(old_tracer)
+        peak_mem_kb = info['peak_mem_kb']
+        time_list = [run_once(grid, temp_cls, params)['wall_time']
+                     for _ in range(max(1, repeat))]
+        info.update(
+            case=case_name,
+            wall_time=min(time_list),
+            wall_time_median=statistics.median(time_list),
+            wall_time_list=time_list,
+            peak_mem_kb=peak_mem_kb,
+        )
+        info['class'] = '%s.%s' % (temp_cls.__module__, temp_cls.__name__)
+        info['sweep'] = sweep_point
+        results.append(info)
+        if log_fun is not None:
+            log_fun('%s %s: %.4f s, %d masters, %d routing calls' %
+                    (case_name, sweep_point, info['wall_time'], info['num_masters'],
+                     info['num_routing_calls']))
+    return results
+
+
+def get_run_key(info):
+    # type: (Dict[str, Any]) -> str
+    """Returns a string identifying a run across result files."""
+    return '%s %s' % (info['case'], json.dumps(info['sweep'], sort_keys=True))
+
+
+def write_results(results, out_dir, basename='bench'):
+    # type: (List[Dict[str, Any]], str, str) -> Tuple[str, str]
+    """Writes benchmark results as JSON and CSV files.
+
+    The JSON file contains the full results and the host information; the CSV file contains
+    one row per run.
+
+    Returns
+    -------
+    json_fname : str
+        the JSON file name.
+    csv_fname : str
+        the CSV file name.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    json_fname = os.path.join(out_dir, basename + '.json')
+    csv_fname = os.path.join(out_dir, basename + '.csv')
+
+    content = dict(
+        created=datetime.datetime.now().isoformat(timespec='seconds'),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        results=results,
+    )
+    with open(json_fname, 'w') as f:
+        json.dump(content, f, indent=2, sort_keys=True)
+
+    with open(csv_fname, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(csv_columns)
+        for info in results:
+            row = dict(info)
+            row['sweep'] = json.dumps(info['sweep'], sort_keys=True)
+            writer.writerow([row[key] for key in csv_columns])
+
+    return json_fname, csv_fname
+
+
+def load_results(fname):
+    # type: (str) -> List[Dict[str, Any]]
+    """Loads results from a JSON result file."""
+    with open(fname, 'r') as f:
+        return json.load(f)['results']
+
+
+def compare_results(baseline, results, time_tol=0.2, keys=('num_masters', 'num_routing_calls')):
+    # type: (List[Dict[str, Any]], List[Dict[str, Any]], float, Sequence[str]) -> List[str]
+    """Compares benchmark results against a baseline.
+
+    Parameters
+    ----------
+    baseline : List[Dict[str, Any]]
+        the baseline results.
+    results : List[Dict[str, Any]]
+        the new results.
+    time_tol : float
+        relative wall time increase reported as a regression.
+    keys : Sequence[str]
+        result entries that are reported if they increase at all.
+
+    Returns
+    -------
+    msg_list : List[str]
+        one message per regression.
+    """
+    base_table = {get_run_key(info): info for info in baseline}
+    msg_list = []
+    for info in results:
+        run_key = get_run_key(info)
+        base = base_table.get(run_key, None)
+        if base is None:
+            continue
+        t_old, t_new = base['wall_time'], info['wall_time']
+        if t_old > 0 and t_new > t_old * (1 + time_tol):
+            msg_list.append('%s: wall_time %.4f -> %.4f (%+.1f%%)' %
+                            (run_key, t_old, t_new, 100 * (t_new / t_old - 1)))
+        for key in keys:
+            if info[key] > base[key]:
+                msg_list.append('%s: %s %d -> %d' % (run_key, key, base[key], info[key]))
+    return msg_list
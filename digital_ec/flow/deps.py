@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the master dependency graph of generated libraries.
+
+A :class:`DependencyGraph` records every master of a generated library, with its generator
+class, the modules of the generator class and all of its base classes, its parameters and
+the masters it instantiates.  The graph is saved as a JSON file next to the output library.
+The graph of a GDS file ``<name>.gds`` is written to ``<name>.deps.json``, and the graph of an
+OpenAccess library to ``<lib_name>.deps.json`` next to the library directory; see
+:func:`~digital_ec.flow.batch.write_library`.  The graph of an OpenAccess library is updated
+every time cells are written to the library.  It answers queries such as which top cells must be
+rebuilt if the code or some parameters of a generator change::
+
+    graph = DependencyGraph.load('MY_LIB.deps.json')
+    graph.get_affected_tops(cls_name='InverterTristate')
+    graph.get_affected_tops(module='digital_ec.layout.stdcells.core')
+    graph.get_affected_tops(cls_name='InverterTristate', params={'seg': 2})
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Set, Sequence, Optional, Iterable
+
+import os
+import json
+from collections.abc import Mapping
+
+if TYPE_CHECKING:
+    from bag.layout.template import TemplateBase, TemplateDB
+
+
+def _to_json_value(val):
+    # type: (Any) -> Any
+    """Converts a parameter value to a JSON value."""
+    if isinstance(val, Mapping):
+        return {str(k): _to_json_value(v) for k, v in val.items()}
+    if isinstance(val, (list, tuple)):
+        return [_to_json_value(v) for v in val]
+    if val is None or isinstance(val, (bool, int, float, str)):
+        return val
+    if hasattr(val, 'item'):
+        return val.item()
+    return str(val)
+
+
+def _get_class_path(temp_cls):
+    # type: (type) -> List[str]
+    """Returns the full names of the given class and all of its base classes."""
+    return ['%s.%s' % (cls.__module__, cls.__name__) for cls in temp_cls.__mro__
+            if cls is not object]
+
+
+def _match_params(params, query):
+    # type: (Dict[str, Any], Dict[str, Any]) -> bool
+    """Returns True if params has all values in query.  Dotted keys select nested parameters."""
+    for key, val in query.items():
+        cur = params
+        for name in key.split('.'):
+            if not isinstance(cur, dict) or name not in cur:
+                return False
+            cur = cur[name]
+        if cur != _to_json_value(val):
+            return False
+    return True
+
+
+def get_deps_fname(fname):
+    # type: (str) -> str
+    """Returns the dependency graph file name of the given output file."""
+    return os.path.splitext(fname)[0] + '.deps.json'
+
+
+def get_lib_deps_fname(prj, lib_name):
+    # type: (Any, str) -> Optional[str]
+    """Returns the dependency graph file name of the given OpenAccess library.
+
+    Parameters
+    ----------
+    prj : BagProject
+        the BAG project instance.
+    lib_name : str
+        the library name.
+
+    Returns
+    -------
+    fname : Optional[str]
+        the file ``<lib_name>.deps.json`` in the default library path of the project, or None
+        if the project does not write libraries to disk.
+    """
+    impl_db = getattr(prj, 'impl_db', None)
+    lib_path = getattr(impl_db, 'default_lib_path', None)
+    if not lib_path:
+        return None
+    return os.path.join(lib_path, lib_name + '.deps.json')
+
+
+class DependencyGraph(object):
+    """The master dependency graph of a generated library.
+
+    Masters are identified by their cell names in the template database.
+
+    Parameters
+    ----------
+    lib_name : str
+        the library name.
+    """
+
+    def __init__(self, lib_name=''):
+        # type: (str) -> None
+        self.lib_name = lib_name
+        # master cell name to the master information.
+        self.nodes = {}  # type: Dict[str, Dict[str, Any]]
+        # top cell name to the master cell name.
+        self.tops = {}  # type: Dict[str, str]
+        self._parents = None  # type: Optional[Dict[str, Set[str]]]
+
+    def add_masters(self, temp_db, master_list, name_list=None):
+        # type: (TemplateDB, Sequence[TemplateBase], Optional[Sequence[str]]) -> None
+        """Records the given top masters and all of their descendants.
+
+        Masters that are already in the graph under the same cell name are replaced, as cells
+        written to a library replace the cells with the same name.
+
+        Parameters
+        ----------
+        temp_db : TemplateDB
+            the template database of the masters.
+        master_list : Sequence[TemplateBase]
+            the top masters.
+        name_list : Optional[Sequence[str]]
+            the top cell names.  Defaults to the master cell names.
+        """
+        if name_list is None:
+            name_list = [master.cell_name for master in master_list]
+        stack = list(master_list)
+        for master, top_name in zip(master_list, name_list):
+            self.tops[top_name] = master.cell_name
+        visited = set()
+        while stack:
+            master = stack.pop()
+            cell_name = master.cell_name
+            if cell_name in visited:
+                continue
+            visited.add(cell_name)
+            children = []
+            for child_key in (master.children or ()):
+                child = temp_db.find_master(child_key)
+                if child is None:
+                    raise ValueError('Cannot find child master %s' % (child_key, ))
+                children.append(child)
+            temp_cls = type(master)
+            self.nodes[cell_name] = dict(
+                cls=_get_class_path(temp_cls)[0],
+                class_path=_get_class_path(temp_cls),
+                params=_to_json_value(master.params),
+                children=sorted(child.cell_name for child in children),
+            )
+            stack.extend(children)
+        self._parents = None
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        return dict(lib_name=self.lib_name, tops=self.tops, nodes=self.nodes)
+
+    def write(self, fname):
+        # type: (str) -> None
+        """Writes the graph as a JSON file."""
+        dir_name = os.path.dirname(fname)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        with open(fname, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, fname):
+        # type: (str) -> DependencyGraph
+        """Reads a graph from a JSON file."""
+        with open(fname, 'r') as f:
+            content = json.load(f)
+        graph = cls(content['lib_name'])
+        graph.tops = content['tops']
+        graph.nodes = content['nodes']
+        return graph
+
+    def get_parents(self, cell_name):
+        # type: (str) -> Set[str]
+        """Returns the masters that directly instantiate the given master."""
+        if self._parents is None:
+            self._parents = {name: set() for name in self.nodes}
+            for name, info in self.nodes.items():
+                for child in info['children']:
+                    self._parents[child].add(name)
+        return self._parents[cell_name]
+
+    def find_masters(self, cls_name='', module='', params=None):
+        # type: (str, str, Optional[Dict[str, Any]]) -> List[str]
+        """Returns the cell names of all masters matching the given query.
+
+        Parameters
+        ----------
+        cls_name : str
+            if given, only masters of this class or of its subclasses.  Either the class name
+            or the full name with the module.
+        module : str
+            if given, only masters whose class or one of its base classes is defined in this
+            module or package.
+        params : Optional[Dict[str, Any]]
+            if given, only masters with these parameter values.  Dotted keys select nested
+            parameters.
+
+        Returns
+        -------
+        cell_names : List[str]
+            the sorted cell names of all matching masters.
+        """
+        ans = []
+        for name, info in self.nodes.items():
+            class_path = info['class_path']
+            if cls_name and not any(path == cls_name or path.rsplit('.', 1)[1] == cls_name
+                                    for path in class_path):
+                continue
+            if module and not any(path.rsplit('.', 1)[0] == module or
+                                  path.startswith(module + '.') for path in class_path):
+                continue
+            if params and not _match_params(info['params'], params):
+                continue
+            ans.append(name)
+        return sorted(ans)
+
+    def get_dependents(self, cell_names):
+        # type: (Iterable[str]) -> Set[str]
+        """Returns the given masters and all masters instantiating them, directly or not."""
+        ans = set()
+        stack = list(cell_names)
+        while stack:
+            name = stack.pop()
+            if name not in ans:
+                ans.add(name)
+                stack.extend(self.get_parents(name))
+        return ans
+
+    def get_affected_tops(self, cls_name='', module='', params=None):
+        # type: (str, str, Optional[Dict[str, Any]]) -> List[str]
+        """Returns the top cells that must be rebuilt if the matching masters change.
+
+        See :meth:`find_masters` for the query arguments.
+
+        Returns
+        -------
+        top_names : List[str]
+            the sorted names of all affected top cells.
+        """
+        affected = self.get_dependents(self.find_masters(cls_name=cls_name, module=module,
+                                                         params=params))
+        return sorted(top_name for top_name, name in self.tops.items() if name in affected)
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a long-lived local layout generation server.
+
+The server holds one BAG project, and caches routing grids and template databases across
+requests, so generating a cell only pays for the masters that are not generated yet.
+Clients connect to a Unix socket and send one JSON request per line; every request gets one
+JSON response line.  Every connection is served by its own thread, so a client can keep its
+connection open without blocking other clients, but requests are processed one at a time.
+
+A request is a dictionary with a ``cmd`` entry:
+
+generate
+    generates one cell.  The specification is given by ``specs``, a dictionary, or by
+    ``spec_file``, a YAML file read by the server, with the entries ``impl_lib``,
+    ``impl_cell``, ``routing_grid`` and ``params``.  The generator class is given by the
+    ``module`` and ``class`` entries of the request.  If they are not given, the cell is a
+    :class:`~digital_ec.layout.stdcells.core.StdCellWrapper`.  Its parameters are the
+    specification parameters, as in :func:`~digital_ec.flow.batch.generate_batch`, or, if
+    the specification has ``module`` and ``class`` entries, wrap the given standard cell, as
+    in ``StdCellWrapper.generate_cells``.  Set ``gen_lay`` to False to skip writing the layout,
+    or give ``gds_fname`` and ``lef_fname`` to write GDS and LEF files instead of an
+    OpenAccess layout.  The master dependency graph is written next to the GDS file or the
+    OpenAccess library, see :func:`~digital_ec.flow.batch.write_library`, and its file name is
+    returned as ``deps_fname``.
+ping
+    returns the server process ID.
+stats
+    returns the number of requests, cached routing grids and cached template databases.
+reset
+    drops all cached template databases.
+shutdown
+    stops the server.
+
+A successful response is ``{"ok": true, "result": ...}``; a failed request returns
+``{"ok": false, "error": ..., "traceback": ...}`` and does not stop the server.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, Optional
+
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+import traceback
+import socketserver
+
+import yaml
+
+from .batch import get_spec_generator, write_library, TemplateDBTable
+from ..layout.gds import LayerMap, ViaMap
+from ..layout.lef import write_lef
+
+if TYPE_CHECKING:
+    from bag.core import BagProject
+
+
+def get_default_socket_path():
+    # type: () -> str
+    """Returns the default server socket path of the current user."""
+    return os.path.join(tempfile.gettempdir(), 'digital_ec_gen_%d.sock' % os.getuid())
+
+
+def _to_json(obj):
+    # type: (Any) -> Any
+    """Converts values json cannot serialize, such as numpy scalars."""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    return str(obj)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles the requests of one client connection, one JSON line at a time."""
+
+    def handle(self):
+        server = self.server  # type: GenerationServer
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line.decode('utf-8'))
+                result = server.process(request)
+                response = dict(ok=True, result=result)
+            except Exception as ex:
+                response = dict(ok=False, error='%s: %s' % (type(ex).__name__, ex),
+                                traceback=traceback.format_exc())
+            self.wfile.write(json.dumps(response, default=_to_json).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if server.stopping:
+                # stop serve_forever() after the response is sent.
+                server.shutdown()
+                break
+
+
+class GenerationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A layout generation server that keeps the BAG project and template databases warm.
+
+    Parameters
+    ----------
+    prj : BagProject
+        the BAG project instance.
+    socket_path : str
+        the Unix socket path.  A stale socket file is replaced.
+    use_cybagoa : bool
+        True to use cybagoa to write layouts.
+    log_fun : Any
+        if given, called with a message after each request.
+    lay_map : Optional[Dict[Tuple[str, str], Tuple[int, int]]]
+        the GDS layer map.  Defaults to the layer map of the technology.
+    via_map : Optional[Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]]
+        the GDS via map.  Defaults to the via map of the technology.
+
+    Raises
+    ------
+    ValueError
+        if another server is already listening on the socket path.
+    """
+
+    # connection threads do not keep the server process alive.
+    daemon_threads = True
+
+    def __init__(self, prj, socket_path='', use_cybagoa=True, log_fun=None, lay_map=None,
+                 via_map=None):
+        # type: (BagProject, str, bool, Any, Optional[LayerMap], Optional[ViaMap]) -> None
+        socket_path = socket_path or get_default_socket_path()
+        if os.path.exists(socket_path):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(socket_path)
+            except OSError:
+                os.unlink(socket_path)
+            else:
+                raise ValueError('A server is already listening on %s' % socket_path)
+            finally:
+                sock.close()
+
+        socketserver.UnixStreamServer.__init__(self, socket_path, _RequestHandler)
+        self.prj = prj
+        self.socket_path = socket_path
+        self.stopping = False
+        self.tdb_table = TemplateDBTable(prj.tech_info, use_cybagoa=use_cybagoa)
+        self._log_fun = log_fun
+        self._lay_map = lay_map
+        self._via_map = via_map
+        self._num_requests = 0
+        self._lock = threading.Lock()
+
+    def run(self):
+        # type: () -> None
+        """Handles requests until a shutdown request, then removes the socket file."""
+        try:
+            self.serve_forever(poll_interval=0.5)
+        finally:
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def process(self, request):
+        # type: (Dict[str, Any]) -> Any
+        """Processes one request, and returns the result.
+
+        Requests of all connections are processed one at a time.
+        """
+        with self._lock:
+            return self._process(request)
+
+    def _process(self, request):
+        # type: (Dict[str, Any]) -> Any
+        cmd = request.get('cmd', 'generate')
+        self._num_requests += 1
+        t_start = time.perf_counter()
+        if cmd == 'generate':
+            result = self.generate(request)
+        elif cmd == 'ping':
+            result = dict(pid=os.getpid())
+        elif cmd == 'stats':
+            result = dict(num_requests=self._num_requests, num_grids=self.tdb_table.num_grids,
+                          num_tdbs=self.tdb_table.num_tdbs)
+        elif cmd == 'reset':
+            self.tdb_table.clear()
+            result = None
+        elif cmd == 'shutdown':
+            self.stopping = True
+            result = None
+        else:
+            raise ValueError('Unknown command: %s' % cmd)
+
+        if self._log_fun is not None:
+            self._log_fun('%s: %.3f s' % (cmd, time.perf_counter() - t_start))
+        return result
+
+    def generate(self, request):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        """Generates the cell of a generate request.
+
+        Returns
+        -------
+        result : Dict[str, Any]
+            the library name, the cell name, the master cell name, the schematic parameters,
+            the generation time of the cell and the dependency graph file name.
+        """
+        if 'spec_file' in request:
+            with open(request['spec_file'], 'r') as f:
+                specs = yaml.safe_load(f)
+        else:
+            specs = request['specs']
+
+        temp_cls, params = get_spec_generator(specs, module=request.get('module', None),
+                                              cls_name=request.get('class', None))
+        lib_name = specs['impl_lib']
+        cell_name = specs['impl_cell']
+        t_start = time.perf_counter()
+        temp_db = self.tdb_table.get_tdb(specs['routing_grid'], lib_name)
+        master = temp_db.new_template(params=params, temp_cls=temp_cls)
+        gen_time = time.perf_counter() - t_start
+
+        gds_fname = request.get('gds_fname', None)
+        lef_fname = request.get('lef_fname', None)
+        deps_fname = None
+        if gds_fname is not None:
+            deps_fname = write_library(self.prj, temp_db, [master], [cell_name],
+                                       gds_fname=gds_fname, lay_map=self._lay_map,
+                                       via_map=self._via_map)
+        if lef_fname is not None:
+            write_lef([master], lef_fname, name_list=[cell_name])
+        if request.get('gen_lay', True) and gds_fname is None and lef_fname is None:
+            deps_fname = write_library(self.prj, temp_db, [master], [cell_name])
+
+        return dict(
+            lib_name=lib_name,
+            cell_name=cell_name,
+            master_name=master.cell_name,
+            sch_params=getattr(master, 'sch_params', None),
+            gen_time=gen_time,
+            total_time=time.perf_counter() - t_start,
+            deps_fname=deps_fname,
+        )
+
+
+class GenerationClient(object):
+    """A client of a running generation server.
+
+    Parameters
+    ----------
+    socket_path : str
+        the server socket path.
+    timeout : Optional[float]
+        the socket timeout, in seconds.  Defaults to no timeout.
+    """
+
+    def __init__(self, socket_path='', timeout=None):
+        # type: (str, Optional[float]) -> None
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(socket_path or get_default_socket_path())
+        self._file = self._sock.makefile('rwb')
+
+    def close(self):
+        # type: () -> None
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def request(self, request):
+        # type: (Dict[str, Any]) -> Any
+        """Sends a request, and returns the result.
+
+        Raises
+        ------
+        ValueError
+            if the request failed.  The message contains the server traceback.
+        """
+        self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ValueError('The server closed the connection.')
+        response = json.loads(line.decode('utf-8'))
+        if not response['ok']:
+            raise ValueError('%s\n\nServer traceback:\n%s' % (response['error'],
+                                                               response['traceback']))
+        return response['result']
+
+    def generate(self, specs=None, spec_file=None, module=None, cls_name=None, **kwargs):
+        # type: (...) -> Dict[str, Any]
+        """Generates one cell.  See the module documentation for the arguments."""
+        request = dict(cmd='generate', **kwargs)
+        # the server may run in another directory.
+        for key in ('gds_fname', 'lef_fname'):
+            if request.get(key, None) is not None:
+                request[key] = os.path.abspath(request[key])
+        if spec_file is not None:
+            request['spec_file'] = os.path.abspath(spec_file)
+        else:
+            request['specs'] = specs
+        if module is not None:
+            request['module'] = module
+        if cls_name is not None:
+            request['class'] = cls_name
+        return self.request(request)
+
+    def ping(self):
+        # type: () -> Dict[str, Any]
+        return self.request(dict(cmd='ping'))
+
+    def stats(self):
+        # type: () -> Dict[str, Any]
+        return self.request(dict(cmd='stats'))
+
+    def reset(self):
+        # type: () -> None
+        self.request(dict(cmd='reset'))
+
+    def shutdown(self):
+        # type: () -> None
+        self.request(dict(cmd='shutdown'))
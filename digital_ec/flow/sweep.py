@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a parameter sweep engine for cell specifications.
+
+A sweep specification is a cell specification, as accepted by
+:func:`~digital_ec.flow.batch.generate_batch`, with sweep entries; see
+``specs_test_sample/stdcell_sweep.yaml``.  The keys of ``sweep`` and ``zip_sweep`` are dotted
+parameter keys relative to the specification parameters.  As in benchmark suites, every entry
+of ``sweep`` is an axis of a cartesian product.  Every entry of ``zip_sweep`` is a group of
+keys whose values are zipped into a single axis, so all keys of a group must have the same
+number of values.  Every sweep point is named by ``name_format``, which may use the
+``impl_cell`` and ``index`` fields, and defaults to ``{impl_cell}_{index}``.
+
+All points are generated in one template database, so masters shared between points, such as
+leaf cells and substrate taps, are only generated once.  With several worker processes, the
+points are split into contiguous chunks, each generated in the template database of a worker,
+and the masters are merged in the parent process.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Sequence, Optional
+
+import os
+import csv
+import copy
+import json
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from .batch import (get_spec_generator, make_grid, make_tdb, get_worker_tdb, write_library,
+                    _init_worker)
+from .watch import iter_master_keys
+from ..layout.cache import dump_masters, load_masters
+from ..layout.params import set_param
+
+if TYPE_CHECKING:
+    from bag.core import BagProject
+    from bag.layout.template import TemplateDB
+
+# columns of the CSV result table, besides the swept parameters.
+table_columns = ('index', 'cell_name', 'master_name', 'num_cols', 'num_rows', 'num_new_masters',
+                 'gen_time', 'sch_params')
+
+# keys of the sweep specification that are not part of the cell specification.
+_sweep_keys = ('sweep', 'zip_sweep', 'name_format')
+
+# keys of all masters generated by the current worker process.
+_worker_keys = set()  # type: set
+
+
+def load_sweep_file(fname):
+    # type: (str) -> Dict[str, Any]
+    """Loads a sweep specification file."""
+    with open(fname, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def get_sweep_axes(sweep_specs):
+    # type: (Dict[str, Any]) -> List[Tuple[List[str], List[Tuple[Any, ...]]]]
+    """Returns the axes of the given sweep specification.
+
+    Returns
+    -------
+    axis_list : List[Tuple[List[str], List[Tuple[Any, ...]]]]
+        a list of (parameter keys, value tuples) of each axis.
+    """
+    axis_list = [([key], [(val, ) for val in val_list])
+                 for key, val_list in sweep_specs.get('sweep', {}).items()]
+    for group in sweep_specs.get('zip_sweep', []):
+        key_list = list(group.keys())
+        num_values = {len(group[key]) for key in key_list}
+        if len(num_values) > 1:
+            raise ValueError('Zipped sweep keys %s have different numbers of values.' %
+                             ', '.join(key_list))
+        axis_list.append((key_list, list(zip(*(group[key] for key in key_list)))))
+    return axis_list
+
+
+def expand_sweep(sweep_specs):
+    # type: (Dict[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    """Expands a sweep specification into cell specifications.
+
+    Parameters
+    ----------
+    sweep_specs : Dict[str, Any]
+        the sweep specification dictionary.
+
+    Returns
+    -------
+    point_list : List[Tuple[Dict[str, Any], Dict[str, Any]]]
+        a list of (swept parameter values, cell specification) tuples, one per sweep point.
+    """
+    base_specs = {key: val for key, val in sweep_specs.items() if key not in _sweep_keys}
+    name_format = sweep_specs.get('name_format', '{impl_cell}_{index}')
+    axis_list = get_sweep_axes(sweep_specs)
+
+    point_list = []
+    cell_names = set()
+    for index, axis_values in enumerate(itertools.product(*(values for _, values
+                                                             in axis_list))):
+        specs = copy.deepcopy(base_specs)
+        sweep_point = {}
+        for (key_list, _), values in zip(axis_list, axis_values):
+            for key, val in zip(key_list, values):
+                sweep_point[key] = val
+                set_param(specs['params'], key, copy.deepcopy(val))
+        specs['impl_cell'] = name_format.format(impl_cell=base_specs['impl_cell'], index=index)
+        if specs['impl_cell'] in cell_names:
+            raise ValueError('Duplicate sweep cell name %s' % specs['impl_cell'])
+        cell_names.add(specs['impl_cell'])
+        point_list.append((sweep_point, specs))
+    return point_list
+
+
+def _generate_points(temp_db, specs_list, known_keys, module, cls_name):
+    # type: (TemplateDB, Sequence[Dict[str, Any]], set, Optional[str], Optional[str]) -> Any
+    """Generates the given cell specifications in a template database.
+
+    Returns
+    -------
+    master_list : List[TemplateBase]
+        the generated masters.
+    info_list : List[Dict[str, Any]]
+        the generation results.
+    """
+    master_list, info_list = [], []
+    for specs in specs_list:
+        t_start = time.perf_counter()
+        temp_cls, params = get_spec_generator(specs, module=module, cls_name=cls_name)
+        master = temp_db.new_template(params=params, temp_cls=temp_cls)
+        gen_time = time.perf_counter() - t_start
+        num_new = 0
+        for key in iter_master_keys(temp_db, master):
+            if key not in known_keys:
+                known_keys.add(key)
+                num_new += 1
+        num_cols, num_rows = getattr(master, 'digital_size', (None, None))
+        master_list.append(master)
+        info_list.append(dict(
+            cell_name=specs['impl_cell'],
+            num_cols=num_cols,
+            num_rows=num_rows,
+            num_new_masters=num_new,
+            gen_time=gen_time,
+            sch_params=getattr(master, 'sch_params', None),
+        ))
+    return master_list, info_list
+
+
+def _generate_chunk(job):
+    # type: (Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]) -> Tuple[bytes, List]
+    """Generates a chunk of sweep points in a worker process and returns the serialized masters."""
+    specs_list, module, cls_name = job
+    specs = specs_list[0]
+    temp_db = get_worker_tdb(specs['routing_grid'], specs['impl_lib'])
+    master_list, info_list = _generate_points(temp_db, specs_list, _worker_keys, module,
+                                              cls_name)
+    return dump_masters(temp_db, master_list), info_list
+
+
+def _compute_points(specs_list, module, cls_name):
+    # type: (Sequence[Dict[str, Any]], Optional[str], Optional[str]) -> List[Dict[str, Any]]
+    """Computes the schematic parameters and sizes of the given cell specifications.
+
+    No layout is drawn.  Sizes are only given for generators with a size model that does not
+    need the substrate tap width.
+    """
+    info_list = []
+    for specs in specs_list:
+        t_start = time.perf_counter()
+        temp_cls, params = get_spec_generator(specs, module=module, cls_name=cls_name)
+        sch_params = temp_cls.compute_sch_params(params)
+        try:
+            size_info = temp_cls.get_size_info(params)
+        except (AttributeError, NotImplementedError, ValueError):
+            size_info = {}
+        info_list.append(dict(
+            cell_name=specs['impl_cell'],
+            master_name=None,
+            num_cols=size_info.get('num_cols', None),
+            num_rows=size_info.get('num_rows', None),
+            num_new_masters=0,
+            gen_time=time.perf_counter() - t_start,
+            sch_params=sch_params,
+        ))
+    return info_list
+
+
+def run_sweep(prj, sweep_specs, module=None, cls_name=None, num_workers=1, use_cybagoa=True,
+              gen_lay=True, gds_dir=None, table_fname='', log_fun=None, sch_only=False,
+              lay_map=None, via_map=None):
+    # type: (...) -> List[Dict[str, Any]]
+    """Generates all points of a sweep specification.
+
+    Parameters
+    ----------
+    prj : BagProject
+        the BAG project instance.
+    sweep_specs : Dict[str, Any]
+        the sweep specification dictionary.
+    module : Optional[str]
+        the generator module name.
+    cls_name : Optional[str]
+        the generator class name.  See :func:`~digital_ec.flow.batch.get_spec_generator`.
+    num_workers : Optional[int]
+        number of worker processes.  Use None for the number of CPUs.
+    use_cybagoa : bool
+        True to use cybagoa to write layouts.
+    gen_lay : bool
+        True to create the layouts in OpenAccess.
+    gds_dir : Optional[str]
+        if given, write all points to the GDS file ``<gds_dir>/<impl_lib>.gds`` instead of
+        creating the layouts in OpenAccess.  The master dependency graph is written next to
+        the library; see :func:`~digital_ec.flow.batch.write_library`.
+    table_fname : str
+        if given, write the result table to this CSV file.
+    log_fun : Any
+        if given, called with a message after generating the sweep points.
+    sch_only : bool
+        True to only compute the schematic parameters and sizes with the generator models,
+        without drawing any layout.  See
+        :meth:`~digital_ec.layout.stdcells.core.StdTemplateMixin.compute_sch_params`.
+    lay_map : Optional[Dict[Tuple[str, str], Tuple[int, int]]]
+        the GDS layer map.  Defaults to the layer map of the technology.
+    via_map : Optional[Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]]
+        the GDS via map.  Defaults to the via map of the technology.
+
+    Returns
+    -------
+    result_list : List[Dict[str, Any]]
+        the results, one per sweep point in sweep order.  Each entry contains the point index,
+        the swept parameter values, the cell name, the master cell name, the number of columns
+        and rows, the number of masters first generated by this point, the generation time and
+        the schematic parameters.  With worker processes, the number of new masters and the
+        generation time only account for the masters of the same worker.  With sch_only,
+        the master cell name is None.
+
+    Raises
+    ------
+    NotImplementedError
+        if sch_only is True and the generator cannot compute its schematic parameters without
+        drawing the layout.
+    """
+    point_list = expand_sweep(sweep_specs)
+    if not point_list:
+        raise ValueError('The sweep has no points.')
+    specs_list = [specs for _, specs in point_list]
+    if sch_only:
+        t_start = time.perf_counter()
+        result_list = _compute_points(specs_list, module, cls_name)
+        for index, ((sweep_point, _), info) in enumerate(zip(point_list, result_list)):
+            info['index'] = index
+            info['sweep'] = sweep_point
+        if log_fun is not None:
+            log_fun('%d sweep points, schematic parameters computed in %.3f s' %
+                    (len(point_list), time.perf_counter() - t_start))
+        if table_fname:
+            write_sweep_table(result_list, table_fname)
+        return result_list
+
+    grid_specs = sweep_specs['routing_grid']
+    lib_name = sweep_specs['impl_lib']
+
+    t_start = time.perf_counter()
+    grid = make_grid(prj.tech_info, grid_specs)
+    temp_db = make_tdb(grid, lib_name, use_cybagoa=use_cybagoa)
+    if num_workers == 1:
+        master_list, info_list = _generate_points(temp_db, specs_list, set(), module, cls_name)
+    else:
+        if num_workers is None:
+            num_workers = os.cpu_count() or 1
+        chunk_size = -(-len(specs_list) // num_workers)
+        job_list = [(specs_list[idx:idx + chunk_size], module, cls_name)
+                    for idx in range(0, len(specs_list), chunk_size)]
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=([grid_specs], use_cybagoa)) as executor:
+            out_list = list(executor.map(_generate_chunk, job_list))
+        master_list, info_list = [], []
+        for data, chunk_info in out_list:
+            master_list.extend(load_masters(temp_db, data))
+            info_list.extend(chunk_info)
+    total_time = time.perf_counter() - t_start
+
+    result_list = []
+    for index, ((sweep_point, _), master, info) in enumerate(zip(point_list, master_list,
+                                                                 info_list)):
+        info['index'] = index
+        info['sweep'] = sweep_point
+        info['master_name'] = master.cell_name
+        result_list.append(info)
+    if log_fun is not None:
+        num_masters = len({key for master in master_list
+                           for key in iter_master_keys(temp_db, master)})
+        log_fun('%d sweep points, %d distinct masters generated in %.3f s' %
+                (len(point_list), num_masters, total_time))
+
+    name_list = [info['cell_name'] for info in result_list]
+    if gds_dir is not None:
+        write_library(prj, temp_db, master_list, name_list,
+                      gds_fname=os.path.join(gds_dir, lib_name + '.gds'), lay_map=lay_map,
+                      via_map=via_map)
+    elif gen_lay:
+        write_library(prj, temp_db, master_list, name_list)
+    if table_fname:
+        write_sweep_table(result_list, table_fname)
+    return result_list
+
+
+def write_sweep_table(result_list, fname):
+    # type: (Sequence[Dict[str, Any]], str) -> None
+    """Writes sweep results as a CSV table, with one column per swept parameter.
+
+    Non-scalar values, such as schematic parameters, are written as JSON.
+    """
+    sweep_columns = []
+    for info in result_list:
+        for key in info['sweep']:
+            if key not in sweep_columns:
+                sweep_columns.append(key)
+
+    dir_name = os.path.dirname(fname)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    with open(fname, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(table_columns[:2]) + sweep_columns + list(table_columns[2:]))
+        for info in result_list:
+            row = [info['index'], info['cell_name']]
+            row.extend(_to_cell(info['sweep'].get(key, None)) for key in sweep_columns)
+            row.extend(_to_cell(info[key]) for key in table_columns[2:])
+            writer.writerow(row)
+
+
+def _to_cell(val):
+    # type: (Any) -> Any
+    if isinstance(val, (dict, list, tuple)):
+        return json.dumps(val, sort_keys=True, default=str)
+    return val
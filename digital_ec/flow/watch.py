@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a watch mode that regenerates cells when their specification changes.
+
+:class:`SpecWatcher` polls a set of cell specification files.  When a file is modified, its
+parameters are normalized and compared with the previous run, and the cell is regenerated
+only if the normalized parameters, the routing grid or the cell name changed.  Template
+databases are kept across runs, so only masters whose normalized parameters changed are
+created again; unchanged children, such as substrate taps, come from the master table.
+
+Specification files use the formats accepted by
+:func:`~digital_ec.flow.batch.get_spec_generator`.  A file that cannot be parsed is reported
+and skipped until it is modified again.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Sequence, Optional, Iterable
+
+import os
+import time
+import traceback
+from collections.abc import Mapping
+
+import yaml
+
+from .batch import get_spec_generator, write_library, TemplateDBTable, _get_grid_id
+from ..layout.params import freeze
+
+if TYPE_CHECKING:
+    from bag.core import BagProject
+    from bag.layout.template import TemplateBase, TemplateDB
+
+
+def flatten_params(params, prefix=''):
+    # type: (Mapping, str) -> Dict[str, Any]
+    """Flattens nested parameter dictionaries, using dotted keys for nested parameters."""
+    ans = {}
+    for key, val in params.items():
+        name = prefix + str(key)
+        if isinstance(val, Mapping):
+            ans.update(flatten_params(val, prefix=name + '.'))
+        else:
+            ans[name] = val
+    return ans
+
+
+def diff_params(old_params, new_params):
+    # type: (Mapping, Mapping) -> List[str]
+    """Returns the sorted dotted keys of all parameters that are different, added or removed."""
+    old_flat = flatten_params(old_params)
+    new_flat = flatten_params(new_params)
+    return sorted(key for key in set(old_flat) | set(new_flat)
+                  if key not in old_flat or key not in new_flat or
+                  freeze(old_flat[key]) != freeze(new_flat[key]))
+
+
+def iter_master_keys(temp_db, master):
+    # type: (TemplateDB, TemplateBase) -> Iterable[Any]
+    """Iterates over the keys of the given master and all of its descendants."""
+    visited = set()
+    stack = [master]
+    while stack:
+        cur = stack.pop()
+        key = cur.key
+        if key not in visited:
+            visited.add(key)
+            yield key
+            stack.extend(temp_db.find_master(child_key) for child_key in cur.children)
+
+
+class SpecWatcher(object):
+    """Regenerates cells when their specification files change.
+
+    Parameters
+    ----------
+    prj : BagProject
+        the BAG project instance.
+    spec_files : Sequence[str]
+        the cell specification files.
+    module : Optional[str]
+        the generator module name.
+    cls_name : Optional[str]
+        the generator class name.  If module or cls_name is not given, cells are wrapped in a
+        StdCellWrapper.
+    use_cybagoa : bool
+        True to use cybagoa to write layouts.
+    gds_dir : Optional[str]
+        if given, write each cell to ``<gds_dir>/<cell_name>.gds`` instead of creating the
+        layout in OpenAccess.  The master dependency graph is written next to the library;
+        see :func:`~digital_ec.flow.batch.write_library`.
+    log_fun : Any
+        if given, called with a message after each check of a modified file.
+    lay_map : Optional[Dict[Tuple[str, str], Tuple[int, int]]]
+        the GDS layer map.  Defaults to the layer map of the technology.
+    via_map : Optional[Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]]
+        the GDS via map.  Defaults to the via map of the technology.
+    """
+
+    def __init__(self, prj, spec_files, module=None, cls_name=None, use_cybagoa=True,
+                 gds_dir=None, log_fun=None, lay_map=None, via_map=None):
+        # type: (...) -> None
+        self.prj = prj
+        self.tdb_table = TemplateDBTable(prj.tech_info, use_cybagoa=use_cybagoa)
+        self._spec_files = list(spec_files)
+        self._module = module
+        self._cls_name = cls_name
+        self._gds_dir = gds_dir
+        self._log_fun = log_fun
+        self._lay_map = lay_map
+        self._via_map = via_map
+        # spec file name to the modification time of the last check.
+        self._mtime_table = {}  # type: Dict[str, int]
+        # spec file name to the information of the last generation.
+        self._run_table = {}  # type: Dict[str, Dict[str, Any]]
+        # keys of all masters generated so far.
+        self._known_keys = set()  # type: set
+
+    def _log(self, msg):
+        # type: (str) -> None
+        if self._log_fun is not None:
+            self._log_fun(msg)
+
+    def poll(self):
+        # type: () -> List[Dict[str, Any]]
+        """Checks all specification files once, and regenerates the modified cells.
+
+        Returns
+        -------
+        result_list : List[Dict[str, Any]]
+            the results of the regenerated cells.  Each entry contains the specification
+            file name, the library and cell names, the changed parameter keys, the number
+            and cell names of newly created masters, the schematic parameters and the
+            generation time.
+        """
+        result_list = []
+        for fname in self._spec_files:
+            try:
+                mtime = os.stat(fname).st_mtime_ns
+            except OSError:
+                continue
+            if self._mtime_table.get(fname, None) == mtime:
+                continue
+            self._mtime_table[fname] = mtime
+            try:
+                result = self.check_file(fname)
+            except Exception:
+                self._log('%s: failed\n%s' % (fname, traceback.format_exc()))
+                continue
+            if result is not None:
+                result_list.append(result)
+        return result_list
+
+    def check_file(self, fname):
+        # type: (str) -> Optional[Dict[str, Any]]
+        """Regenerates the cell of the given specification file, if its parameters changed.
+
+        Returns
+        -------
+        result : Optional[Dict[str, Any]]
+            the generation result, or None if the normalized parameters did not change.
+        """
+        with open(fname, 'r') as f:
+            specs = yaml.safe_load(f)
+        temp_cls, params = get_spec_generator(specs, module=self._module,
+                                              cls_name=self._cls_name)
+        lib_name = specs['impl_lib']
+        cell_name = specs['impl_cell']
+        grid_specs = specs['routing_grid']
+        run_id = (temp_cls, _get_grid_id(grid_specs), lib_name, cell_name, freeze(params))
+
+        prev = self._run_table.get(fname, None)
+        if prev is not None and prev['run_id'] == run_id:
+            self._log('%s: no parameter change' % fname)
+            return None
+        changed = [] if prev is None else diff_params(prev['params'], params)
+
+        t_start = time.perf_counter()
+        temp_db = self.tdb_table.get_tdb(grid_specs, lib_name)
+        master = temp_db.new_template(params=params, temp_cls=temp_cls)
+        new_masters = []
+        for key in iter_master_keys(temp_db, master):
+            if key not in self._known_keys:
+                self._known_keys.add(key)
+                new_masters.append(temp_db.find_master(key).cell_name)
+        gen_time = time.perf_counter() - t_start
+
+        if self._gds_dir is None:
+            gds_fname = None
+        else:
+            gds_fname = os.path.join(self._gds_dir, cell_name + '.gds')
+        write_library(self.prj, temp_db, [master], [cell_name], gds_fname=gds_fname,
+                      lay_map=self._lay_map, via_map=self._via_map)
+
+        self._run_table[fname] = dict(run_id=run_id, params=params)
+        result = dict(
+            spec_file=fname,
+            lib_name=lib_name,
+            cell_name=cell_name,
+            changed=changed,
+            num_new_masters=len(new_masters),
+            new_masters=new_masters,
+            sch_params=getattr(master, 'sch_params', None),
+            gen_time=gen_time,
+            total_time=time.perf_counter() - t_start,
+        )
+        self._log('%s: %s/%s regenerated in %.3f s, %d new masters; changed: %s' %
+                  (fname, lib_name, cell_name, result['total_time'], len(new_masters),
+                   ', '.join(changed) if changed else 'all'))
+        return result
+
+    def run(self, interval=0.5, max_polls=None):
+        # type: (float, Optional[int]) -> None
+        """Polls the specification files until interrupted.
+
+        Parameters
+        ----------
+        interval : float
+            the polling interval, in seconds.
+        max_polls : Optional[int]
+            if given, stop after this many polls.
+        """
+        num_polls = 0
+        try:
+            while max_polls is None or num_polls < max_polls:
+                self.poll()
+                num_polls += 1
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""A headless stand-in for the BAG framework, used to profile and benchmark the generators.
+
+This package implements the subset of BAG's routing grid, template database, laygo, digital and
+analog base class APIs used by :mod:`digital_ec.layout`, on top of a synthetic technology.
+Layout geometries are kept in memory; no OpenAccess database or Virtuoso connection is needed.
+
+Call :func:`install` before importing any generator module::
+
+    from digital_ec import headless
+    headless.install()
+
+    from digital_ec.layout.stdcells.inv import Inverter
+
+The generated shapes follow the synthetic technology and are not DRC clean.  Only the number
+of masters, routing calls and geometries, and the Python work needed to produce them, are
+representative of a real BAG run.
+"""
+
+from typing import Dict
+
+import sys
+import types
+
+from .tech import TechInfo, BagProject
+from .routing import TrackID, WireArray, RoutingGrid, TrackManager
+from .template import BBox, Port, Instance, TemplateBase, TemplateDB
+from .laygo import LaygoBaseInfo, LaygoBase, DigitalBase
+from .analog import AnalogBaseInfo, AnalogBase
+
+__all__ = ['install', 'is_installed', 'TechInfo', 'BagProject', 'TrackID', 'WireArray',
+           'RoutingGrid', 'TrackManager', 'BBox', 'Port', 'Instance', 'TemplateBase',
+           'TemplateDB', 'LaygoBaseInfo', 'LaygoBase', 'DigitalBase', 'AnalogBaseInfo',
+           'AnalogBase']
+
+# module name to the attributes exported by that module.
+_module_table = {
+    'bag': {},
+    'bag.core': dict(BagProject=BagProject),
+    'bag.layout': dict(RoutingGrid=RoutingGrid, TemplateDB=TemplateDB),
+    'bag.layout.core': dict(TechInfo=TechInfo, BBox=BBox),
+    'bag.layout.util': dict(BBox=BBox),
+    'bag.layout.objects': dict(Instance=Instance),
+    'bag.layout.routing': dict(TrackID=TrackID, WireArray=WireArray, RoutingGrid=RoutingGrid,
+                               TrackManager=TrackManager, Port=Port),
+    'bag.layout.routing.base': dict(TrackID=TrackID, WireArray=WireArray, Port=Port,
+                                    TrackManager=TrackManager),
+    'bag.layout.routing.grid': dict(RoutingGrid=RoutingGrid),
+    'bag.layout.template': dict(TemplateBase=TemplateBase, TemplateDB=TemplateDB),
+    'abs_templates_ec': {},
+    'abs_templates_ec.laygo': {},
+    'abs_templates_ec.laygo.core': dict(LaygoBaseInfo=LaygoBaseInfo, LaygoBase=LaygoBase),
+    'abs_templates_ec.digital': {},
+    'abs_templates_ec.digital.core': dict(DigitalBase=DigitalBase),
+    'abs_templates_ec.analog_core': {},
+    'abs_templates_ec.analog_core.base': dict(AnalogBaseInfo=AnalogBaseInfo,
+                                              AnalogBase=AnalogBase),
+}  # type: Dict[str, Dict[str, object]]
+
+
+def is_installed():
+    # type: () -> bool
+    """Returns True if the headless stand-in is installed as the bag package."""
+    return getattr(sys.modules.get('bag', None), '__headless__', False)
+
+
+def install():
+    # type: () -> None
+    """Installs the headless stand-in as the bag and abs_templates_ec packages.
+
+    Must be called before any module importing BAG is imported.  Does nothing if the stand-in
+    is already installed.
+
+    Raises
+    ------
+    ValueError
+        if the real BAG framework is already imported.
+    """
+    if is_installed():
+        return
+    for mod_name in _module_table:
+        if mod_name in sys.modules:
+            raise ValueError('Module %s is already imported; cannot install the headless '
+                             'BAG stand-in.' % mod_name)
+
+    for mod_name, attr_table in _module_table.items():
+        mod = types.ModuleType(mod_name)
+        mod.__headless__ = True
+        # mark as a package, so submodules can be imported.
+        mod.__path__ = []
+        mod.__dict__.update(attr_table)
+        sys.modules[mod_name] = mod
+        parent_name, _, child_name = mod_name.rpartition('.')
+        if parent_name:
+            setattr(sys.modules[parent_name], child_name, mod)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the analog base class of the headless BAG stand-in.
+
+Transistor rows are stacked from bottom to top as: the P-tap row, the NMOS rows, the PMOS rows
+and the N-tap row.  Each transistor row has its gate tracks on the side facing the other
+transistor type.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, Set, Tuple, List, Union, Optional
+
+import math
+
+from .routing import TrackID, WireArray, norm_idx
+from .template import TemplateBase, BBox
+
+if TYPE_CHECKING:
+    from .routing import RoutingGrid, TrackManager
+    from .template import TemplateDB
+
+TrackType = Union[float, int]
+
+
+class AnalogBaseInfo(object):
+    """The finger and track information of an analog base.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    lch : float
+        the channel length.
+    guard_ring_nf : int
+        the guard ring width in number of fingers.
+    top_layer : Optional[int]
+        the top routing layer.
+    end_mode : int
+        the end mode.
+    min_fg_sep : int
+        the minimum number of fingers between transistors.
+    **kwargs
+        ignored.
+    """
+
+    def __init__(self, grid, lch, guard_ring_nf, top_layer=None, end_mode=15, min_fg_sep=0,
+                 **kwargs):
+        # type: (RoutingGrid, float, int, Optional[int], int, int, **Any) -> None
+        tech_params = grid.tech_info.tech_params
+        self._grid = grid
+        self._lch = lch
+        self._guard_ring_nf = guard_ring_nf
+        self._top_layer = top_layer
+        self._end_mode = end_mode
+        self._min_fg_sep = max(min_fg_sep, tech_params['analog']['min_fg_sep'])
+        self._sd_pitch = tech_params['laygo']['col_width']
+
+    @property
+    def grid(self):
+        # type: () -> RoutingGrid
+        return self._grid
+
+    @property
+    def min_fg_sep(self):
+        # type: () -> int
+        return self._min_fg_sep
+
+    @property
+    def sd_pitch_unit(self):
+        # type: () -> int
+        return self._sd_pitch
+
+    @property
+    def num_fg_edge(self):
+        # type: () -> int
+        """Number of fingers of each left/right edge, including the guard ring."""
+        return 1 + self._guard_ring_nf
+
+    def col_to_coord(self, col_idx, unit_mode=False):
+        # type: (int, bool) -> Union[float, int]
+        coord = (self.num_fg_edge + col_idx) * self._sd_pitch
+        return coord if unit_mode else coord * self._grid.resolution
+
+
+class AnalogBase(TemplateBase):
+    """The base class of analog transistor row templates.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    lib_name : str
+        the layout library name.
+    params : Dict[str, Any]
+        the parameter values.
+    used_names : Set[str]
+        a set of already used cell names.
+    **kwargs
+        optional parameters.
+    """
+
+    def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
+        # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
+        TemplateBase.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
+        self._layout_info = None  # type: Optional[AnalogBaseInfo]
+        self._lch = None
+        self._fg_tot = 0
+        self._tr_manager = None  # type: Optional[TrackManager]
+        # row properties, keyed by mos type.
+        self._rows = {}  # type: Dict[str, List[Dict[str, Any]]]
+        self._sub_warrs = dict(ptap=[], ntap=[])  # type: Dict[str, List[WireArray]]
+        self._used_fg = {}  # type: Dict[Tuple[str, int], Set[int]]
+        self._sub_tracks = {}  # type: Dict[str, TrackType]
+
+    @property
+    def mos_conn_layer(self):
+        # type: () -> int
+        return self.grid.tech_info.tech_params['laygo']['conn_layer']
+
+    @property
+    def layout_info(self):
+        # type: () -> Optional[AnalogBaseInfo]
+        return self._layout_info
+
+    def draw_base(self, lch, fg_tot, ptap_w, ntap_w, nw_list, nth_list, pw_list, pth_list,
+                  ng_tracks=None, nds_tracks=None, pg_tracks=None, pds_tracks=None,
+                  n_orientations=None, p_orientations=None, guard_ring_nf=0, n_kwargs=None,
+                  p_kwargs=None, pgr_w=None, ngr_w=None, min_fg_sep=0, end_mode=15,
+                  top_layer=None, tr_manager=None, wire_names=None, **kwargs):
+        # type: (...) -> None
+        """Draws the transistor row floorplan."""
+        tech_params = self.grid.tech_info.tech_params['analog']
+        hm_layer = self.mos_conn_layer + 1
+        hm_pitch = self.grid.get_track_pitch(hm_layer, unit_mode=True)
+        self._layout_info = info = AnalogBaseInfo(self.grid, lch, guard_ring_nf,
+                                                  top_layer=top_layer, end_mode=end_mode,
+                                                  min_fg_sep=min_fg_sep)
+        self._lch = lch
+        self._fg_tot = fg_tot
+        self._tr_manager = tr_manager
+
+        nn, np = len(nw_list), len(pw_list)
+        n_orientations = n_orientations or ['MX'] * nn
+        p_orientations = p_orientations or ['R0'] * np
+        sub_ntr = tech_params['sub_ntr'] + (tech_params['gr_ntr'] if guard_ring_nf > 0 else 0)
+
+        tr_start = sub_ntr
+        self._rows.clear()
+        for mos_type, w_list, th_list, orient_list, g_list, ds_list in \
+                (('nch', nw_list, nth_list, n_orientations, ng_tracks, nds_tracks),
+                 ('pch', pw_list, pth_list, p_orientations, pg_tracks, pds_tracks)):
+            row_list = self._rows[mos_type] = []
+            for idx, (w, th, orient) in enumerate(zip(w_list, th_list, orient_list)):
+                ng = self._get_num_tracks(hm_layer, mos_type, idx, 'g', g_list, wire_names)
+                nds = self._get_num_tracks(hm_layer, mos_type, idx, 'ds', ds_list, wire_names)
+                ntr = max(tech_params['mos_ntr'], int(math.ceil(ng + nds)))
+                row_list.append(dict(w=w, th=th, orient=orient, tr_start=tr_start, ntr=ntr,
+                                     g=(0, ng), ds=(ntr - nds, nds)))
+                tr_start += ntr
+
+        self._sub_tracks = dict(ptap=norm_idx((sub_ntr - 1) / 2),
+                                ntap=norm_idx(tr_start + (sub_ntr - 1) / 2))
+        tot_ntr = tr_start + sub_ntr
+        width = (fg_tot + 2 * info.num_fg_edge) * info.sd_pitch_unit
+        self.bound_box = BBox(0, 0, width, tot_ntr * hm_pitch, self.grid.resolution)
+        self.array_box = self.bound_box
+
+    def _get_num_tracks(self, hm_layer, mos_type, row_idx, tr_type, ntr_list, wire_names):
+        # type: (int, str, int, str, Optional[List[TrackType]], Any) -> TrackType
+        if ntr_list is not None:
+            return ntr_list[row_idx]
+        if wire_names is not None and self._tr_manager is not None:
+            name_list = wire_names[mos_type][row_idx].get(tr_type, [])
+            if name_list:
+                return self._tr_manager.place_wires(hm_layer, name_list)[0]
+        return 1
+
+    def _get_row_track(self, row, tr_type, wire_idx):
+        # type: (Dict[str, Any], str, TrackType) -> TrackType
+        offset, num = row[tr_type]
+        if wire_idx < 0:
+            wire_idx += num
+        loc = offset + wire_idx
+        if row['orient'] == 'MX':
+            loc = row['ntr'] - 1 - loc
+        return norm_idx(row['tr_start'] + loc)
+
+    def get_num_tracks(self, mos_type, row_idx, tr_type):
+        # type: (str, int, str) -> TrackType
+        return self._rows[mos_type][row_idx][tr_type][1]
+
+    def get_track_index(self, mos_type, row_idx, tr_type, tr_idx):
+        # type: (str, int, str, TrackType) -> TrackType
+        return self._get_row_track(self._rows[mos_type][row_idx], tr_type, tr_idx)
+
+    def get_wire_id(self, mos_type, row_idx, tr_type, wire_idx=0, wire_name=''):
+        # type: (str, int, str, TrackType, str) -> TrackID
+        hm_layer = self.mos_conn_layer + 1
+        width = 1
+        if wire_name and self._tr_manager is not None:
+            width = self._tr_manager.get_width(hm_layer, wire_name)
+        return TrackID(hm_layer, self.get_track_index(mos_type, row_idx, tr_type, wire_idx),
+                       width=width)
+
+    def _make_conn_wire(self, col_idx, num, span):
+        # type: (int, int, Tuple[int, int]) -> WireArray
+        conn_layer = self.mos_conn_layer
+        grid = self.grid
+        x = self._layout_info.col_to_coord(col_idx, unit_mode=True)
+        tidx = grid.coord_to_track(conn_layer, x, unit_mode=True)
+        pitch = 2 * self._layout_info.sd_pitch_unit / grid.get_track_pitch(conn_layer,
+                                                                            unit_mode=True)
+        warr = WireArray(TrackID(conn_layer, tidx, num=num, pitch=pitch), span[0], span[1],
+                         res=grid.resolution, unit_mode=True)
+        self._draw_wire(warr)
+        return warr
+
+    def draw_mos_conn(self, mos_type, row_idx, col_idx, fg, sdir, ddir, s_net='', d_net='',
+                      gate_pref_loc='', **kwargs):
+        # type: (str, int, int, int, int, int, str, str, str, **Any) -> Dict[str, WireArray]
+        """Draws transistor connection wires, and returns the gate, drain and source wires."""
+        row = self._rows[mos_type][row_idx]
+        hm_pitch = self.grid.get_track_pitch(self.mos_conn_layer + 1, unit_mode=True)
+        yb = row['tr_start'] * hm_pitch
+        yt = yb + row['ntr'] * hm_pitch
+        yg = int(round(row['g'][1] * hm_pitch))
+        if row['orient'] == 'MX':
+            g_span, sd_span = (yt - yg, yt), (yb, yt - yg)
+        else:
+            g_span, sd_span = (yb, yb + yg), (yb + yg, yt)
+
+        self._used_fg.setdefault((mos_type, row_idx), set()).update(
+            range(col_idx, col_idx + fg))
+        s = self._make_conn_wire(col_idx, fg // 2 + 1, sd_span)
+        d = self._make_conn_wire(col_idx + 1, (fg + 1) // 2, sd_span)
+        if gate_pref_loc == 's':
+            g = self._make_conn_wire(col_idx, fg // 2 + 1, g_span)
+        else:
+            g = self._make_conn_wire(col_idx + 1, (fg + 1) // 2, g_span)
+        return dict(g=g, d=d, s=s)
+
+    def connect_to_substrate(self, sub_type, warr_list, inner=False, both=False):
+        # type: (str, Union[WireArray, List[WireArray]], bool, bool) -> None
+        """Connects the given wires to the substrate supply when dummies are filled."""
+        if isinstance(warr_list, WireArray):
+            warr_list = [warr_list]
+        self._sub_warrs[sub_type].extend(warr_list)
+
+    def fill_dummy(self, lower=None, upper=None, vdd_width=1, vss_width=1, sup_margin=0,
+                   unit_mode=False):
+        # type: (Any, Any, int, int, int, bool) -> Tuple[List[WireArray], List[WireArray]]
+        """Draws the substrate supply wires, and returns the VSS and VDD wires."""
+        hm_layer = self.mos_conn_layer + 1
+        xr = self.bound_box.right_unit
+        ans = []
+        for sub_type, width in (('ptap', vss_width), ('ntap', vdd_width)):
+            tid = TrackID(hm_layer, self._sub_tracks[sub_type], width=width)
+            warr_list = self._sub_warrs[sub_type]
+            if warr_list:
+                sup = self.connect_to_tracks(warr_list, tid, track_lower=0, track_upper=xr,
+                                             unit_mode=True)
+            else:
+                sup = self.add_wires(hm_layer, tid.base_index, 0, xr, width=width,
+                                     unit_mode=True)
+            ans.append([sup])
+        return ans[0], ans[1]
+
+    def get_sch_dummy_info(self, col_start=0, col_stop=None):
+        # type: (int, Optional[int]) -> List[Tuple[Tuple[Any, ...], int]]
+        """Returns the number of dummy fingers of each transistor row."""
+        if col_stop is None:
+            col_stop = self._fg_tot
+        ans = []
+        for mos_type in ('nch', 'pch'):
+            for row_idx, row in enumerate(self._rows.get(mos_type, [])):
+                used = self._used_fg.get((mos_type, row_idx), set())
+                num_dum = sum(1 for col in range(col_start, col_stop) if col not in used)
+                if num_dum > 0:
+                    ans.append(((mos_type, row['w'], self._lch, row['th'], '', ''), num_dum))
+        return ans
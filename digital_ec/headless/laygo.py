@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the laygo and digital base classes of the headless BAG stand-in.
+
+A laygo row is drawn as bare transistor connection wires on the connection layer.  In the row
+local frame (orientation R0), the gate, gate-bar and drain/source horizontal track groups are
+stacked from bottom to top; rows with orientation MX are mirrored.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, Set, Tuple, List, Sequence, Union, Optional
+
+import math
+from fractions import Fraction
+
+from .routing import TrackID, WireArray, norm_idx
+from .template import TemplateBase, BBox
+
+if TYPE_CHECKING:
+    from .routing import RoutingGrid
+    from .template import TemplateDB, Instance
+
+TrackType = Union[float, int]
+
+_tr_type_list = ('g', 'gb', 'ds')
+
+
+class LaygoBaseInfo(object):
+    """The column and routing grid information of a laygo configuration.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    config : Dict[str, Any]
+        the laygo configuration dictionary.
+    draw_boundaries : bool
+        True if boundaries are drawn.
+    end_mode : int
+        the boundary end mode.
+    """
+
+    def __init__(self, grid, config, draw_boundaries=False, end_mode=0):
+        # type: (RoutingGrid, Dict[str, Any], bool, int) -> None
+        tech_params = grid.tech_info.tech_params['laygo']
+        self._config = config
+        self._conn_layer = tech_params['conn_layer']
+        self._col_width = tech_params['col_width']
+        self._sub_columns = tech_params['sub_columns']
+        self._end_width = tech_params['end_width']
+        self._end_height = tech_params['end_height']
+        self.draw_boundaries = draw_boundaries
+        self.end_mode = end_mode
+
+        conn_w = tech_params['conn_width']
+        layer_specs = [(self._conn_layer, conn_w, self._col_width - conn_w)]
+        layer_specs.extend(zip(config['tr_layers'], config['tr_widths'], config['tr_spaces']))
+        self._grid = grid.get_derived_grid(layer_specs)
+
+    @property
+    def grid(self):
+        # type: () -> RoutingGrid
+        return self._grid
+
+    @property
+    def config(self):
+        # type: () -> Dict[str, Any]
+        return self._config
+
+    @property
+    def conn_layer(self):
+        # type: () -> int
+        return self._conn_layer
+
+    @property
+    def col_width(self):
+        # type: () -> int
+        return self._col_width
+
+    @property
+    def sub_columns(self):
+        # type: () -> int
+        return self._sub_columns
+
+    @property
+    def end_width(self):
+        # type: () -> int
+        return self._end_width
+
+    @property
+    def end_height(self):
+        # type: () -> int
+        return self._end_height
+
+    @property
+    def col_offset(self):
+        # type: () -> int
+        """The X coordinate of column 0, in resolution units."""
+        return self._end_width if self.draw_boundaries else 0
+
+    @property
+    def ybot(self):
+        # type: () -> int
+        """The Y coordinate of the first row, in resolution units."""
+        return self._end_height if self.draw_boundaries else 0
+
+    def col_to_coord(self, col_idx, unit_mode=False):
+        # type: (int, bool) -> Union[float, int]
+        coord = self.col_offset + col_idx * self._col_width
+        return coord if unit_mode else coord * self._grid.resolution
+
+    def coord_to_col(self, coord, unit_mode=False):
+        # type: (Union[float, int], bool) -> int
+        if not unit_mode:
+            coord = int(round(coord / self._grid.resolution))
+        col_idx, rem = divmod(coord - self.col_offset, self._col_width)
+        if rem != 0:
+            raise ValueError('Coordinate %d is not on a column boundary.' % coord)
+        return col_idx
+
+    def col_to_track(self, layer_id, col_idx):
+        # type: (int, int) -> TrackType
+        return self._grid.coord_to_track(layer_id, self.col_to_coord(col_idx, unit_mode=True),
+                                         unit_mode=True)
+
+    def col_to_nearest_track(self, layer_id, col_idx, half_track=True, mode=0):
+        # type: (int, int, bool, int) -> TrackType
+        return self._grid.coord_to_nearest_track(layer_id,
+                                                 self.col_to_coord(col_idx, unit_mode=True),
+                                                 half_track=half_track, mode=mode,
+                                                 unit_mode=True)
+
+
+def _make_row_layout_info(grid, config, row_types, row_widths, row_orientations,
+                          row_thresholds, num_g_tracks, num_gb_tracks, num_ds_tracks,
+                          row_kwargs):
+    # type: (...) -> Dict[str, Any]
+    """Computes the row layout information dictionary from the row track counts."""
+    tech_params = grid.tech_info.tech_params['laygo']
+    hm_layer = tech_params['conn_layer'] + 1
+    hm_pitch = grid.get_track_pitch(hm_layer, unit_mode=True)
+
+    track_offsets = []
+    row_num_tracks = []
+    row_track_starts = []
+    tot_ntr = 0
+    for ng, ngb, nds in zip(num_g_tracks, num_gb_tracks, num_ds_tracks):
+        track_offsets.append(dict(
+            g=(0, ng),
+            gb=(ng, ngb),
+            ds=(norm_idx(ng + ngb), nds),
+        ))
+        row_ntr = int(math.ceil(ng + ngb + nds))
+        row_num_tracks.append(row_ntr)
+        row_track_starts.append(tot_ntr)
+        tot_ntr += row_ntr
+
+    return dict(
+        config=config,
+        row_types=tuple(row_types),
+        row_widths=tuple(row_widths),
+        row_orientations=tuple(row_orientations),
+        row_thresholds=tuple(row_thresholds),
+        row_kwargs=tuple(row_kwargs),
+        track_offsets=tuple(track_offsets),
+        row_num_tracks=tuple(row_num_tracks),
+        row_track_starts=tuple(row_track_starts),
+        num_tracks=tot_ntr,
+        height=tot_ntr * hm_pitch,
+    )
+
+
+class _LaygoRowMixin(object):
+    """Horizontal track queries shared by laygo and digital templates.
+
+    Row indices above the number of laygo rows refer to rows of stacked digital rows; odd
+    digital rows are mirrored.
+    """
+
+    def _get_row_ybot(self):
+        # type: () -> int
+        return 0
+
+    def get_num_tracks(self, row_idx, tr_type):
+        # type: (int, str) -> TrackType
+        info = self._row_layout_info
+        return info['track_offsets'][row_idx % len(info['row_types'])][tr_type][1]
+
+    def get_track_index(self, row_idx, tr_type, tr_idx):
+        # type: (int, str, TrackType) -> TrackType
+        """Returns the absolute horizontal track index of the given row track."""
+        info = self._row_layout_info
+        dig_row, lay_row = divmod(row_idx, len(info['row_types']))
+        offset, num = info['track_offsets'][lay_row][tr_type]
+        if tr_idx < 0:
+            tr_idx += num
+        loc = Fraction(offset).limit_denominator(2) + Fraction(tr_idx).limit_denominator(2)
+        if info['row_orientations'][lay_row] == 'MX':
+            loc = info['row_num_tracks'][lay_row] - 1 - loc
+        loc += info['row_track_starts'][lay_row]
+        tot_ntr = info['num_tracks']
+        if dig_row % 2 == 1:
+            loc = tot_ntr - 1 - loc
+        hm_layer = self.conn_layer + 1
+        hm_pitch = self.grid.get_track_pitch(hm_layer, unit_mode=True)
+        return norm_idx(Fraction(self._get_row_ybot(), hm_pitch) + dig_row * tot_ntr + loc)
+
+    def make_track_id(self, row_idx, tr_type, tr_idx, width=1, num=1, pitch=0):
+        # type: (int, str, TrackType, int, int, TrackType) -> TrackID
+        return TrackID(self.conn_layer + 1, self.get_track_index(row_idx, tr_type, tr_idx),
+                       width=width, num=num, pitch=pitch)
+
+
+class LaygoBase(_LaygoRowMixin, TemplateBase):
+    """The base class of laygo templates.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    lib_name : str
+        the layout library name.
+    params : Dict[str, Any]
+        the parameter values.
+    used_names : Set[str]
+        a set of already used cell names.
+    **kwargs
+        optional parameters.
+    """
+
+    def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
+        # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
+        TemplateBase.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
+        self._laygo_info = LaygoBaseInfo(self.grid, self.params['config'])
+        self.grid = self._laygo_info.grid
+        self._row_layout_info = None  # type: Optional[Dict[str, Any]]
+        self._num_cols = 0
+        self._used_cols = 0
+
+    @property
+    def laygo_info(self):
+        # type: () -> LaygoBaseInfo
+        return self._laygo_info
+
+    @property
+    def conn_layer(self):
+        # type: () -> int
+        return self._laygo_info.conn_layer
+
+    @property
+    def sub_columns(self):
+        # type: () -> int
+        return self._laygo_info.sub_columns
+
+    @property
+    def row_layout_info(self):
+        # type: () -> Optional[Dict[str, Any]]
+        return self._row_layout_info
+
+    @property
+    def num_cols(self):
+        # type: () -> int
+        return self._num_cols
+
+    @property
+    def digital_size(self):
+        # type: () -> Tuple[int, int]
+        return self._num_cols, 1
+
+    def _get_row_ybot(self):
+        # type: () -> int
+        return self._laygo_info.ybot
+
+    def set_row_types(self, row_types, row_widths, row_orientations, row_thresholds,
+                      draw_boundaries, end_mode, num_g_tracks, num_gb_tracks, num_ds_tracks,
+                      guard_ring_nf=0, row_kwargs=None, num_col=None, row_sub_widths=None,
+                      **kwargs):
+        # type: (...) -> None
+        if row_kwargs is None:
+            row_kwargs = [{}] * len(row_types)
+        info = _make_row_layout_info(self.grid, self.params['config'], row_types, row_widths,
+                                     row_orientations, row_thresholds, num_g_tracks,
+                                     num_gb_tracks, num_ds_tracks, row_kwargs)
+        self.set_rows_direct(info, num_col=num_col, draw_boundaries=draw_boundaries,
+                             end_mode=end_mode)
+
+    def set_rows_direct(self, row_layout_info, num_col=None, draw_boundaries=False,
+                        end_mode=0):
+        # type: (Dict[str, Any], Optional[int], bool, int) -> None
+        self._row_layout_info = row_layout_info
+        self._laygo_info.draw_boundaries = draw_boundaries
+        self._laygo_info.end_mode = end_mode
+        self._num_cols = num_col or 0
+        self._update_bound_box()
+
+    def _update_bound_box(self):
+        # type: () -> None
+        info = self._laygo_info
+        width = 2 * info.col_offset + self._num_cols * info.col_width
+        height = 2 * info.ybot + self._row_layout_info['height']
+        self.bound_box = BBox(0, 0, width, height, self.grid.resolution)
+
+    def _get_row_regions(self, row_idx):
+        # type: (int) -> Tuple[Tuple[int, int], Tuple[int, int]]
+        """Returns the Y span of the gate region and the drain/source region of a row."""
+        info = self._row_layout_info
+        hm_pitch = self.grid.get_track_pitch(self.conn_layer + 1, unit_mode=True)
+        yb = self._laygo_info.ybot + info['row_track_starts'][row_idx] * hm_pitch
+        yt = yb + info['row_num_tracks'][row_idx] * hm_pitch
+        ng = info['track_offsets'][row_idx]['g'][1]
+        g_height = int(round(ng * hm_pitch))
+        if info['row_orientations'][row_idx] == 'MX':
+            return (yt - g_height, yt), (yb, yt - g_height)
+        return (yb, yb + g_height), (yb + g_height, yt)
+
+    def _make_conn_wire(self, col_idx, num, pitch, span):
+        # type: (int, int, int, Tuple[int, int]) -> WireArray
+        """Creates connection layer wires on column boundaries.  pitch is in columns."""
+        conn_layer = self.conn_layer
+        grid = self.grid
+        col_ntr = Fraction(self._laygo_info.col_width,
+                           grid.get_track_pitch(conn_layer, unit_mode=True))
+        tidx = self._laygo_info.col_to_track(conn_layer, col_idx)
+        warr = WireArray(TrackID(conn_layer, tidx, num=num, pitch=col_ntr * pitch),
+                         span[0], span[1], res=grid.resolution, unit_mode=True)
+        self._draw_wire(warr)
+        return warr
+
+    def add_laygo_mos(self, row_idx, col_idx, seg, gate_loc='d', stack=False, is_sub=False,
+                      w=None, **kwargs):
+        # type: (int, int, int, str, bool, bool, Optional[int], **Any) -> Dict[str, WireArray]
+        """Adds a transistor or a substrate contact, and returns its connection wires."""
+        row_type = self._row_layout_info['row_types'][row_idx]
+        g_span, sd_span = self._get_row_regions(row_idx)
+        if is_sub:
+            sup_name = 'VSS' if row_type == 'nch' else 'VDD'
+            self._used_cols = max(self._used_cols, col_idx + seg)
+            s = self._make_conn_wire(col_idx, seg // 2 + 1, 2, sd_span)
+            ans = {'%s_s' % sup_name: s}
+            if seg > 1:
+                ans['%s_d' % sup_name] = self._make_conn_wire(col_idx + 1, (seg + 1) // 2, 2,
+                                                              sd_span)
+            return ans
+
+        fg = 2 * seg if stack else seg
+        self._used_cols = max(self._used_cols, col_idx + fg)
+        sd_pitch = 4 if stack else 2
+        sd_step = sd_pitch // 2
+        s = self._make_conn_wire(col_idx, seg // 2 + 1, sd_pitch, sd_span)
+        d = self._make_conn_wire(col_idx + sd_step, (seg + 1) // 2, sd_pitch, sd_span)
+        if stack:
+            g0 = self._make_conn_wire(col_idx + 1, seg, 2, g_span)
+            g1 = g0
+        elif gate_loc == 's':
+            g0 = g1 = self._make_conn_wire(col_idx, seg // 2 + 1, 2, g_span)
+        else:
+            g0 = g1 = self._make_conn_wire(col_idx + 1, (seg + 1) // 2, 2, g_span)
+        return dict(s=s, d=d, g=g0, g0=g0, g1=g1)
+
+    def fill_space(self):
+        # type: () -> None
+        self._num_cols = max(self._num_cols, self._used_cols)
+        self._update_bound_box()
+
+
+class DigitalBase(_LaygoRowMixin, TemplateBase):
+    """The base class of templates made of rows of laygo templates.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    lib_name : str
+        the layout library name.
+    params : Dict[str, Any]
+        the parameter values.
+    used_names : Set[str]
+        a set of already used cell names.
+    **kwargs
+        optional parameters.
+    """
+
+    def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
+        # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
+        TemplateBase.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
+        self._laygo_info = None  # type: Optional[LaygoBaseInfo]
+        self._row_layout_info = None  # type: Optional[Dict[str, Any]]
+        self._row_height = 0
+        self._num_rows = 0
+        self._num_cols = None  # type: Optional[int]
+        self._used_cols = 0
+        self._ybot = (0, 0)
+
+    @property
+    def laygo_info(self):
+        # type: () -> LaygoBaseInfo
+        return self._laygo_info
+
+    @property
+    def conn_layer(self):
+        # type: () -> int
+        return self.grid.tech_info.tech_params['laygo']['conn_layer']
+
+    @property
+    def sub_columns(self):
+        # type: () -> int
+        return self.grid.tech_info.tech_params['laygo']['sub_columns']
+
+    @property
+    def row_layout_info(self):
+        # type: () -> Optional[Dict[str, Any]]
+        return self._row_layout_info
+
+    @property
+    def num_cols(self):
+        # type: () -> Optional[int]
+        return self._num_cols
+
+    @property
+    def digital_size(self):
+        # type: () -> Tuple[Optional[int], int]
+        return self._num_cols, self._num_rows
+
+    def _get_row_ybot(self):
+        # type: () -> int
+        return self._ybot[1]
+
+    def initialize(self, row_layout_info, num_rows, num_cols=None, draw_boundaries=False,
+                   end_mode=0, guard_ring_nf=0):
+        # type: (Dict[str, Any], int, Optional[int], bool, int, int) -> None
+        self._laygo_info = LaygoBaseInfo(self.grid, row_layout_info['config'],
+                                         draw_boundaries=draw_boundaries, end_mode=end_mode)
+        self.grid = self._laygo_info.grid
+        self._row_layout_info = row_layout_info
+        self._row_height = row_layout_info['height']
+        self._num_rows = num_rows
+        self._ybot = (0, self._laygo_info.ybot)
+        if num_cols is not None:
+            self.set_digital_size(num_cols)
+
+    def set_digital_size(self, num_cols=None):
+        # type: (Optional[int]) -> None
+        if num_cols is None:
+            num_cols = self._used_cols
+        self._num_cols = num_cols
+        info = self._laygo_info
+        width = 2 * info.col_offset + num_cols * info.col_width
+        height = 2 * self._ybot[1] + self._num_rows * self._row_height
+        self.bound_box = BBox(0, 0, width, height, self.grid.resolution)
+
+    def add_digital_block(self, master, loc=(0, 0), flip=False, nx=1, spx=0):
+        # type: (TemplateBase, Tuple[int, int], bool, int, int) -> Instance
+        col_idx, row_idx = loc
+        ncol, nrow = master.digital_size
+        info = self._laygo_info
+        x = info.col_to_coord(col_idx + ncol if flip else col_idx, unit_mode=True)
+        if row_idx % 2 == 0:
+            y = self._ybot[1] + row_idx * self._row_height
+            orient = 'MY' if flip else 'R0'
+        else:
+            y = self._ybot[1] + (row_idx + nrow) * self._row_height
+            orient = 'R180' if flip else 'MX'
+        self._used_cols = max(self._used_cols, col_idx + (nx - 1) * spx + ncol)
+        return self.add_instance(master, loc=(x, y), orient=orient, nx=nx,
+                                 spx=spx * info.col_width, unit_mode=True)
+
+    def fill_space(self, port_cols=None):
+        # type: (Optional[Any]) -> Tuple[List[WireArray], List[WireArray], List[Any], List[Any]]
+        """Fills empty space, and returns the bottom and top boundary supply wires."""
+        if self._num_cols is None:
+            self.set_digital_size()
+        info = self._laygo_info
+        if not info.draw_boundaries:
+            return [], [], [], []
+
+        conn_layer = self.conn_layer
+        grid = self.grid
+        xr = self.bound_box.right_unit
+        yt = self.bound_box.top_unit
+        y0 = self._ybot[1]
+        y1 = y0 + self._num_rows * self._row_height
+        tr_left = grid.coord_to_track(conn_layer, info.end_width // 2, unit_mode=True)
+        tr_right = grid.coord_to_track(conn_layer, xr - info.end_width // 2, unit_mode=True)
+        tid = TrackID(conn_layer, tr_left, num=2, pitch=tr_right - tr_left)
+        res = grid.resolution
+        bot = WireArray(tid, 0, y0, res=res, unit_mode=True)
+        top = WireArray(tid, y1, yt, res=res, unit_mode=True)
+        self._draw_wire(bot)
+        self._draw_wire(top)
+        return [bot], [top], [], []
@@ -0,0 +1,558 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the routing grid and wire classes of the headless BAG stand-in.
+
+Track ``i`` of a layer is centered at ``(i + 0.5) * pitch``, and half-integer track indices
+are allowed.  All coordinates are stored in resolution units.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, Tuple, List, Sequence, Union, Optional
+
+import math
+from fractions import Fraction
+
+if TYPE_CHECKING:
+    from .tech import TechInfo
+
+TrackType = Union[float, int]
+LayerSpec = Tuple[int, int, int]
+
+
+def norm_idx(val):
+    # type: (Union[float, int, Fraction]) -> TrackType
+    """Converts a track index to an int if possible, otherwise to a half-integer float."""
+    htr = int(round(2 * val))
+    if htr % 2 == 0:
+        return htr // 2
+    return htr / 2
+
+
+def flip_orient(orient):
+    # type: (str) -> Tuple[bool, bool]
+    """Returns (flip_x, flip_y) of the given orientation."""
+    if orient == 'R0':
+        return False, False
+    if orient == 'MX':
+        return False, True
+    if orient == 'MY':
+        return True, False
+    if orient == 'R180':
+        return True, True
+    raise ValueError('Unsupported orientation: %s' % orient)
+
+
+def compose_orient(orient1, orient2):
+    # type: (str, str) -> str
+    """Returns the orientation of applying orient2 after orient1."""
+    fx1, fy1 = flip_orient(orient1)
+    fx2, fy2 = flip_orient(orient2)
+    return {(False, False): 'R0', (False, True): 'MX',
+            (True, False): 'MY', (True, True): 'R180'}[(fx1 != fx2, fy1 != fy2)]
+
+
+class TrackID(object):
+    """A set of equally spaced tracks on a layer.
+
+    Parameters
+    ----------
+    layer_id : int
+        the layer ID.
+    track_idx : TrackType
+        the index of the first track.
+    width : int
+        the track width, in number of tracks.
+    num : int
+        number of tracks.
+    pitch : TrackType
+        the pitch between tracks, in number of tracks.
+    """
+
+    def __init__(self, layer_id, track_idx, width=1, num=1, pitch=0):
+        # type: (int, TrackType, int, int, TrackType) -> None
+        if num < 1:
+            raise ValueError('TrackID must have at least one track.')
+        self._layer_id = layer_id
+        self._idx = norm_idx(track_idx)
+        self._w = width
+        self._n = num
+        self._pitch = norm_idx(pitch) if num > 1 else 0
+
+    def __repr__(self):
+        return 'TrackID(layer=%d, track=%s, width=%d, num=%d, pitch=%s)' % (
+            self._layer_id, self._idx, self._w, self._n, self._pitch)
+
+    def __eq__(self, other):
+        return (isinstance(other, TrackID) and self.get_immutable_key() ==
+                other.get_immutable_key())
+
+    def __hash__(self):
+        return hash(self.get_immutable_key())
+
+    def __iter__(self):
+        for idx in range(self._n):
+            yield norm_idx(self._idx + idx * self._pitch)
+
+    def get_immutable_key(self):
+        return self.__class__.__name__, self._layer_id, self._idx, self._w, self._n, self._pitch
+
+    @property
+    def layer_id(self):
+        # type: () -> int
+        return self._layer_id
+
+    @property
+    def base_index(self):
+        # type: () -> TrackType
+        return self._idx
+
+    @property
+    def width(self):
+        # type: () -> int
+        return self._w
+
+    @property
+    def num(self):
+        # type: () -> int
+        return self._n
+
+    @property
+    def pitch(self):
+        # type: () -> TrackType
+        return self._pitch
+
+    def transform(self, grid, dx=0, dy=0, orient='R0'):
+        # type: (RoutingGrid, int, int, str) -> TrackID
+        """Returns the transformed TrackID.  Offsets are in resolution units."""
+        flip_x, flip_y = flip_orient(orient)
+        if grid.get_direction(self._layer_id) == 'x':
+            delta, flip = dy, flip_y
+        else:
+            delta, flip = dx, flip_x
+        base = self._idx
+        if flip:
+            base += (self._n - 1) * self._pitch
+        new_idx = grid.transform_track(self._layer_id, base, delta, flip)
+        return TrackID(self._layer_id, new_idx, width=self._w, num=self._n, pitch=self._pitch)
+
+
+class WireArray(object):
+    """An array of wires on the given tracks.
+
+    Parameters
+    ----------
+    track_id : TrackID
+        the tracks of this wire array.
+    lower : Union[float, int]
+        the wire lower coordinate.
+    upper : Union[float, int]
+        the wire upper coordinate.
+    res : float
+        the layout resolution.
+    unit_mode : bool
+        True if lower and upper are given in resolution units.
+    """
+
+    def __init__(self, track_id, lower, upper, res=0.001, unit_mode=False):
+        # type: (TrackID, Union[float, int], Union[float, int], float, bool) -> None
+        if not unit_mode:
+            lower = int(round(lower / res))
+            upper = int(round(upper / res))
+        self._track_id = track_id
+        self._lower = int(lower)
+        self._upper = int(upper)
+        self._res = res
+
+    def __repr__(self):
+        return 'WireArray(%s, %d, %d)' % (self._track_id, self._lower, self._upper)
+
+    @property
+    def resolution(self):
+        # type: () -> float
+        return self._res
+
+    @property
+    def track_id(self):
+        # type: () -> TrackID
+        return self._track_id
+
+    @property
+    def layer_id(self):
+        # type: () -> int
+        return self._track_id.layer_id
+
+    @property
+    def width(self):
+        # type: () -> int
+        return self._track_id.width
+
+    @property
+    def lower_unit(self):
+        # type: () -> int
+        return self._lower
+
+    @property
+    def upper_unit(self):
+        # type: () -> int
+        return self._upper
+
+    @property
+    def middle_unit(self):
+        # type: () -> int
+        return (self._lower + self._upper) // 2
+
+    @property
+    def lower(self):
+        # type: () -> float
+        return self._lower * self._res
+
+    @property
+    def upper(self):
+        # type: () -> float
+        return self._upper * self._res
+
+    @property
+    def middle(self):
+        # type: () -> float
+        return self.middle_unit * self._res
+
+    def get_bbox_list(self, grid):
+        # type: (RoutingGrid) -> List[Tuple[int, int, int, int]]
+        """Returns the (xl, yb, xr, yt) bounding box of each wire, in resolution units."""
+        layer_id = self.layer_id
+        is_horiz = grid.get_direction(layer_id) == 'x'
+        ans = []
+        for idx in self._track_id:
+            tl, tu = grid.get_wire_bounds(layer_id, idx, width=self.width, unit_mode=True)
+            if is_horiz:
+                ans.append((self._lower, tl, self._upper, tu))
+            else:
+                ans.append((tl, self._lower, tu, self._upper))
+        return ans
+
+    def transform(self, grid, loc=(0, 0), orient='R0', unit_mode=True):
+        # type: (RoutingGrid, Tuple[Union[float, int], Union[float, int]], str, bool) -> WireArray
+        """Returns the transformed WireArray."""
+        dx, dy = loc
+        if not unit_mode:
+            dx = int(round(dx / self._res))
+            dy = int(round(dy / self._res))
+        flip_x, flip_y = flip_orient(orient)
+        if grid.get_direction(self.layer_id) == 'x':
+            delta, flip = dx, flip_x
+        else:
+            delta, flip = dy, flip_y
+        if flip:
+            lower, upper = delta - self._upper, delta - self._lower
+        else:
+            lower, upper = self._lower + delta, self._upper + delta
+        tid = self._track_id.transform(grid, dx=dx, dy=dy, orient=orient)
+        return WireArray(tid, lower, upper, res=self._res, unit_mode=True)
+
+
+class RoutingGrid(object):
+    """A routing grid.
+
+    Parameters
+    ----------
+    tech_info : TechInfo
+        the technology information object.
+    layers : Sequence[int]
+        the routing layer IDs.
+    spaces : Sequence[float]
+        the track spacing of each layer, in layout units.
+    widths : Sequence[float]
+        the track width of each layer, in layout units.
+    bot_dir : str
+        the direction of the bottom routing layer, either 'x' or 'y'.
+    max_num_tr : Optional[Any]
+        ignored.
+    width_override : Optional[Any]
+        ignored.
+    """
+
+    def __init__(self, tech_info, layers, spaces, widths, bot_dir, max_num_tr=None,
+                 width_override=None):
+        # type: (TechInfo, Sequence[int], Sequence[float], Sequence[float], str, Any, Any) -> None
+        res = tech_info.resolution
+        self._tech_info = tech_info
+        self._bot_layer = layers[0]
+        self._bot_dir = bot_dir
+        self._w_tracks = {}  # type: Dict[int, int]
+        self._sp_tracks = {}  # type: Dict[int, int]
+        self._derived = {}  # type: Dict[Tuple[LayerSpec, ...], RoutingGrid]
+        for lay_id, sp, w in zip(layers, spaces, widths):
+            self._w_tracks[lay_id] = int(round(w / res))
+            self._sp_tracks[lay_id] = int(round(sp / res))
+        # technology layers below the routing grid, used by transistor connections.
+        for lay_id, w, sp in tech_info.tech_params['grid_layers']:
+            if lay_id not in self._w_tracks:
+                self._w_tracks[lay_id] = w
+                self._sp_tracks[lay_id] = sp
+
+    @property
+    def tech_info(self):
+        # type: () -> TechInfo
+        return self._tech_info
+
+    @property
+    def resolution(self):
+        # type: () -> float
+        return self._tech_info.resolution
+
+    @property
+    def layout_unit(self):
+        # type: () -> float
+        return self._tech_info.layout_unit
+
+    @property
+    def layers(self):
+        # type: () -> List[int]
+        return sorted(self._w_tracks.keys())
+
+    def get_derived_grid(self, layer_specs):
+        # type: (Sequence[LayerSpec]) -> RoutingGrid
+        """Returns a copy of this grid with the given layers added or replaced.
+
+        Copies are memoized, so all templates with the same layer specification share the same
+        routing grid object.
+
+        Parameters
+        ----------
+        layer_specs : Sequence[LayerSpec]
+            a list of (layer ID, width, space) tuples, in resolution units.
+
+        Returns
+        -------
+        grid : RoutingGrid
+            the derived routing grid.
+        """
+        key = tuple(sorted((int(lay), int(w), int(sp)) for lay, w, sp in layer_specs))
+        ans = self._derived.get(key, None)
+        if ans is None:
+            ans = self.__class__.__new__(self.__class__)
+            ans._tech_info = self._tech_info
+            ans._bot_layer = self._bot_layer
+            ans._bot_dir = self._bot_dir
+            ans._w_tracks = self._w_tracks.copy()
+            ans._sp_tracks = self._sp_tracks.copy()
+            ans._derived = {}
+            for lay_id, w, sp in key:
+                ans._w_tracks[lay_id] = w
+                ans._sp_tracks[lay_id] = sp
+            self._derived[key] = ans
+        return ans
+
+    def _to_unit(self, val, unit_mode):
+        # type: (Union[float, int], bool) -> int
+        if unit_mode:
+            return int(round(val))
+        return int(round(val / self.resolution))
+
+    def _from_unit(self, val, unit_mode):
+        # type: (int, bool) -> Union[float, int]
+        return val if unit_mode else val * self.resolution
+
+    def get_direction(self, layer_id):
+        # type: (int) -> str
+        if (layer_id - self._bot_layer) % 2 == 0:
+            return self._bot_dir
+        return 'y' if self._bot_dir == 'x' else 'x'
+
+    def get_track_pitch(self, layer_id, unit_mode=False):
+        # type: (int, bool) -> Union[float, int]
+        return self._from_unit(self._w_tracks[layer_id] + self._sp_tracks[layer_id], unit_mode)
+
+    def get_track_width(self, layer_id, width_ntr, unit_mode=False):
+        # type: (int, int, bool) -> Union[float, int]
+        pitch = self._w_tracks[layer_id] + self._sp_tracks[layer_id]
+        return self._from_unit(self._w_tracks[layer_id] + (width_ntr - 1) * pitch, unit_mode)
+
+    def get_min_length(self, layer_id, width_ntr, unit_mode=False):
+        # type: (int, int, bool) -> Union[float, int]
+        return self._from_unit(2 * self.get_track_pitch(layer_id, unit_mode=True) *
+                               max(1, width_ntr), unit_mode)
+
+    def get_num_space_tracks(self, layer_id, width_ntr, half_space=False):
+        # type: (int, int, bool) -> TrackType
+        if half_space:
+            return norm_idx(max(1, width_ntr) / 2)
+        return max(1, -(-width_ntr // 2))
+
+    def track_to_coord(self, layer_id, track_idx, unit_mode=False):
+        # type: (int, TrackType, bool) -> Union[float, int]
+        pitch = self.get_track_pitch(layer_id, unit_mode=True)
+        return self._from_unit(int(round((2 * track_idx + 1) * pitch / 2)), unit_mode)
+
+    def get_wire_bounds(self, layer_id, track_idx, width=1, unit_mode=False):
+        # type: (int, TrackType, int, bool) -> Tuple[Union[float, int], Union[float, int]]
+        center = self.track_to_coord(layer_id, track_idx, unit_mode=True)
+        half_w = self.get_track_width(layer_id, width, unit_mode=True) // 2
+        return (self._from_unit(center - half_w, unit_mode),
+                self._from_unit(center + half_w, unit_mode))
+
+    def coord_to_nearest_track(self, layer_id, coord, half_track=False, mode=0,
+                               unit_mode=False):
+        # type: (int, Union[float, int], bool, int, bool) -> TrackType
+        """Returns the track nearest to the given coordinate.
+
+        mode is 0 for the nearest track, 1/-1 for the nearest track above/below or at the
+        coordinate, and 2/-2 for the nearest track strictly above/below the coordinate.
+        """
+        coord = self._to_unit(coord, unit_mode)
+        pitch = self.get_track_pitch(layer_id, unit_mode=True)
+        # coordinate in half-track units
+        htr = Fraction(2 * coord - pitch, pitch)
+        step = 1 if half_track else 2
+        val = htr / step
+        if mode == 0:
+            ans = math.floor(val + Fraction(1, 2))
+        elif mode == 1:
+            ans = math.ceil(val)
+        elif mode == 2:
+            ans = math.floor(val) + 1
+        elif mode == -1:
+            ans = math.floor(val)
+        elif mode == -2:
+            ans = math.ceil(val) - 1
+        else:
+            raise ValueError('Unsupported mode: %d' % mode)
+        return norm_idx(Fraction(ans * step, 2))
+
+    def coord_to_track(self, layer_id, coord, unit_mode=False):
+        # type: (int, Union[float, int], bool) -> TrackType
+        return self.coord_to_nearest_track(layer_id, coord, half_track=True, mode=0,
+                                           unit_mode=unit_mode)
+
+    def find_next_track(self, layer_id, coord, tr_width=1, half_track=False, mode=1,
+                        unit_mode=False):
+        # type: (int, Union[float, int], int, bool, int, bool) -> TrackType
+        return self.coord_to_nearest_track(layer_id, coord, half_track=half_track,
+                                           mode=1 if mode > 0 else -1, unit_mode=unit_mode)
+
+    def get_middle_track(self, tr1, tr2, round_up=False):
+        # type: (TrackType, TrackType, bool) -> TrackType
+        tot = int(round(2 * (tr1 + tr2)))
+        if tot % 2 == 1:
+            tot += 1 if round_up else -1
+        return norm_idx(Fraction(tot, 4))
+
+    def transform_track(self, layer_id, track_idx, delta, flip):
+        # type: (int, TrackType, int, bool) -> TrackType
+        """Returns the track index after mirroring (if flip is True) and shifting by delta."""
+        coord = self.track_to_coord(layer_id, track_idx, unit_mode=True)
+        coord = delta - coord if flip else coord + delta
+        return self.coord_to_track(layer_id, coord, unit_mode=True)
+
+
+class TrackManager(object):
+    """Computes track locations from track type width and spacing dictionaries.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    tr_widths : Dict[str, Dict[int, int]]
+        the track width dictionary.
+    tr_spaces : Dict[Any, Dict[int, TrackType]]
+        the track spacing dictionary.  Keys are track types or tuples of two track types.
+    half_space : bool
+        True to allow half-integer spacing.
+    """
+
+    def __init__(self, grid, tr_widths, tr_spaces, half_space=False):
+        # type: (RoutingGrid, Dict[str, Dict[int, int]], Dict[Any, Any], bool) -> None
+        self._grid = grid
+        self._tr_widths = tr_widths
+        self._tr_spaces = tr_spaces
+        self._half_space = half_space
+
+    @property
+    def grid(self):
+        # type: () -> RoutingGrid
+        return self._grid
+
+    @property
+    def half_space(self):
+        # type: () -> bool
+        return self._half_space
+
+    def get_width(self, layer_id, track_type):
+        # type: (int, Union[str, int]) -> int
+        if isinstance(track_type, int):
+            return track_type
+        if track_type not in self._tr_widths:
+            return 1
+        return self._tr_widths[track_type].get(layer_id, 1)
+
+    def _get_type_space(self, layer_id, track_type):
+        # type: (int, Union[str, int]) -> Optional[TrackType]
+        sp_dict = self._tr_spaces.get(track_type, None)
+        if sp_dict is None:
+            return None
+        return sp_dict.get(layer_id, None)
+
+    def get_space(self, layer_id, type_tuple):
+        # type: (int, Union[str, int, Tuple[Union[str, int], Union[str, int]]]) -> TrackType
+        """Returns the track spacing between the given track types."""
+        if isinstance(type_tuple, tuple):
+            for key in (type_tuple, (type_tuple[1], type_tuple[0])):
+                if key in self._tr_spaces:
+                    sp = self._tr_spaces[key].get(layer_id, None)
+                    if sp is not None:
+                        return sp
+            sp_list = [self._get_type_space(layer_id, name) for name in type_tuple]
+            sp_list = [sp for sp in sp_list if sp is not None]
+            if sp_list:
+                return max(sp_list)
+            width = max(self.get_width(layer_id, name) for name in type_tuple)
+        else:
+            sp = self._get_type_space(layer_id, type_tuple)
+            if sp is not None:
+                return sp
+            width = self.get_width(layer_id, type_tuple)
+        return self._grid.get_num_space_tracks(layer_id, width, half_space=self._half_space)
+
+    def place_wires(self, layer_id, name_list, start_idx=0):
+        # type: (int, Sequence[Union[str, int]], TrackType) -> Tuple[TrackType, List[TrackType]]
+        """Places the given wires next to each other.
+
+        Returns
+        -------
+        num_tracks : TrackType
+            the total number of tracks used.
+        idx_list : List[TrackType]
+            the center track index of each wire.
+        """
+        num_tracks = Fraction(0)
+        idx_list = []
+        prev_type = None
+        for name in name_list:
+            cur_width = self.get_width(layer_id, name)
+            if prev_type is not None:
+                sp = self.get_space(layer_id, (prev_type, name))
+                num_tracks += Fraction(sp).limit_denominator(2)
+            idx_list.append(norm_idx(start_idx + num_tracks + Fraction(cur_width - 1, 2)))
+            num_tracks += cur_width
+            prev_type = name
+        return norm_idx(num_tracks), idx_list
+
+    def align_wires(self, layer_id, name_list, tot_ntr, alignment=0, start_idx=0):
+        # type: (int, Sequence[Union[str, int]], TrackType, int, int) -> List[TrackType]
+        """Places the given wires within tot_ntr tracks.
+
+        alignment is -1 to align to the bottom, 0 to center, and 1 to align to the top.
+        """
+        num_tracks, idx_list = self.place_wires(layer_id, name_list, start_idx=start_idx)
+        extra = Fraction(tot_ntr).limit_denominator(2) - Fraction(num_tracks).limit_denominator(2)
+        if extra < 0:
+            raise ValueError('Cannot fit %d wires in %s tracks.' % (len(name_list), tot_ntr))
+        if alignment == 0:
+            if self._half_space:
+                offset = Fraction(math.floor(extra), 2)
+            else:
+                offset = Fraction(math.floor(extra / 2))
+        elif alignment < 0:
+            offset = Fraction(0)
+        else:
+            offset = extra
+        return [norm_idx(idx + offset) for idx in idx_list]
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the synthetic technology and project classes of the headless BAG stand-in.
+"""
+
+from typing import Dict, Any, List, Tuple, Optional, Type
+
+import copy
+
+# the default synthetic technology parameters.  All lengths are in resolution units.
+_default_tech_params = dict(
+    resolution=0.001,
+    layout_unit=1.0e-6,
+    # laygo technology: connection layer, column pitch, substrate columns and
+    # boundary sizes.
+    laygo=dict(
+        conn_layer=1,
+        col_width=20,
+        conn_width=10,
+        sub_columns=2,
+        end_width=20,
+        end_height=40,
+    ),
+    # analog technology: minimum finger separation, substrate row height and
+    # transistor row height in number of horizontal tracks.
+    analog=dict(
+        min_fg_sep=2,
+        sub_ntr=2,
+        mos_ntr=4,
+        gr_ntr=2,
+    ),
+    # via enclosure on each side of a via, per layer.
+    via_enc=5,
+    # (layer ID, width, space) of routing layers below the user routing grid.
+    grid_layers=[(1, 10, 10), (2, 10, 10)],
+)
+
+
+class TechInfo(object):
+    """A synthetic technology.
+
+    Layer ``n`` is named ``M<n>`` with purpose ``drawing``; pins are drawn on the ``pin``
+    purpose.  The via between layers ``n`` and ``n + 1`` is named ``V<n>``.
+
+    Parameters
+    ----------
+    tech_params : Optional[Dict[str, Any]]
+        technology parameters overriding the default synthetic technology.
+    """
+
+    def __init__(self, tech_params=None):
+        # type: (Optional[Dict[str, Any]]) -> None
+        self.tech_params = copy.deepcopy(_default_tech_params)
+        if tech_params:
+            for key, val in tech_params.items():
+                if isinstance(val, dict) and isinstance(self.tech_params.get(key, None), dict):
+                    self.tech_params[key].update(val)
+                else:
+                    self.tech_params[key] = val
+
+    @property
+    def resolution(self):
+        # type: () -> float
+        return self.tech_params['resolution']
+
+    @property
+    def layout_unit(self):
+        # type: () -> float
+        return self.tech_params['layout_unit']
+
+    def get_layer_name(self, layer_id):
+        # type: (int) -> str
+        return 'M%d' % layer_id
+
+    def get_layer_purpose(self, layer_id, pin=False):
+        # type: (int, bool) -> Tuple[str, str]
+        return self.get_layer_name(layer_id), 'pin' if pin else 'drawing'
+
+    def get_via_id(self, bot_layer, top_layer):
+        # type: (str, str) -> str
+        return 'V%s' % bot_layer[1:]
+
+    def get_layer_map(self):
+        # type: () -> Dict[Tuple[str, str], Tuple[int, int]]
+        """Returns the GDS layer map of all routing layers, from layer 0 to layer 15."""
+        ans = {}
+        for lay_id in range(16):
+            name = self.get_layer_name(lay_id)
+            ans[(name, 'drawing')] = (10 + 2 * lay_id, 0)
+            ans[(name, 'pin')] = (10 + 2 * lay_id, 2)
+            ans[('V%d' % lay_id, 'drawing')] = (11 + 2 * lay_id, 0)
+        ans[('prBoundary', 'drawing')] = (235, 0)
+        ans[('prBoundary', 'boundary')] = (235, 1)
+        return ans
+
+    def get_via_map(self):
+        # type: () -> Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]
+        """Returns the (bottom, cut, top) layer/purpose pairs of all vias."""
+        return {'V%d' % lay_id: (self.get_layer_purpose(lay_id), ('V%d' % lay_id, 'drawing'),
+                                 self.get_layer_purpose(lay_id + 1))
+                for lay_id in range(15)}
+
+
+class BagProject(object):
+    """A BAG project without a Virtuoso connection.
+
+    Layouts given to :meth:`instantiate_layout` are kept in memory in :attr:`layout_libs`.
+
+    Parameters
+    ----------
+    tech_info : Optional[TechInfo]
+        the technology information object.  Defaults to the synthetic technology.
+    """
+
+    def __init__(self, tech_info=None):
+        # type: (Optional[TechInfo]) -> None
+        self.tech_info = tech_info or TechInfo()
+        self.layout_libs = {}  # type: Dict[str, List[Any]]
+
+    def instantiate_layout(self, lib_name, content_list, debug=False):
+        # type: (str, List[Any], bool) -> None
+        """Records the given layout contents in the given library."""
+        lib_list = self.layout_libs.setdefault(lib_name, [])
+        name_set = set(content[0] for content in content_list)
+        lib_list[:] = [content for content in lib_list if content[0] not in name_set]
+        lib_list.extend(content_list)
+
+    def generate_cell(self, specs, temp_cls, gen_lay=True, gen_sch=False, run_lvs=False,
+                      run_rcx=False, debug=False, **kwargs):
+        # type: (Dict[str, Any], Type, bool, bool, bool, bool, bool, **Any) -> Any
+        """Draws the layout of the cell described by the given specification dictionary.
+
+        Only layout generation is supported.
+
+        Returns
+        -------
+        master : TemplateBase
+            the top level master.
+        """
+        from .routing import RoutingGrid
+        from .template import TemplateDB
+
+        if gen_sch or run_lvs or run_rcx:
+            raise ValueError('Only layout generation is supported without BAG.')
+
+        grid_specs = specs['routing_grid']
+        grid = RoutingGrid(self.tech_info, grid_specs['layers'], grid_specs['spaces'],
+                           grid_specs['widths'], grid_specs['bot_dir'])
+        impl_lib = specs['impl_lib']
+        temp_db = TemplateDB('template_libs.def', grid, impl_lib, use_cybagoa=False)
+        master = temp_db.new_template(params=specs['params'], temp_cls=temp_cls, debug=debug)
+        if gen_lay:
+            temp_db.batch_layout(self, [master], [specs['impl_cell']], debug=debug)
+        return master
@@ -0,0 +1,986 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains the template and template database classes of the headless BAG stand-in.
+
+Layout geometries are recorded in memory, and :meth:`TemplateBase.get_content` returns them in
+the same format as BAG's non-cybagoa layout content.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, Set, Tuple, List, Iterable, Union, Optional, \
+    Callable, Type
+
+import abc
+from collections import OrderedDict, Counter
+
+from .routing import TrackID, WireArray, flip_orient, compose_orient
+
+if TYPE_CHECKING:
+    from .routing import RoutingGrid
+    from .tech import BagProject
+
+Box = Tuple[int, int, int, int]
+LayerPurp = Tuple[str, str]
+Content = Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]],
+                List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]],
+                List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def to_immutable_id(val):
+    # type: (Any) -> Any
+    """Returns a hashable identifier of the given parameter value."""
+    if val is None or isinstance(val, (str, int, float, bool, complex)):
+        return val
+    if hasattr(val, 'get_immutable_key'):
+        return val.get_immutable_key()
+    if isinstance(val, dict):
+        try:
+            keys = sorted(val.keys())
+        except TypeError:
+            keys = sorted(val.keys(), key=repr)
+        return tuple((key, to_immutable_id(val[key])) for key in keys)
+    if isinstance(val, (list, tuple)):
+        return tuple(to_immutable_id(item) for item in val)
+    if isinstance(val, (set, frozenset)):
+        return tuple(sorted(to_immutable_id(item) for item in val))
+    raise ValueError('Unrecognized value %s with type %s' % (val, type(val)))
+
+
+def _get_new_name(basename, used_names):
+    # type: (str, Set[str]) -> str
+    if basename not in used_names:
+        return basename
+    cnt = 0
+    while True:
+        name = '%s_%d' % (basename, cnt)
+        if name not in used_names:
+            return name
+        cnt += 1
+
+
+class BBox(object):
+    """A bounding box, in resolution units.
+
+    Parameters
+    ----------
+    left : int
+        left coordinate.
+    bottom : int
+        bottom coordinate.
+    right : int
+        right coordinate.
+    top : int
+        top coordinate.
+    resolution : float
+        the layout resolution.
+    """
+
+    def __init__(self, left, bottom, right, top, resolution):
+        # type: (int, int, int, int, float) -> None
+        self._box = (int(left), int(bottom), int(right), int(top))
+        self._res = resolution
+
+    def __repr__(self):
+        return 'BBox(%d, %d, %d, %d)' % self._box
+
+    def get_immutable_key(self):
+        return self.__class__.__name__, self._box
+
+    @property
+    def resolution(self):
+        # type: () -> float
+        return self._res
+
+    @property
+    def box(self):
+        # type: () -> Box
+        return self._box
+
+    @property
+    def left_unit(self):
+        # type: () -> int
+        return self._box[0]
+
+    @property
+    def bottom_unit(self):
+        # type: () -> int
+        return self._box[1]
+
+    @property
+    def right_unit(self):
+        # type: () -> int
+        return self._box[2]
+
+    @property
+    def top_unit(self):
+        # type: () -> int
+        return self._box[3]
+
+    @property
+    def width_unit(self):
+        # type: () -> int
+        return self._box[2] - self._box[0]
+
+    @property
+    def height_unit(self):
+        # type: () -> int
+        return self._box[3] - self._box[1]
+
+    @property
+    def left(self):
+        # type: () -> float
+        return self._box[0] * self._res
+
+    @property
+    def bottom(self):
+        # type: () -> float
+        return self._box[1] * self._res
+
+    @property
+    def right(self):
+        # type: () -> float
+        return self._box[2] * self._res
+
+    @property
+    def top(self):
+        # type: () -> float
+        return self._box[3] * self._res
+
+    def merge(self, other):
+        # type: (BBox) -> BBox
+        b1, b2 = self._box, other.box
+        return BBox(min(b1[0], b2[0]), min(b1[1], b2[1]), max(b1[2], b2[2]), max(b1[3], b2[3]),
+                    self._res)
+
+    def transform(self, loc=(0, 0), orient='R0'):
+        # type: (Tuple[int, int], str) -> BBox
+        return BBox(*transform_box(self._box, loc, orient), resolution=self._res)
+
+
+def transform_box(box, loc, orient):
+    # type: (Box, Tuple[int, int], str) -> Box
+    """Transforms the given (xl, yb, xr, yt) box."""
+    flip_x, flip_y = flip_orient(orient)
+    xl, yb, xr, yt = box
+    dx, dy = loc
+    if flip_x:
+        xl, xr = dx - xr, dx - xl
+    else:
+        xl, xr = xl + dx, xr + dx
+    if flip_y:
+        yb, yt = dy - yt, dy - yb
+    else:
+        yb, yt = yb + dy, yt + dy
+    return xl, yb, xr, yt
+
+
+class Port(object):
+    """A layout port, which contains a list of pin wires on each layer.
+
+    Parameters
+    ----------
+    net_name : str
+        the net name.
+    pin_dict : Dict[int, List[WireArray]]
+        a dictionary from layer ID to pin wires.
+    label : str
+        the label of this port.
+    """
+
+    def __init__(self, net_name, pin_dict, label):
+        # type: (str, Dict[int, List[WireArray]], str) -> None
+        self._net_name = net_name
+        self._pin_dict = pin_dict
+        self._label = label
+
+    @property
+    def net_name(self):
+        # type: () -> str
+        return self._net_name
+
+    @property
+    def label(self):
+        # type: () -> str
+        return self._label
+
+    def add_pin(self, warr):
+        # type: (WireArray) -> None
+        self._pin_dict.setdefault(warr.layer_id, []).append(warr)
+
+    def get_pins(self, layer=-1):
+        # type: (int) -> List[WireArray]
+        """Returns the pin wires on the given layer, or on all layers if layer is negative."""
+        if layer < 0:
+            return [warr for lay in sorted(self._pin_dict.keys())
+                    for warr in self._pin_dict[lay]]
+        return list(self._pin_dict.get(layer, []))
+
+    def transform(self, grid, loc=(0, 0), orient='R0'):
+        # type: (RoutingGrid, Tuple[int, int], str) -> Port
+        pin_dict = {lay: [warr.transform(grid, loc=loc, orient=orient) for warr in warr_list]
+                    for lay, warr_list in self._pin_dict.items()}
+        return Port(self._net_name, pin_dict, self._label)
+
+
+class Instance(object):
+    """An arrayed instance of a layout master.
+
+    Parameters
+    ----------
+    lib_name : str
+        the master library name.
+    master : TemplateBase
+        the master template.
+    loc : Tuple[int, int]
+        the instance location, in resolution units.
+    orient : str
+        the instance orientation.
+    name : str
+        the instance name.
+    nx : int
+        number of columns.
+    ny : int
+        number of rows.
+    spx : int
+        column pitch, in resolution units.
+    spy : int
+        row pitch, in resolution units.
+    """
+
+    def __init__(self, lib_name, master, loc, orient, name, nx=1, ny=1, spx=0, spy=0):
+        # type: (str, TemplateBase, Tuple[int, int], str, str, int, int, int, int) -> None
+        self._lib_name = lib_name
+        self._master = master
+        self._loc = (int(loc[0]), int(loc[1]))
+        self._orient = orient
+        self._name = name
+        self._nx = nx
+        self._ny = ny
+        self._spx = int(spx)
+        self._spy = int(spy)
+        self._port_cache = {}  # type: Dict[Tuple[str, int, int], Port]
+
+    @property
+    def master(self):
+        # type: () -> TemplateBase
+        return self._master
+
+    @property
+    def name(self):
+        # type: () -> str
+        return self._name
+
+    @property
+    def nx(self):
+        # type: () -> int
+        return self._nx
+
+    @property
+    def ny(self):
+        # type: () -> int
+        return self._ny
+
+    @property
+    def spx_unit(self):
+        # type: () -> int
+        return self._spx
+
+    @property
+    def spy_unit(self):
+        # type: () -> int
+        return self._spy
+
+    @property
+    def location_unit(self):
+        # type: () -> Tuple[int, int]
+        return self._loc
+
+    @property
+    def orientation(self):
+        # type: () -> str
+        return self._orient
+
+    @property
+    def bound_box(self):
+        # type: () -> BBox
+        box = self._master.bound_box.transform(loc=self._loc, orient=self._orient)
+        xl, yb, xr, yt = box.box
+        return BBox(xl, yb, xr + (self._nx - 1) * self._spx, yt + (self._ny - 1) * self._spy,
+                    box.resolution)
+
+    def port_names_iter(self):
+        # type: () -> Iterable[str]
+        return self._master.port_names_iter()
+
+    def has_port(self, port_name):
+        # type: (str) -> bool
+        return self._master.has_port(port_name)
+
+    def get_port(self, name='', row=0, col=0):
+        # type: (str, int, int) -> Port
+        key = (name, row, col)
+        port = self._port_cache.get(key, None)
+        if port is None:
+            loc = (self._loc[0] + col * self._spx, self._loc[1] + row * self._spy)
+            master = self._master
+            port = master.get_port(name).transform(master.grid, loc=loc, orient=self._orient)
+            self._port_cache[key] = port
+        return port
+
+    def get_pin(self, name='', row=0, col=0, layer=-1):
+        # type: (str, int, int, int) -> WireArray
+        return self.get_port(name, row, col).get_pins(layer)[0]
+
+    def get_all_port_pins(self, name='', layer=-1):
+        # type: (str, int) -> List[WireArray]
+        return list(self.port_pins_iter(name, layer=layer))
+
+    def port_pins_iter(self, port_name, layer=-1):
+        # type: (str, int) -> Iterable[WireArray]
+        for col in range(self._nx):
+            for row in range(self._ny):
+                for warr in self.get_port(port_name, row, col).get_pins(layer):
+                    yield warr
+
+    def get_content(self, rename_fun):
+        # type: (Callable[[str], str]) -> Dict[str, Any]
+        res = self._master.grid.resolution
+        return dict(
+            lib=self._lib_name,
+            cell=rename_fun(self._master.cell_name),
+            view='layout',
+            name=self._name,
+            loc=[self._loc[0] * res, self._loc[1] * res],
+            orient=self._orient,
+            num_rows=self._ny,
+            num_cols=self._nx,
+            sp_rows=self._spy * res,
+            sp_cols=self._spx * res,
+            params=None,
+            master_key=self._master.key,
+        )
+
+
+class BagLayout(object):
+    """The in-memory layout geometries of a template, in resolution units.
+
+    Parameters
+    ----------
+    resolution : float
+        the layout resolution.
+    """
+
+    def __init__(self, resolution):
+        # type: (float) -> None
+        self._res = resolution
+        self.inst_list = []  # type: List[Instance]
+        # (layer, box, nx, ny, spx, spy)
+        self.rect_list = []  # type: List[Tuple[LayerPurp, Box, int, int, int, int]]
+        # (via_id, loc, cut_w, cut_h, enc1, enc2)
+        self.via_list = []  # type: List[Tuple[str, Tuple[int, int], int, int, Box, Box]]
+        # (net_name, pin_name, label, layer, box)
+        self.pin_list = []  # type: List[Tuple[str, str, str, LayerPurp, Box]]
+        self.path_list = []  # type: List[Dict[str, Any]]
+        self.blockage_list = []  # type: List[Dict[str, Any]]
+        # (boundary type, box)
+        self.boundary_list = []  # type: List[Tuple[str, Box]]
+        self.polygon_list = []  # type: List[Dict[str, Any]]
+
+    def get_content(self, cell_name, rename_fun):
+        # type: (str, Callable[[str], str]) -> Content
+        res = self._res
+
+        def _bbox(box):
+            return [[box[0] * res, box[1] * res], [box[2] * res, box[3] * res]]
+
+        inst_list = [inst.get_content(rename_fun) for inst in self.inst_list]
+        rect_list = [dict(layer=list(lay), bbox=_bbox(box), arr_nx=nx, arr_ny=ny,
+                          arr_spx=spx * res, arr_spy=spy * res)
+                     for lay, box, nx, ny, spx, spy in self.rect_list]
+        via_list = [dict(id=via_id, loc=[loc[0] * res, loc[1] * res], orient='R0', num_rows=1,
+                         num_cols=1, sp_rows=0.0, sp_cols=0.0, cut_width=cut_w * res,
+                         cut_height=cut_h * res, enc1=[val * res for val in enc1],
+                         enc2=[val * res for val in enc2], arr_nx=1, arr_ny=1, arr_spx=0.0,
+                         arr_spy=0.0)
+                    for via_id, loc, cut_w, cut_h, enc1, enc2 in self.via_list]
+        pin_list = [dict(net_name=net, pin_name=pin, label=label, layer=list(lay),
+                         bbox=_bbox(box), make_rect=True)
+                    for net, pin, label, lay, box in self.pin_list]
+        bnd_list = [dict(type=bnd_type, points=[[box[0] * res, box[1] * res],
+                                                 [box[2] * res, box[1] * res],
+                                                 [box[2] * res, box[3] * res],
+                                                 [box[0] * res, box[3] * res]])
+                    for bnd_type, box in self.boundary_list]
+        return (cell_name, inst_list, rect_list, via_list, pin_list, list(self.path_list),
+                list(self.blockage_list), bnd_list, list(self.polygon_list))
+
+
+class TemplateBase(object, metaclass=abc.ABCMeta):
+    """The base class of all layout templates.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    lib_name : str
+        the layout library name.
+    params : Dict[str, Any]
+        the parameter values.
+    used_names : Set[str]
+        a set of already used cell names.
+    **kwargs
+        optional parameters.  Only grid is supported.
+    """
+
+    def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
+        # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
+        self._temp_db = temp_db
+        self._lib_name = lib_name
+        self._used_names = used_names
+        self._grid = kwargs.get('grid', None) or temp_db.grid
+        self._params = self._process_params(params)
+        self._cell_name = None  # type: Optional[str]
+        self._children = set()  # type: Set[Any]
+        self._ports = OrderedDict()  # type: Dict[str, Port]
+        self._layout = BagLayout(self._grid.resolution)
+        self._bbox = None  # type: Optional[BBox]
+        self._array_box = None  # type: Optional[BBox]
+        self._finalized = False
+        self._key = self.compute_unique_key()
+
+    @classmethod
+    def get_params_info(cls):
+        # type: () -> Dict[str, str]
+        return {}
+
+    @classmethod
+    def get_default_param_values(cls):
+        # type: () -> Dict[str, Any]
+        return {}
+
+    @classmethod
+    def to_immutable_id(cls, val):
+        # type: (Any) -> Any
+        return to_immutable_id(val)
+
+    @abc.abstractmethod
+    def draw_layout(self):
+        # type: () -> None
+        pass
+
+    def _process_params(self, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        default_params = self.get_default_param_values()
+        ans = {}
+        for key, desc in self.get_params_info().items():
+            if key in params:
+                ans[key] = params[key]
+            elif key in default_params:
+                ans[key] = default_params[key]
+            else:
+                raise ValueError('Parameter %s not specified.  Description:\n%s' % (key, desc))
+        return ans
+
+    def compute_unique_key(self):
+        # type: () -> Any
+        cls = self.__class__
+        return cls.__module__, cls.__name__, self.to_immutable_id(self._params)
+
+    def get_layout_basename(self):
+        # type: () -> str
+        return self.__class__.__name__
+
+    def get_master_basename(self):
+        # type: () -> str
+        return self.get_layout_basename()
+
+    def update_master_info(self):
+        # type: () -> None
+        """Assigns a cell name that is unique in the current template database."""
+        self._cell_name = _get_new_name(self.get_master_basename(), self._used_names)
+        self._used_names.add(self._cell_name)
+
+    def finalize(self):
+        # type: () -> None
+        if self._bbox is None:
+            self._bbox = self._compute_bound_box()
+        if self._array_box is None:
+            self._array_box = self._bbox
+        self._layout.boundary_list.append(('PR', self._bbox.box))
+        self._finalized = True
+
+    def _compute_bound_box(self):
+        # type: () -> BBox
+        res = self._grid.resolution
+        box = None
+        for _, rbox, nx, ny, spx, spy in self._layout.rect_list:
+            cur = BBox(rbox[0], rbox[1], rbox[2] + (nx - 1) * spx, rbox[3] + (ny - 1) * spy,
+                       res)
+            box = cur if box is None else box.merge(cur)
+        for inst in self._layout.inst_list:
+            cur = inst.bound_box
+            box = cur if box is None else box.merge(cur)
+        return box or BBox(0, 0, 0, 0, res)
+
+    @property
+    def template_db(self):
+        # type: () -> TemplateDB
+        return self._temp_db
+
+    @property
+    def params(self):
+        # type: () -> Dict[str, Any]
+        return self._params
+
+    @property
+    def key(self):
+        # type: () -> Any
+        return self._key
+
+    @property
+    def cell_name(self):
+        # type: () -> Optional[str]
+        return self._cell_name
+
+    @property
+    def children(self):
+        # type: () -> Set[Any]
+        return self._children
+
+    @property
+    def finalized(self):
+        # type: () -> bool
+        return self._finalized
+
+    @property
+    def grid(self):
+        # type: () -> RoutingGrid
+        return self._grid
+
+    @grid.setter
+    def grid(self, new_grid):
+        # type: (RoutingGrid) -> None
+        if self._finalized:
+            raise RuntimeError('Template is finalized.')
+        self._grid = new_grid
+
+    @property
+    def bound_box(self):
+        # type: () -> Optional[BBox]
+        return self._bbox
+
+    @bound_box.setter
+    def bound_box(self, new_bbox):
+        # type: (BBox) -> None
+        self._bbox = new_bbox
+
+    @property
+    def array_box(self):
+        # type: () -> Optional[BBox]
+        return self._array_box
+
+    @array_box.setter
+    def array_box(self, new_box):
+        # type: (BBox) -> None
+        self._array_box = new_box
+
+    def get_content(self, lib_name, rename_fun=None):
+        # type: (str, Optional[Callable[[str], str]]) -> Content
+        """Returns the layout content of this template, in layout units."""
+        if rename_fun is None:
+            def rename_fun(name):
+                return name
+        return self._layout.get_content(rename_fun(self._cell_name), rename_fun)
+
+    def new_template(self, lib_name='', temp_name='', params=None, temp_cls=None, debug=False,
+                     **kwargs):
+        # type: (str, str, Optional[Dict[str, Any]], Optional[Type], bool, **Any) -> TemplateBase
+        return self._temp_db.new_template(lib_name=lib_name, temp_name=temp_name, params=params,
+                                          temp_cls=temp_cls, debug=debug, **kwargs)
+
+    def _to_unit(self, val, unit_mode):
+        # type: (Union[float, int], bool) -> int
+        if unit_mode:
+            return int(round(val))
+        return int(round(val / self._grid.resolution))
+
+    # ------------------------------------------------------------------------------------------
+    # ports
+    # ------------------------------------------------------------------------------------------
+
+    def port_names_iter(self):
+        # type: () -> Iterable[str]
+        return iter(self._ports.keys())
+
+    def has_port(self, port_name):
+        # type: (str) -> bool
+        return port_name in self._ports
+
+    def get_port(self, name=''):
+        # type: (str) -> Port
+        if not name:
+            if len(self._ports) != 1:
+                raise ValueError('Template has %d ports; name must be given.' % len(self._ports))
+            return next(iter(self._ports.values()))
+        return self._ports[name]
+
+    def add_pin(self, net_name, wire_arr_list, label='', show=True, edge_mode=0):
+        # type: (str, Union[WireArray, List[WireArray]], str, bool, int) -> None
+        self._temp_db.stats['add_pin'] += 1
+        if isinstance(wire_arr_list, WireArray):
+            wire_arr_list = [wire_arr_list]
+        label = label or net_name
+        port = self._ports.get(net_name, None)
+        if port is None:
+            self._ports[net_name] = port = Port(net_name, {}, label)
+        tech_info = self._grid.tech_info
+        for warr in wire_arr_list:
+            port.add_pin(warr)
+            if show:
+                lay = tech_info.get_layer_purpose(warr.layer_id, pin=True)
+                for box in warr.get_bbox_list(self._grid):
+                    self._layout.pin_list.append((net_name, net_name, label, lay, box))
+
+    def reexport(self, port, net_name='', label='', show=True, **kwargs):
+        # type: (Port, str, str, bool, **Any) -> None
+        net_name = net_name or port.net_name
+        if not label:
+            label = port.label if net_name == port.net_name else net_name
+        self.add_pin(net_name, port.get_pins(), label=label, show=show)
+
+    # ------------------------------------------------------------------------------------------
+    # geometries
+    # ------------------------------------------------------------------------------------------
+
+    def add_instance(self, master, inst_name=None, loc=(0, 0), orient='R0', nx=1, ny=1, spx=0,
+                     spy=0, unit_mode=False):
+        # type: (...) -> Instance
+        self._temp_db.stats['add_instance'] += 1
+        if inst_name is None:
+            inst_name = 'X%d' % len(self._layout.inst_list)
+        loc = (self._to_unit(loc[0], unit_mode), self._to_unit(loc[1], unit_mode))
+        inst = Instance(self._lib_name, master, loc, orient, inst_name, nx=nx, ny=ny,
+                        spx=self._to_unit(spx, unit_mode), spy=self._to_unit(spy, unit_mode))
+        self._layout.inst_list.append(inst)
+        self._children.add(master.key)
+        return inst
+
+    def add_rect(self, layer, box, nx=1, ny=1, spx=0, spy=0):
+        # type: (LayerPurp, Box, int, int, int, int) -> None
+        """Adds a rectangle.  All dimensions are in resolution units."""
+        self._layout.rect_list.append((tuple(layer), tuple(box), nx, ny, spx, spy))
+
+    def _draw_wire(self, warr):
+        # type: (WireArray) -> None
+        grid = self._grid
+        tid = warr.track_id
+        layer_id = tid.layer_id
+        lay = grid.tech_info.get_layer_purpose(layer_id)
+        box = warr.get_bbox_list(grid)[0]
+        if tid.num > 1:
+            sp = int(round(tid.pitch * grid.get_track_pitch(layer_id, unit_mode=True)))
+            if grid.get_direction(layer_id) == 'x':
+                self.add_rect(lay, box, ny=tid.num, spy=sp)
+            else:
+                self.add_rect(lay, box, nx=tid.num, spx=sp)
+        else:
+            self.add_rect(lay, box)
+
+    def _draw_vias(self, warr1, warr2):
+        # type: (WireArray, WireArray) -> None
+        """Draws vias at all intersections of the given wires on different layers."""
+        grid = self._grid
+        tech_info = grid.tech_info
+        enc = tech_info.tech_params['via_enc']
+        lay1, lay2 = warr1.layer_id, warr2.layer_id
+        if lay1 > lay2:
+            warr1, warr2 = warr2, warr1
+            lay1, lay2 = lay2, lay1
+        for box1 in warr1.get_bbox_list(grid):
+            for box2 in warr2.get_bbox_list(grid):
+                xl, yb = max(box1[0], box2[0]), max(box1[1], box2[1])
+                xr, yt = min(box1[2], box2[2]), min(box1[3], box2[3])
+                if xl > xr or yb > yt:
+                    continue
+                loc = ((xl + xr) // 2, (yb + yt) // 2)
+                enc_box = (enc, enc, enc, enc)
+                for bot_lay in range(lay1, lay2):
+                    via_id = tech_info.get_via_id(tech_info.get_layer_name(bot_lay),
+                                                  tech_info.get_layer_name(bot_lay + 1))
+                    self._layout.via_list.append((via_id, loc, xr - xl, yt - yb, enc_box,
+                                                  enc_box))
+
+    def _get_track_span(self, track_id):
+        # type: (TrackID) -> Tuple[int, int]
+        """Returns the coordinate span of the given tracks, perpendicular to the tracks."""
+        grid = self._grid
+        lower = upper = None
+        for idx in track_id:
+            tl, tu = grid.get_wire_bounds(track_id.layer_id, idx, width=track_id.width,
+                                          unit_mode=True)
+            lower = tl if lower is None else min(lower, tl)
+            upper = tu if upper is None else max(upper, tu)
+        return lower, upper
+
+    def _apply_min_len(self, layer_id, width, lower, upper, min_len_mode):
+        # type: (int, int, int, int, Optional[int]) -> Tuple[int, int]
+        if min_len_mode is None:
+            return lower, upper
+        min_len = self._grid.get_min_length(layer_id, width, unit_mode=True)
+        extra = min_len - (upper - lower)
+        if extra <= 0:
+            return lower, upper
+        if min_len_mode < 0:
+            return lower - extra, upper
+        if min_len_mode > 0:
+            return lower, upper + extra
+        return lower - extra // 2, upper + extra - extra // 2
+
+    def add_wires(self, layer_id, track_idx, lower, upper, width=1, num=1, pitch=0,
+                  unit_mode=False):
+        # type: (int, Union[float, int], Any, Any, int, int, Union[float, int], bool) -> WireArray
+        self._temp_db.stats['add_wires'] += 1
+        warr = WireArray(TrackID(layer_id, track_idx, width=width, num=num, pitch=pitch),
+                         self._to_unit(lower, unit_mode), self._to_unit(upper, unit_mode),
+                         res=self._grid.resolution, unit_mode=True)
+        self._draw_wire(warr)
+        return warr
+
+    def extend_wires(self, warr_list, lower=None, upper=None, unit_mode=False,
+                     min_len_mode=None):
+        # type: (...) -> List[WireArray]
+        self._temp_db.stats['extend_wires'] += 1
+        if isinstance(warr_list, WireArray):
+            warr_list = [warr_list]
+        ans = []
+        for warr in warr_list:
+            wl, wu = warr.lower_unit, warr.upper_unit
+            if lower is not None:
+                wl = min(wl, self._to_unit(lower, unit_mode))
+            if upper is not None:
+                wu = max(wu, self._to_unit(upper, unit_mode))
+            wl, wu = self._apply_min_len(warr.layer_id, warr.width, wl, wu, min_len_mode)
+            new_warr = WireArray(warr.track_id, wl, wu, res=warr.resolution, unit_mode=True)
+            if wl != warr.lower_unit or wu != warr.upper_unit:
+                self._draw_wire(new_warr)
+            ans.append(new_warr)
+        return ans
+
+    def connect_wires(self, wire_arr_list, lower=None, upper=None, debug=False,
+                      unit_mode=False):
+        # type: (Union[WireArray, List[WireArray]], Any, Any, bool, bool) -> List[WireArray]
+        """Connects all given wires on the same layer, and extends them to the same span."""
+        self._temp_db.stats['connect_wires'] += 1
+        if isinstance(wire_arr_list, WireArray):
+            wire_arr_list = [wire_arr_list]
+        if not wire_arr_list:
+            return []
+        layer_id = wire_arr_list[0].layer_id
+        wl = min(warr.lower_unit for warr in wire_arr_list)
+        wu = max(warr.upper_unit for warr in wire_arr_list)
+        if lower is not None:
+            wl = min(wl, self._to_unit(lower, unit_mode))
+        if upper is not None:
+            wu = max(wu, self._to_unit(upper, unit_mode))
+        track_table = {}  # type: Dict[Union[float, int], int]
+        for warr in wire_arr_list:
+            if warr.layer_id != layer_id:
+                raise ValueError('All wires must be on layer %d.' % layer_id)
+            for idx in warr.track_id:
+                track_table[idx] = max(track_table.get(idx, 0), warr.width)
+
+        res = self._grid.resolution
+        ans = []
+        for idx in sorted(track_table.keys()):
+            warr = WireArray(TrackID(layer_id, idx, width=track_table[idx]), wl, wu, res=res,
+                             unit_mode=True)
+            self._draw_wire(warr)
+            ans.append(warr)
+        return ans
+
+    def connect_to_tracks(self, wire_arr_list, track_id, wire_lower=None, wire_upper=None,
+                          track_lower=None, track_upper=None, unit_mode=False,
+                          min_len_mode=None, return_wires=False, debug=False):
+        # type: (...) -> Union[Optional[WireArray], Tuple[Optional[WireArray], List[WireArray]]]
+        """Connects the given wires to the given tracks on the adjacent layer."""
+        self._temp_db.stats['connect_to_tracks'] += 1
+        if isinstance(wire_arr_list, WireArray):
+            wire_arr_list = [wire_arr_list]
+        else:
+            wire_arr_list = list(wire_arr_list)
+        if not wire_arr_list:
+            return (None, []) if return_wires else None
+
+        res = self._grid.resolution
+        tr_lower, tr_upper = self._get_track_span(track_id)
+        span_lower = span_upper = None
+        new_wires = []
+        for warr in wire_arr_list:
+            wl, wu = self._get_track_span(warr.track_id)
+            span_lower = wl if span_lower is None else min(span_lower, wl)
+            span_upper = wu if span_upper is None else max(span_upper, wu)
+            lower = min(warr.lower_unit, tr_lower)
+            upper = max(warr.upper_unit, tr_upper)
+            if wire_lower is not None:
+                lower = min(lower, self._to_unit(wire_lower, unit_mode))
+            if wire_upper is not None:
+                upper = max(upper, self._to_unit(wire_upper, unit_mode))
+            new_warr = WireArray(warr.track_id, lower, upper, res=res, unit_mode=True)
+            if lower != warr.lower_unit or upper != warr.upper_unit:
+                self._draw_wire(new_warr)
+            new_wires.append(new_warr)
+
+        if track_lower is not None:
+            span_lower = min(span_lower, self._to_unit(track_lower, unit_mode))
+        if track_upper is not None:
+            span_upper = max(span_upper, self._to_unit(track_upper, unit_mode))
+        span_lower, span_upper = self._apply_min_len(track_id.layer_id, track_id.width,
+                                                     span_lower, span_upper, min_len_mode)
+        track_warr = WireArray(track_id, span_lower, span_upper, res=res, unit_mode=True)
+        self._draw_wire(track_warr)
+        for warr in new_wires:
+            self._draw_vias(warr, track_warr)
+
+        if return_wires:
+            return track_warr, new_wires
+        return track_warr
+
+    def connect_to_track_wires(self, wire_arr_list, track_wires):
+        # type: (Union[WireArray, List[WireArray]], Union[WireArray, List[WireArray]]) -> Any
+        """Connects the given wires to the given wires on the adjacent layer."""
+        self._temp_db.stats['connect_to_track_wires'] += 1
+        is_list = not isinstance(track_wires, WireArray)
+        if not is_list:
+            track_wires = [track_wires]
+        ans = [self.connect_to_tracks(wire_arr_list, twarr.track_id,
+                                      track_lower=twarr.lower_unit,
+                                      track_upper=twarr.upper_unit, unit_mode=True)
+               for twarr in track_wires]
+        return ans if is_list else ans[0]
+
+
+class TemplateDB(object):
+    """A database of all layout masters of a generation session.
+
+    Parameters
+    ----------
+    lib_defs : str
+        ignored.
+    routing_grid : RoutingGrid
+        the default routing grid.
+    lib_name : str
+        the layout library name.
+    prj : Optional[BagProject]
+        the BAG project, used by :meth:`batch_layout` if no project is given.
+    name_prefix : str
+        prefix of all generated cell names.
+    name_suffix : str
+        suffix of all generated cell names.
+    use_cybagoa : bool
+        ignored.
+    **kwargs
+        ignored.
+    """
+
+    def __init__(self, lib_defs, routing_grid, lib_name, prj=None, name_prefix='',
+                 name_suffix='', use_cybagoa=False, **kwargs):
+        # type: (str, RoutingGrid, str, Optional[BagProject], str, str, bool, **Any) -> None
+        self._grid = routing_grid
+        self._lib_name = lib_name
+        self._prj = prj
+        self._name_prefix = name_prefix
+        self._name_suffix = name_suffix
+        self._used_names = set()  # type: Set[str]
+        self._master_lookup = OrderedDict()  # type: Dict[Any, TemplateBase]
+        # number of masters drawn and of layout method calls.
+        self.stats = Counter()
+
+    @property
+    def grid(self):
+        # type: () -> RoutingGrid
+        return self._grid
+
+    @property
+    def lib_name(self):
+        # type: () -> str
+        return self._lib_name
+
+    def format_cell_name(self, cell_name):
+        # type: (str) -> str
+        return self._name_prefix + cell_name + self._name_suffix
+
+    def find_master(self, key):
+        # type: (Any) -> Optional[TemplateBase]
+        return self._master_lookup.get(key, None)
+
+    def register_master(self, key, master):
+        # type: (Any, TemplateBase) -> None
+        self._master_lookup[key] = master
+
+    def masters_iter(self):
+        # type: () -> Iterable[TemplateBase]
+        return iter(self._master_lookup.values())
+
+    def new_template(self, lib_name='', temp_name='', params=None, temp_cls=None, debug=False,
+                     **kwargs):
+        # type: (str, str, Optional[Dict[str, Any]], Optional[Type], bool, **Any) -> TemplateBase
+        if temp_cls is None:
+            raise ValueError('Template libraries are not supported; temp_cls must be given.')
+        if params is None:
+            params = {}
+
+        master = temp_cls(self, self._lib_name, params, self._used_names, **kwargs)
+        key = master.key
+        test = self.find_master(key)
+        if test is not None:
+            if debug:
+                print('layout master %s already exists' % test.cell_name)
+            return test
+
+        master.draw_layout()
+        master.finalize()
+        master.update_master_info()
+        self.register_master(key, master)
+        self.stats['masters'] += 1
+        if debug:
+            print('layout master %s created' % master.cell_name)
+        return master
+
+    def get_content_list(self, template_list, name_list=None, lib_name=''):
+        # type: (List[TemplateBase], Optional[List[str]], str) -> List[Content]
+        """Returns the layout content of the given masters and all their descendants.
+
+        Children come before their parents.  If name_list is given, the top level masters are
+        renamed to the given names.
+        """
+        lib_name = lib_name or self._lib_name
+        rename_dict = {}
+        if name_list is not None:
+            for master, name in zip(template_list, name_list):
+                rename_dict[master.cell_name] = name
+
+        def rename_fun(name):
+            return rename_dict.get(name, self.format_cell_name(name))
+
+        content_list = []
+        visited = set()
+        stack = [(master, False) for master in reversed(template_list)]
+        while stack:
+            master, done = stack.pop()
+            key = master.key
+            if done:
+                content_list.append(master.get_content(lib_name, rename_fun))
+            elif key not in visited:
+                visited.add(key)
+                stack.append((master, True))
+                for child_key in sorted(master.children, key=repr, reverse=True):
+                    stack.append((self._master_lookup[child_key], False))
+        return content_list
+
+    def batch_layout(self, prj, template_list, name_list=None, lib_name='', debug=False):
+        # type: (Optional[BagProject], List[TemplateBase], Optional[List[str]], str, bool) -> None
+        lib_name = lib_name or self._lib_name
+        content_list = self.get_content_list(template_list, name_list=name_list,
+                                             lib_name=lib_name)
+        prj = prj or self._prj
+        if prj is not None:
+            prj.instantiate_layout(lib_name, content_list, debug=debug)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains abstract views of finished layout masters.
+
+A parent template only needs the bounding box and ports of its children to place and route
+against them; :func:`get_abstract_view` returns these together with the blockages of a master.
+When an abstract store is set with :func:`set_abstract_store`, the layout geometry of every
+child master created by a standard cell template is moved to a temporary spill file as soon as
+the master is finished.  The master keeps its bounding box and ports, and its geometry is read
+back by :func:`get_layout`, or by the template database when the layout is written.  The
+geometry read back is not kept in the master, so it is released as soon as the writer is done
+with it.  Any other access to the geometry of a spilled master raises an error, so geometry is
+never read back behind the caller's back.
+"""
+
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+
+import io
+import tempfile
+
+from bag.layout.template import TemplateBase
+
+from .cache import _MasterPickler, _MasterUnpickler, _get_session_objects
+
+if TYPE_CHECKING:
+    from bag.layout.util import BBox
+    from bag.layout.routing import WireArray
+    from bag.layout.template import TemplateDB
+
+_abstract_store = None  # type: Optional[AbstractStore]
+
+
+def get_abstract_store():
+    # type: () -> Optional[AbstractStore]
+    """Returns the process-wide abstract store, or None if child geometry is kept in memory."""
+    return _abstract_store
+
+
+def set_abstract_store(store):
+    # type: (Optional[AbstractStore]) -> None
+    """Sets the process-wide abstract store.  Use None to keep child geometry in memory."""
+    global _abstract_store
+    _abstract_store = store
+
+
+class AbstractView(object):
+    """The abstract view of a finished layout master.
+
+    Blockages cover the whole bounding box on every layer with pins.
+
+    Parameters
+    ----------
+    master : TemplateBase
+        the finished layout master.
+    """
+
+    __slots__ = ('cell_name', 'bound_box', 'array_box', 'ports', 'blockages')
+
+    def __init__(self, master):
+        # type: (TemplateBase) -> None
+        self.cell_name = master.cell_name  # type: str
+        self.bound_box = master.bound_box  # type: BBox
+        self.array_box = master.array_box  # type: BBox
+        self.ports = {name: master.get_port(name).get_pins()
+                      for name in master.port_names_iter()}  # type: Dict[str, List[WireArray]]
+        pin_layers = sorted({warr.layer_id for warr_list in self.ports.values()
+                             for warr in warr_list})
+        self.blockages = {lay_id: self.bound_box
+                          for lay_id in pin_layers}  # type: Dict[int, BBox]
+
+
+def get_abstract_view(master):
+    # type: (TemplateBase) -> AbstractView
+    """Returns the abstract view of the given finished master.
+
+    The abstract view only uses the bounding box and ports of the master, so the geometry of a
+    spilled master is not read back.
+    """
+    return AbstractView(master)
+
+
+class _SpillPickler(_MasterPickler):
+    """Pickles master geometry, referring to other masters by key."""
+
+    def __init__(self, file, temp_db, master):
+        _MasterPickler.__init__(self, file, _get_session_objects(temp_db))
+        self._master = master
+
+    def persistent_id(self, obj):
+        pid = _MasterPickler.persistent_id(self, obj)
+        if pid is None and obj is not self._master and isinstance(obj, TemplateBase):
+            return 'master', obj.key
+        return pid
+
+
+class _SpillUnpickler(_MasterUnpickler):
+    def __init__(self, file, temp_db):
+        _MasterUnpickler.__init__(self, file, _get_session_objects(temp_db))
+        self._temp_db = temp_db
+
+    def persistent_load(self, pid):
+        if isinstance(pid, tuple):
+            master = self._temp_db.find_master(pid[1])
+            if master is None:
+                raise ValueError('Cannot find spilled child master %s' % (pid[1], ))
+            return master
+        return _MasterUnpickler.persistent_load(self, pid)
+
+
+def _unpickle_layout(layout):
+    # type: (Any) -> Any
+    return layout
+
+
+class _SpilledLayout(object):
+    """Stands in for the layout geometry of a spilled master.
+
+    The geometry is only read back by :meth:`restore` and :meth:`get_content`, which the
+    template database calls once per master when it writes the layout.  Any other attribute
+    access raises a ValueError, so other code that uses the geometry of a spilled master must
+    go through :func:`get_layout`.
+    """
+
+    __slots__ = ('_store', '_temp_db', '_offset', '_size')
+
+    def __init__(self, store, temp_db, offset, size):
+        # type: (AbstractStore, TemplateDB, int, int) -> None
+        self._store = store
+        self._temp_db = temp_db
+        self._offset = offset
+        self._size = size
+
+    def restore(self):
+        # type: () -> Any
+        """Reads the geometry back.  The master keeps referring to the spill file."""
+        return self._store.read(self._temp_db, self._offset, self._size)
+
+    def get_content(self, *args, **kwargs):
+        # type: (*Any, **Any) -> Any
+        """Reads the geometry back once, and returns its layout content."""
+        return self.restore().get_content(*args, **kwargs)
+
+    def __getattr__(self, name):
+        raise ValueError('Cannot access %s of spilled layout geometry; read the geometry '
+                         'with get_layout().' % name)
+
+    def __reduce_ex__(self, protocol):
+        # pickle the geometry itself, e.g. when the master is written to the master cache.
+        return _unpickle_layout, (self.restore(), )
+
+
+class AbstractStore(object):
+    """A spill file for the layout geometry of finished masters.
+
+    Parameters
+    ----------
+    spill_dir : Optional[str]
+        the directory of the spill file.  Defaults to the system temporary directory.  The file
+        is deleted when the store is closed or garbage collected.
+    """
+
+    def __init__(self, spill_dir=None):
+        # type: (Optional[str]) -> None
+        self._file = tempfile.TemporaryFile(dir=spill_dir)
+        self.num_spilled = 0
+        self.num_restored = 0
+        self.spill_size = 0
+
+    def spill(self, temp_db, master):
+        # type: (TemplateDB, TemplateBase) -> bool
+        """Moves the geometry of the given finished master to the spill file.
+
+        Parameters
+        ----------
+        temp_db : TemplateDB
+            the template database containing the master and all of its children.
+        master : TemplateBase
+            the finished master.
+
+        Returns
+        -------
+        spilled : bool
+            False if the geometry of this master is already spilled.
+        """
+        layout = master._layout
+        if isinstance(layout, _SpilledLayout):
+            return False
+
+        buf = io.BytesIO()
+        _SpillPickler(buf, temp_db, master).dump(layout)
+        data = buf.getvalue()
+        self._file.seek(0, io.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(data)
+        master._layout = _SpilledLayout(self, temp_db, offset, len(data))
+        self.num_spilled += 1
+        self.spill_size += len(data)
+        return True
+
+    def read(self, temp_db, offset, size):
+        # type: (TemplateDB, int, int) -> Any
+        """Reads spilled geometry from the spill file."""
+        self._file.seek(offset)
+        data = self._file.read(size)
+        self.num_restored += 1
+        return _SpillUnpickler(io.BytesIO(data), temp_db).load()
+
+    def close(self):
+        # type: () -> None
+        """Closes and deletes the spill file.  Spilled geometry can no longer be read."""
+        self._file.close()
+
+
+def is_spilled(master):
+    # type: (TemplateBase) -> bool
+    """Returns True if the geometry of the given master is in the spill file."""
+    return isinstance(master._layout, _SpilledLayout)
+
+
+def get_layout(master):
+    # type: (TemplateBase) -> Any
+    """Returns the layout geometry of the given master.
+
+    Spilled geometry is read back from the spill file, and is not put back in the master.
+    """
+    layout = master._layout
+    if isinstance(layout, _SpilledLayout):
+        return layout.restore()
+    return layout
@@ -19,6 +19,9 @@ class AnaInvChain(AnalogBase):
 
     This is mainly used so that we can easily put guard ring around the inverter.
 
+    This template is not a standard cell template, so it has no skeleton parameter and is
+    always drawn with full routing.
+
     Parameters
     ----------
     temp_db : :class:`bag.layout.template.TemplateDB`
@@ -71,6 +74,13 @@ class AnaInvChain(AnalogBase):
             show_pins=True,
         )
 
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        """Not supported: the dummy transistor information depends on the drawn layout."""
+        raise NotImplementedError('%s schematic parameters depend on the drawn layout.' %
+                                  cls.__name__)
+
     def draw_layout(self):
         lch = self.params['lch']
         ptap_w = self.params['ptap_w']
@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a persistent, content-addressed cache of finished layout masters.
+
+The cache key of a master is computed from the template class, a canonical digest of the
+parameters, a fingerprint of the routing grid/technology, and a digest of the generator source
+code.  A cached master is stored together with all of its descendants, so that a later
+generation run can rebuild the master hierarchy without calling ``draw_layout``.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, Type
+
+import os
+import io
+import glob
+import pickle
+import inspect
+import hashlib
+import importlib
+import tempfile
+import warnings
+import weakref
+from numbers import Number
+
+from .params import freeze, to_frozen, param_digest
+
+if TYPE_CHECKING:
+    from bag.layout.routing import RoutingGrid
+    from bag.layout.template import TemplateDB, TemplateBase
+
+# change this whenever the format of cache entries changes.
+_CACHE_VERSION = 2
+# packages whose source code is part of every cache key.
+_framework_packages = ('bag', 'abs_templates_ec')
+
+_master_cache = None  # type: Optional[MasterCache]
+_source_digest = None  # type: Optional[str]
+_grid_fp_table = weakref.WeakKeyDictionary()
+_row_info_table = {}  # type: Dict[str, Dict[str, Any]]
+
+
+def get_master_cache():
+    # type: () -> Optional[MasterCache]
+    """Returns the process-wide master cache, or None if caching is disabled."""
+    return _master_cache
+
+
+def set_master_cache(cache):
+    # type: (Optional[MasterCache]) -> None
+    """Sets the process-wide master cache.  Use None to disable caching."""
+    global _master_cache
+    _master_cache = cache
+
+
+def _update_dir_digest(md, root_dir):
+    # type: (Any, str) -> None
+    """Adds the names and contents of all Python files in the given directory to the digest."""
+    for fname in sorted(glob.glob(os.path.join(root_dir, '**', '*.py'), recursive=True)):
+        md.update(os.path.relpath(fname, root_dir).encode('utf-8'))
+        with open(fname, 'rb') as f:
+            md.update(f.read())
+
+
+def _update_package_digest(md, pkg_name):
+    # type: (Any, str) -> None
+    """Adds the version and all source files of the given package to the digest."""
+    md.update(pkg_name.encode('utf-8'))
+    try:
+        pkg = importlib.import_module(pkg_name)
+    except ImportError:
+        md.update(b'missing')
+        return
+    if getattr(pkg, '__headless__', False):
+        # the headless stand-in implements this package.
+        md.update(b'headless')
+        _update_dir_digest(md, os.path.join(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))), 'headless'))
+        return
+    md.update(str(getattr(pkg, '__version__', '')).encode('utf-8'))
+    for pkg_dir in sorted(getattr(pkg, '__path__', [])):
+        _update_dir_digest(md, pkg_dir)
+
+
+def get_source_digest():
+    # type: () -> str
+    """Returns a digest of all generator source files and of the frameworks they build on.
+
+    The digest covers this package, BAG and ``abs_templates_ec``.  Any code change in these
+    packages invalidates every cache entry, since a cached master contains the geometry of all
+    its children.  Technology classes are covered by :func:`get_grid_fingerprint`.
+    """
+    global _source_digest
+    if _source_digest is None:
+        md = hashlib.sha1()
+        _update_dir_digest(md, os.path.dirname(os.path.abspath(__file__)))
+        for pkg_name in _framework_packages:
+            _update_package_digest(md, pkg_name)
+        _source_digest = md.hexdigest()
+    return _source_digest
+
+
+def _get_class_source_digest(cls):
+    # type: (type) -> str
+    """Returns a digest of the source files of the given class and all of its base classes."""
+    md = hashlib.sha1()
+    for base_cls in cls.__mro__:
+        md.update(('%s.%s' % (base_cls.__module__, base_cls.__qualname__)).encode('utf-8'))
+        try:
+            fname = inspect.getsourcefile(base_cls)
+        except TypeError:
+            # built-in class
+            fname = None
+        if fname is not None and os.path.isfile(fname):
+            with open(fname, 'rb') as f:
+                md.update(f.read())
+    return md.hexdigest()
+
+
+def get_grid_fingerprint(grid):
+    # type: (RoutingGrid) -> str
+    """Returns a digest of the routing grid and technology information.
+
+    The digest includes the source files of the technology class and its base classes.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+
+    Returns
+    -------
+    fingerprint : str
+        the grid fingerprint.
+    """
+    grid_fp = _grid_fp_table.get(grid, None)
+    if grid_fp is not None:
+        return grid_fp
+
+    tech_info = grid.tech_info
+    tech_cls = tech_info.__class__
+    layer_info = []
+    for lay_id in sorted(grid.layers):
+        layer_info.append((lay_id, grid.get_direction(lay_id),
+                           grid.get_track_pitch(lay_id, unit_mode=True),
+                           grid.get_track_width(lay_id, 1, unit_mode=True)))
+
+    tech_params = getattr(tech_info, 'tech_params', None)
+    try:
+        tech_params = freeze(tech_params)
+    except TypeError:
+        tech_params = repr(tech_params)
+    _grid_fp_table[grid] = grid_fp = param_digest(('%s.%s' % (tech_cls.__module__,
+                                                              tech_cls.__qualname__),
+                                                   _get_class_source_digest(tech_cls),
+                                                   grid.resolution, grid.layout_unit,
+                                                   layer_info, tech_params))
+    return grid_fp
+
+
+def _get_row_info_key(grid, config):
+    # type: (RoutingGrid, Dict[str, Any]) -> str
+    return param_digest((get_grid_fingerprint(grid), param_digest(config)))
+
+
+def get_row_layout_info(grid, config):
+    # type: (RoutingGrid, Dict[str, Any]) -> Optional[Dict[str, Any]]
+    """Returns the cached standard cell row layout information of the given laygo configuration.
+
+    The process-wide table is checked first, followed by the master cache directory if a master
+    cache is set.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    config : Dict[str, Any]
+        the laygo configuration dictionary.
+
+    Returns
+    -------
+    row_layout_info : Optional[Dict[str, Any]]
+        the row layout information dictionary, or None if it is not cached.
+    """
+    key = _get_row_info_key(grid, config)
+    row_layout_info = _row_info_table.get(key, None)
+    if row_layout_info is None and _master_cache is not None:
+        row_layout_info = _master_cache.get_row_layout_info(key)
+        if row_layout_info is not None:
+            _row_info_table[key] = row_layout_info = to_frozen(row_layout_info)
+    return row_layout_info
+
+
+def set_row_layout_info(grid, config, row_layout_info):
+    # type: (RoutingGrid, Dict[str, Any], Dict[str, Any]) -> None
+    """Caches the standard cell row layout information of the given laygo configuration.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    config : Dict[str, Any]
+        the laygo configuration dictionary.
+    row_layout_info : Dict[str, Any]
+        the row layout information dictionary.
+    """
+    key = _get_row_info_key(grid, config)
+    _row_info_table[key] = row_layout_info = to_frozen(row_layout_info)
+    if _master_cache is not None:
+        _master_cache.put_row_layout_info(key, row_layout_info)
+
+
+def _get_session_objects(temp_db):
+    # type: (TemplateDB) -> Dict[str, Any]
+    """Returns the objects that belong to a generation session rather than to a master.
+
+    These objects are pickled by name, and are replaced by the objects of the current session
+    when a master is loaded.
+    """
+    obj_table = {'temp_db': temp_db}
+    for name, val in vars(temp_db).items():
+        if not isinstance(val, (str, bytes, Number, type(None))):
+            obj_table['temp_db.' + name] = val
+    grid = temp_db.grid
+    obj_table['grid'] = grid
+    obj_table['tech_info'] = grid.tech_info
+    return obj_table
+
+
+class _MasterPickler(pickle.Pickler):
+    def __init__(self, file, obj_table, master_table=None):
+        pickle.Pickler.__init__(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._id_table = {id(val): name for name, val in obj_table.items()}
+        if master_table:
+            for key, master in master_table.items():
+                self._id_table[id(master)] = ('master', key)
+
+    def persistent_id(self, obj):
+        return self._id_table.get(id(obj), None)
+
+
+class _MasterUnpickler(pickle.Unpickler):
+    def __init__(self, file, obj_table, master_table=None):
+        pickle.Unpickler.__init__(self, file)
+        self._obj_table = obj_table
+        self._master_table = master_table or {}
+
+    def persistent_load(self, pid):
+        try:
+            if isinstance(pid, tuple):
+                return self._master_table[pid[1]]
+            return self._obj_table[pid]
+        except KeyError:
+            raise pickle.UnpicklingError('Unknown session object: %s' % (pid, ))
+
+
+def dump_masters(temp_db, master_list):
+    # type: (TemplateDB, List[TemplateBase]) -> bytes
+    """Serializes the given masters and all of their descendants.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database containing the masters.
+    master_list : List[TemplateBase]
+        the list of masters to serialize.
+
+    Returns
+    -------
+    data : bytes
+        the serialized masters.
+    """
+    # collect descendants, children first
+    visited = set()
+    tree_list = []
+
+    def _collect(cur_master):
+        key = cur_master.key
+        if key in visited:
+            return
+        visited.add(key)
+        # children is a set; visit it in a stable order so the output does not depend on the
+        # hash seed.
+        for child_key in sorted(cur_master.children or (), key=repr):
+            child = temp_db.find_master(child_key)
+            if child is None:
+                raise ValueError('Cannot find child master %s' % (child_key, ))
+            _collect(child)
+        tree_list.append(cur_master)
+
+    for master in master_list:
+        _collect(master)
+
+    # pickle every master on its own, referring to the other masters by key.  This way a parent
+    # is linked to the registered child master on load instead of to a private copy of it.
+    obj_table = _get_session_objects(temp_db)
+    master_table = {master.key: master for master in tree_list}
+    entry_list = []
+    for master in tree_list:
+        key = master.key
+        del master_table[key]
+        buf = io.BytesIO()
+        _MasterPickler(buf, obj_table, master_table).dump(master)
+        master_table[key] = master
+        entry_list.append((key, buf.getvalue()))
+
+    buf = io.BytesIO()
+    top_keys = [master.key for master in master_list]
+    _MasterPickler(buf, obj_table).dump((_CACHE_VERSION, entry_list, top_keys))
+    return buf.getvalue()
+
+
+def load_masters(temp_db, data):
+    # type: (TemplateDB, bytes) -> List[TemplateBase]
+    """Deserializes masters and registers them in the given template database.
+
+    Masters that already exist in the template database are reused, and every new master is
+    given a cell name that is unique in the current session.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    data : bytes
+        the serialized masters returned by :func:`dump_masters`.
+
+    Returns
+    -------
+    master_list : List[TemplateBase]
+        the deserialized masters, in the order given to :func:`dump_masters`.
+    """
+    obj_table = _get_session_objects(temp_db)
+    version, entry_list, top_keys = _MasterUnpickler(io.BytesIO(data), obj_table).load()
+    if version != _CACHE_VERSION:
+        raise ValueError('Unsupported master cache version: %s' % version)
+
+    # children come before their parents, so every master a parent refers to is resolved by the
+    # time the parent is loaded.
+    master_table = {}
+    new_masters = []
+    for key, master_data in entry_list:
+        existing = temp_db.find_master(key)
+        if existing is None:
+            master = _MasterUnpickler(io.BytesIO(master_data), obj_table, master_table).load()
+            new_masters.append(master)
+            master_table[key] = master
+        else:
+            master_table[key] = existing
+
+    # name new masters in the order they were created in the source session, so the cell names
+    # match the names of a serial run that creates the same masters in the same order.
+    new_masters.sort(key=_get_name_index)
+    for master in new_masters:
+        master.update_master_info()
+        temp_db.register_master(master.key, master)
+
+    return [master_table[key] for key in top_keys]
+
+
+def _get_name_index(master):
+    # type: (TemplateBase) -> int
+    """Returns the creation index of a master among the masters with the same basename.
+
+    Cell names are the basename for the first master, followed by ``<basename>_0``,
+    ``<basename>_1`` and so on.  Only masters with the same basename compete for names, so this
+    index orders them by creation.
+    """
+    basename = master.get_master_basename()
+    name = master.cell_name
+    suffix = name[len(basename) + 1:]
+    if name.startswith(basename + '_') and suffix.isdigit():
+        return int(suffix) + 1
+    return 0
+
+
+class MasterCache(object):
+    """A persistent, content-addressed cache of finished layout masters.
+
+    Parameters
+    ----------
+    cache_dir : str
+        the cache directory.  It is created if it does not exist.
+    """
+
+    def __init__(self, cache_dir):
+        # type: (str) -> None
+        self._cache_dir = os.path.abspath(cache_dir)
+        os.makedirs(self._cache_dir, exist_ok=True)
+        # per-session lookup tables, so each entry is loaded from disk at most once per session.
+        self._session_table = weakref.WeakKeyDictionary()
+        self.num_hits = 0
+        self.num_misses = 0
+
+    @property
+    def cache_dir(self):
+        # type: () -> str
+        return self._cache_dir
+
+    def get_key(self, temp_cls, params, grid):
+        # type: (Type[TemplateBase], Dict[str, Any], RoutingGrid) -> str
+        """Returns the cache key of the given master.
+
+        Parameters
+        ----------
+        temp_cls : Type[TemplateBase]
+            the template class.
+        params : Dict[str, Any]
+            the template parameters.
+        grid : RoutingGrid
+            the routing grid.
+
+        Returns
+        -------
+        key : str
+            the cache key.
+        """
+        grid_fp = get_grid_fingerprint(grid)
+        cls_name = '%s.%s' % (temp_cls.__module__, temp_cls.__qualname__)
+        return param_digest((cls_name, param_digest(params), grid_fp, get_source_digest()))
+
+    def _get_path(self, key):
+        # type: (str) -> str
+        return os.path.join(self._cache_dir, key[:2], key + '.pkl')
+
+    def _write_file(self, fname, data):
+        # type: (str, bytes) -> None
+        dir_name = os.path.dirname(fname)
+        os.makedirs(dir_name, exist_ok=True)
+        # write to a temporary file first, so concurrent readers never see partial entries.
+        fd, tmp_name = tempfile.mkstemp(dir=dir_name, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, fname)
+
+    def get_master(self, temp_db, key):
+        # type: (TemplateDB, str) -> Optional[TemplateBase]
+        """Returns the cached master with the given key, or None if it is not cached.
+
+        Parameters
+        ----------
+        temp_db : TemplateDB
+            the template database.
+        key : str
+            the cache key.
+
+        Returns
+        -------
+        master : Optional[TemplateBase]
+            the cached master, registered in the given template database.
+        """
+        session = self._session_table.setdefault(temp_db, {})
+        master = session.get(key, None)
+        if master is not None:
+            return master
+
+        fname = self._get_path(key)
+        if not os.path.isfile(fname):
+            self.num_misses += 1
+            return None
+
+        try:
+            with open(fname, 'rb') as f:
+                master = load_masters(temp_db, f.read())[0]
+        except Exception as ex:
+            warnings.warn('Discarding unreadable master cache entry %s: %s' % (fname, ex))
+            os.remove(fname)
+            self.num_misses += 1
+            return None
+
+        self.num_hits += 1
+        session[key] = master
+        return master
+
+    def put_master(self, temp_db, key, master):
+        # type: (TemplateDB, str, TemplateBase) -> None
+        """Stores the given master in the cache.
+
+        Parameters
+        ----------
+        temp_db : TemplateDB
+            the template database.
+        key : str
+            the cache key.
+        master : TemplateBase
+            the finished master.
+        """
+        self._session_table.setdefault(temp_db, {})[key] = master
+        try:
+            data = dump_masters(temp_db, [master])
+        except (pickle.PicklingError, TypeError, AttributeError) as ex:
+            warnings.warn('Cannot cache master %s: %s' % (master.cell_name, ex))
+            return
+
+        self._write_file(self._get_path(key), data)
+
+    def get_row_layout_info(self, key):
+        # type: (str) -> Optional[Dict[str, Any]]
+        """Returns the cached row layout information with the given key, or None."""
+        fname = os.path.join(self._cache_dir, 'row_info', key + '.pkl')
+        if not os.path.isfile(fname):
+            return None
+        with open(fname, 'rb') as f:
+            return pickle.load(f)
+
+    def put_row_layout_info(self, key, row_layout_info):
+        # type: (str, Dict[str, Any]) -> None
+        """Stores the given row layout information in the cache."""
+        fname = os.path.join(self._cache_dir, 'row_info', key + '.pkl')
+        if not os.path.isfile(fname):
+            self._write_file(fname, pickle.dumps(row_layout_info,
+                                                 protocol=pickle.HIGHEST_PROTOCOL))
+
+    def clear(self):
+        # type: () -> None
+        """Removes all entries from the cache."""
+        for fname in glob.glob(os.path.join(self._cache_dir, '*', '*.pkl')):
+            os.remove(fname)
+        self._session_table.clear()
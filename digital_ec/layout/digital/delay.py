@@ -2,7 +2,7 @@
 
 """This module contains layout generator for various kinds of delay cells."""
 
-from typing import TYPE_CHECKING, Dict, Any, Set
+from typing import TYPE_CHECKING, Dict, Any, Set, Optional
 
 from ..stdcells.core import StdDigitalTemplate
 from ..stdcells.mux import MuxTristate
@@ -30,6 +30,8 @@ class DelayCellMux(StdDigitalTemplate):
         :class:`bag.layout.template.TemplateBase` for details.
     """
 
+    blk_sp = 2
+
     def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
         # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
         StdDigitalTemplate.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
@@ -53,6 +55,7 @@ class DelayCellMux(StdDigitalTemplate):
             wn='nmos width.',
             row_layout_info='Row layout information dictionary.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -63,13 +66,40 @@ class DelayCellMux(StdDigitalTemplate):
             wn=None,
             row_layout_info=None,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        inv_info = InvChain.get_size_info(dict(seg_list=params['delay_seg_list'],
+                                               stack_list=[True, False]))
+        mux_info = MuxTristate.get_size_info(dict(seg=params['seg']))
+        return dict(
+            num_cols=inv_info['num_cols'] + mux_info['num_cols'] + cls.blk_sp,
+            num_rows=1,
+            seg_in=mux_info['seg_in'],
+            seg_sel=mux_info['seg_sel'],
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        wp, wn = cls.get_row_widths(params)
+        buf_params = dict(config=config, seg_list=params['delay_seg_list'], wp_list=[wp, wp],
+                          wn_list=[wn, wn], stack_list=[True, False])
+        return dict(
+            buf_params=InvChain.compute_sch_params(buf_params),
+            mux_params=MuxTristate.compute_sch_params(dict(config=config, seg=params['seg'],
+                                                           wp=wp, wn=wn)),
         )
 
     def get_layout_basename(self):
         return 'delay_cell_mux_%dx' % self.params['seg']
 
     def draw_layout(self):
-        blk_sp = 2
+        blk_sp = self.blk_sp
 
         config = self.params['config']
 
@@ -93,6 +123,8 @@ class DelayCellMux(StdDigitalTemplate):
         params['wn'] = wn
         params['show_pins'] = False
         params['sig_locs'] = None
+        if params['row_layout_info'] is None:
+            params['row_layout_info'] = self.compute_row_layout_info(config)
         mux_master = self.new_template(params=params, temp_cls=MuxTristate)
         params['row_layout_info'] = row_layout_info = mux_master.row_layout_info
         self.initialize(row_layout_info, 1)
@@ -130,18 +162,148 @@ class DelayCellMux(StdDigitalTemplate):
         self.add_pin('VDD', self.connect_wires(vdd_list), show=show_pins)
 
         # connect and export pins
-        self.connect_to_track_wires(inv.get_pin('out'), mux.get_pin('in1'))
+        if not self.skeleton:
+            self.connect_to_track_wires(inv.get_pin('out'), mux.get_pin('in1'))
         self.add_pin('in', self.connect_wires([inv.get_pin('in'), mux.get_pin('in0')]),
                      show=show_pins)
         self.add_pin('out', mux.get_pin('out'), show=show_pins)
         self.add_pin('delay', mux.get_pin('sel1'), show=show_pins)
 
         # set schematic parameters
-        self._sch_params = dict(
-            buf_params=inv_master.sch_params,
-            mux_params=mux_master.sch_params,
+        self._sch_params = self.compute_sch_params(self.params)
+
+
+class DelayLineMuxRow(StdDigitalTemplate):
+    """A single row of mux delay cells with substrate taps on both ends.
+
+    The delay cells are chained from left to right, or from right to left if flip is True.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    lib_name : str
+        the layout library name.
+    params : Dict[str, Any]
+        the parameter values.
+    used_names : Set[str]
+        a set of already used cell names.
+    **kwargs
+        dictionary of optional parameters.  See documentation of
+        :class:`bag.layout.template.TemplateBase` for details.
+    """
+
+    blk_sp = 2
+
+    def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
+        # type: (TemplateDB, str, Dict[str, Any], Set[str], **kwargs) -> None
+        StdDigitalTemplate.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
+        self._sch_params = None
+
+    @property
+    def sch_params(self):
+        # type: () -> Dict[str, Any]
+        return self._sch_params
+
+    @classmethod
+    def get_params_info(cls):
+        # type: () -> Dict[str, str]
+        return dict(
+            config='laygo configuration dictionary.',
+            nx='number of delay cells in this row.',
+            cell_params='delay cell parameters.',
+            tr_widths='Track width dictionary.',
+            tr_spaces='Track spacing dictionary.',
+            row_layout_info='Row layout information dictionary.',
+            flip='True to chain delay cells from right to left.',
+            show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
+    @classmethod
+    def get_default_param_values(cls):
+        # type: () -> Dict[str, Any]
+        return dict(
+            row_layout_info=None,
+            flip=False,
+            show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        if sub_columns is None:
+            raise ValueError('sub_columns must be given to compute the size of %s.' %
+                             cls.__name__)
+        nx = params['nx']
+        cell_info = DelayCellMux.get_size_info(params['cell_params'])
+        return dict(
+            num_cols=sub_columns * 2 + cls.blk_sp * (nx + 1) + cell_info['num_cols'] * nx,
+            num_rows=1,
+            cell_cols=cell_info['num_cols'],
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        return DelayCellMux.compute_sch_params(dict(params['cell_params'],
+                                                    config=params['config']))
+
+    def get_layout_basename(self):
+        if self.params['flip']:
+            return 'delay_line_mux_row_flip_n%d' % self.params['nx']
+        else:
+            return 'delay_line_mux_row_n%d' % self.params['nx']
+
+    def draw_layout(self):
+        blk_sp = self.blk_sp
+        nx = self.params['nx']
+        config = self.params['config']
+        tr_widths = self.params['tr_widths']
+        tr_spaces = self.params['tr_spaces']
+        row_layout_info = self.params['row_layout_info']
+        flip = self.params['flip']
+        show_pins = self.params['show_pins']
+
+        cell_params = self.params['cell_params'].copy()
+        cell_params['config'] = config
+        cell_params['tr_widths'] = tr_widths
+        cell_params['tr_spaces'] = tr_spaces
+        cell_params['row_layout_info'] = row_layout_info
+        cell_params['show_pins'] = False
+        master = self.new_template(params=cell_params, temp_cls=DelayCellMux)
+
+        # setup floorplan
+        tap_ncol = self.sub_columns
+        cell_ncol = master.num_cols
+        ncol = tap_ncol * 2 + blk_sp * (nx + 1) + cell_ncol * nx
+        self.initialize(master.row_layout_info, 1, num_cols=ncol)
+
+        # add delay cells, in signal order
+        spx = cell_ncol + blk_sp
+        inst = self.add_digital_block(master, (tap_ncol + blk_sp, 0), flip=flip, nx=nx, spx=spx)
+        col_list = list(range(nx - 1, -1, -1)) if flip else list(range(nx))
+        if not self.skeleton:
+            for cidx in range(nx - 1):
+                self.connect_to_track_wires(inst.get_pin('out', col=col_list[cidx]),
+                                            inst.get_pin('in', col=col_list[cidx + 1]))
+        self.add_array_bus_pin(inst, 'delay', 'delay', reverse=flip, show=show_pins)
+        self.add_pin('in', inst.get_pin('in', col=col_list[0]), show=show_pins)
+        self.add_pin('out', inst.get_pin('out', col=col_list[-1]), show=show_pins)
+
+        # draw taps and get power wires
+        vdd_list, vss_list = self.add_substrate_tap_columns()
+
+        self.fill_space()
+
+        # export supply
+        self.add_pin('VDD', self.connect_wires(vdd_list), show=show_pins)
+        self.add_pin('VSS', self.connect_wires(vss_list), show=show_pins)
+
+        # set schematic parameters
+        self._sch_params = self.compute_sch_params(self.params)
+
 
 class DelayLineMux(StdDigitalTemplate):
     """A delay line made from mux delay cells.
@@ -184,7 +346,9 @@ class DelayLineMux(StdDigitalTemplate):
             tr_widths='Track width dictionary.',
             tr_spaces='Track spacing dictionary.',
             row_layout_info='Row layout information dictionary.',
+            row_master='True to draw each row as a separate master.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -192,11 +356,95 @@ class DelayLineMux(StdDigitalTemplate):
         # type: () -> Dict[str, Any]
         return dict(
             row_layout_info=None,
+            row_master=False,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        row_info = DelayLineMuxRow.get_size_info(params, sub_columns=sub_columns)
+        return dict(
+            num_cols=row_info['num_cols'],
+            num_rows=params['ny'],
+            cell_cols=row_info['cell_cols'],
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        return dict(
+            num=params['nx'] * params['ny'],
+            cell_params=DelayLineMuxRow.compute_sch_params(params),
         )
 
     def draw_layout(self):
-        blk_sp = 2
+        if self.params['row_master']:
+            self._draw_layout_rows()
+        else:
+            self._draw_layout_flat()
+
+    def _draw_layout_rows(self):
+        """Draws the delay line by arraying two routed row masters.
+
+        Only the row-to-row connections are routed in this template, so the routing work is
+        proportional to the number of rows instead of the number of delay cells.
+        """
+        nx = self.params['nx']
+        ny = self.params['ny']
+        show_pins = self.params['show_pins']
+
+        params = dict(
+            config=self.params['config'],
+            nx=nx,
+            cell_params=self.params['cell_params'],
+            tr_widths=self.params['tr_widths'],
+            tr_spaces=self.params['tr_spaces'],
+            row_layout_info=self.params['row_layout_info'],
+            flip=False,
+            show_pins=False,
+        )
+        row_masters = [self.new_template(params=params, temp_cls=DelayLineMuxRow)]
+        if ny > 1:
+            params['flip'] = True
+            row_masters.append(self.new_template(params=params, temp_cls=DelayLineMuxRow))
+
+        # setup floorplan
+        ncol = row_masters[0].num_cols
+        row_layout_info = row_masters[0].row_layout_info
+        self.initialize(row_layout_info, ny, num_cols=ncol, draw_boundaries=True, end_mode=15)
+
+        vdd_list, vss_list = [], []
+        last_out = None
+        for ridx in range(ny):
+            inst = self.add_digital_block(row_masters[ridx % 2], (0, ridx))
+            if ridx == 0:
+                self.add_pin('in', inst.get_pin('in'), show=show_pins)
+            elif not self.skeleton:
+                self.connect_to_track_wires(last_out, inst.get_pin('in'))
+            self.reexport_bus(inst, 'delay', nx, start=ridx * nx, show=show_pins)
+            if ridx == ny - 1 or not self.skeleton:
+                last_out = inst.get_pin('out')
+            vdd_list.extend(inst.port_pins_iter('VDD'))
+            vss_list.extend(inst.port_pins_iter('VSS'))
+
+        # fill space
+        self.fill_space()
+
+        # export output
+        self.add_pin('out', last_out, show=show_pins)
+        # export supply
+        vdd = self.connect_wires(vdd_list)
+        vss = self.connect_wires(vss_list)
+        self.add_pin('VDD', vdd, label='VDD:', show=show_pins)
+        self.add_pin('VSS', vss, label='VSS:', show=show_pins)
+
+        # set schematic parameters
+        self._sch_params = self.compute_sch_params(self.params)
+
+    def _draw_layout_flat(self):
+        blk_sp = self._blk_sp
         nx = self.params['nx']
         ny = self.params['ny']
         config = self.params['config']
@@ -220,7 +468,6 @@ class DelayLineMux(StdDigitalTemplate):
         row_layout_info = master.row_layout_info
         self.initialize(row_layout_info, ny, num_cols=ncol, draw_boundaries=True, end_mode=15)
 
-        vdd_list, vss_list = [], []
         spx = cell_ncol + blk_sp
         last_out = None
         cnt = 0
@@ -232,40 +479,31 @@ class DelayLineMux(StdDigitalTemplate):
             if ridx == 0:
                 # export input
                 self.add_pin('in', inst.get_pin('in', col=0), show=show_pins)
-            else:
+            elif not self.skeleton:
                 if flip:
                     self.connect_to_track_wires(last_out, inst.get_pin('in', col=nx - 1))
                 else:
                     self.connect_to_track_wires(last_out, inst.get_pin('in', col=0))
 
-            for cidx in range(nx - 1):
+            if not self.skeleton:
+                for cidx in range(nx - 1):
+                    if flip:
+                        self.connect_to_track_wires(inst.get_pin('out', col=nx - 1 - cidx),
+                                                    inst.get_pin('in', col=nx - 2 - cidx))
+                    else:
+                        self.connect_to_track_wires(inst.get_pin('out', col=cidx),
+                                                    inst.get_pin('in', col=cidx + 1))
+
+            cnt = self.add_array_bus_pin(inst, 'delay', 'delay', start=cnt, reverse=flip,
+                                         show=show_pins)
+            if ridx == ny - 1 or not self.skeleton:
                 if flip:
-                    self.connect_to_track_wires(inst.get_pin('out', col=nx - 1 - cidx),
-                                                inst.get_pin('in', col=nx - 2 - cidx))
-                    self.add_pin('delay<%d>' % cnt, inst.get_pin('delay', col=nx - 1 - cidx),
-                                 show=show_pins)
-
+                    last_out = inst.get_pin('out', col=0)
                 else:
-                    self.connect_to_track_wires(inst.get_pin('out', col=cidx),
-                                                inst.get_pin('in', col=cidx + 1))
-                    self.add_pin('delay<%d>' % cnt, inst.get_pin('delay', col=cidx), show=show_pins)
-                cnt += 1
-
-            if flip:
-                self.add_pin('delay<%d>' % cnt, inst.get_pin('delay', col=0), show=show_pins)
-                last_out = inst.get_pin('out', col=0)
-            else:
-                self.add_pin('delay<%d>' % cnt, inst.get_pin('delay', col=nx - 1), show=show_pins)
-                last_out = inst.get_pin('out', col=nx - 1)
-            cnt += 1
-
-            # draw taps and get power wires
-            tap = self.add_substrate_tap((0, ridx))
-            vdd_list.extend(tap.port_pins_iter('VDD'))
-            vss_list.extend(tap.port_pins_iter('VSS'))
-            tap = self.add_substrate_tap((ncol - tap_ncol, ridx))
-            vdd_list.extend(tap.port_pins_iter('VDD'))
-            vss_list.extend(tap.port_pins_iter('VSS'))
+                    last_out = inst.get_pin('out', col=nx - 1)
+
+        # draw taps and get power wires
+        vdd_list, vss_list = self.add_substrate_tap_columns()
 
         # fill space
         self.fill_space()
@@ -279,7 +517,4 @@ class DelayLineMux(StdDigitalTemplate):
         self.add_pin('VSS', vss, label='VSS:', show=show_pins)
 
         # set schematic parameters
-        self._sch_params = dict(
-            num=nx * ny,
-            cell_params=master.sch_params,
-        )
+        self._sch_params = self.compute_sch_params(self.params)
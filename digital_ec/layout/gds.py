@@ -0,0 +1,637 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a GDSII stream writer for generated layout masters.
+
+The writer serializes the layout content of a master hierarchy, as returned by
+:func:`get_content_list`, directly to a GDSII file, without writing an OpenAccess library
+first.  Every master becomes one GDS structure.  Arrayed instances, such as blocks
+added with ``add_digital_block(nx=...)``, are written as AREF elements.  Vias are expanded to
+their enclosure and cut rectangles, using a via map from via ID to the (bottom, cut, top)
+layer/purpose pairs.
+
+Layers are mapped with a dictionary from (layer, purpose) to (GDS layer, GDS datatype), which
+can be read from a Cadence stream layer map file with :func:`load_layer_map`.  The via map can
+be read with :func:`load_via_map`.  Routing blockages are not written.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Sequence, Optional, Callable
+
+import struct
+import datetime
+
+from .abstract import get_layout
+
+if TYPE_CHECKING:
+    from bag.layout.core import TechInfo
+    from bag.layout.template import TemplateBase, TemplateDB
+
+LayerMap = Dict[Tuple[str, str], Tuple[int, int]]
+ViaMap = Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]
+
+# GDS record types, including the data type byte.
+_HEADER = 0x0002
+_BGNLIB = 0x0102
+_LIBNAME = 0x0206
+_UNITS = 0x0305
+_ENDLIB = 0x0400
+_BGNSTR = 0x0502
+_STRNAME = 0x0606
+_ENDSTR = 0x0700
+_BOUNDARY = 0x0800
+_PATH = 0x0900
+_SREF = 0x0A00
+_AREF = 0x0B00
+_TEXT = 0x0C00
+_LAYER = 0x0D02
+_DATATYPE = 0x0E02
+_WIDTH = 0x0F03
+_XY = 0x1003
+_ENDEL = 0x1100
+_SNAME = 0x1206
+_COLROW = 0x1302
+_TEXTTYPE = 0x1602
+_PRESENTATION = 0x1701
+_STRING = 0x1906
+_STRANS = 0x1A01
+_ANGLE = 0x1C05
+_PATHTYPE = 0x2102
+
+# a rectangle boundary element.
+_rect_struct = struct.Struct('>10H10i2H')
+# a text element centered on its location.
+_text_struct = struct.Struct('>13H2i')
+
+# orientation to the (reflection, rotation angle) of a GDS reference.
+_gds_orient = {
+    'R0': (False, 0),
+    'R90': (False, 90),
+    'R180': (False, 180),
+    'R270': (False, 270),
+    'MX': (True, 0),
+    'MY': (True, 180),
+    'MXR90': (True, 90),
+    'MYR90': (True, 270),
+}
+
+# orientation to the (xx, xy, yx, yy) transformation matrix.
+_orient_matrix = {
+    'R0': (1, 0, 0, 1),
+    'R90': (0, -1, 1, 0),
+    'R180': (-1, 0, 0, -1),
+    'R270': (0, 1, -1, 0),
+    'MX': (1, 0, 0, -1),
+    'MY': (-1, 0, 0, 1),
+    'MXR90': (0, 1, 1, 0),
+    'MYR90': (0, -1, -1, 0),
+}
+
+# BAG path end style to GDS path type.
+_path_type = {
+    'truncate': 0,
+    'round': 1,
+    'extend': 2,
+}
+
+
+def load_layer_map(fname):
+    # type: (str) -> LayerMap
+    """Reads a Cadence stream layer map file.
+
+    Each line contains the layer name, the purpose, the GDS layer and the GDS datatype.
+    Comments start with ``#``.
+    """
+    lay_map = {}
+    with open(fname, 'r') as f:
+        for line in f:
+            line = line.split('#', 1)[0].split()
+            if len(line) >= 4:
+                lay_map[(line[0], line[1])] = (int(line[2]), int(line[3]))
+    return lay_map
+
+
+def load_via_map(fname):
+    # type: (str) -> ViaMap
+    """Reads a via map file.
+
+    Each line contains the via ID followed by the layer and purpose of the bottom, cut and top
+    layers.  Comments start with ``#``.
+    """
+    via_map = {}
+    with open(fname, 'r') as f:
+        for line in f:
+            line = line.split('#', 1)[0].split()
+            if len(line) >= 7:
+                via_map[line[0]] = ((line[1], line[2]), (line[3], line[4]), (line[5], line[6]))
+    return via_map
+
+
+def get_tech_maps(tech_info, lay_map=None, via_map=None):
+    # type: (TechInfo, Optional[LayerMap], Optional[ViaMap]) -> Tuple[LayerMap, ViaMap]
+    """Returns the layer map and the via map of the given technology.
+
+    Maps that are not given are obtained from the ``get_layer_map()`` and ``get_via_map()``
+    methods of the technology, if it has them.
+
+    Raises
+    ------
+    ValueError
+        if a layer map or a via map is not given, and the technology does not provide one.
+    """
+    if lay_map is None:
+        if not hasattr(tech_info, 'get_layer_map'):
+            raise ValueError('The technology has no GDS layer map; a layer map must be given.')
+        lay_map = tech_info.get_layer_map()
+    if via_map is None:
+        if not hasattr(tech_info, 'get_via_map'):
+            raise ValueError('The technology has no via map; a via map must be given.')
+        via_map = tech_info.get_via_map()
+    return lay_map, via_map
+
+
+def get_master_content(master, lib_name, rename_fun):
+    # type: (TemplateBase, str, Callable[[str], str]) -> Tuple[Any, ...]
+    """Returns the layout content of the given master as a tuple of shape lists.
+
+    The content is built without cybagoa, even if the template database uses it, so the
+    result never is an OpenAccess layout object.  Spilled geometry is read back once, and is
+    released afterwards.
+
+    Parameters
+    ----------
+    master : TemplateBase
+        the layout master.
+    lib_name : str
+        the library name.
+    rename_fun : Callable[[str], str]
+        the function that maps master cell names to output cell names.
+
+    Returns
+    -------
+    content : Tuple[Any, ...]
+        the cell name, instances, rectangles, vias, pins, paths, blockages, boundaries and
+        polygons of the master.
+    """
+    master_layout = master._layout
+    layout = get_layout(master)
+    use_cybagoa = getattr(layout, '_use_cybagoa', False)
+    master._layout = layout
+    if use_cybagoa:
+        layout._use_cybagoa = False
+    try:
+        return master.get_content(lib_name, rename_fun)
+    finally:
+        master._layout = master_layout
+        if use_cybagoa:
+            layout._use_cybagoa = True
+
+
+def get_content_list(temp_db, template_list, name_list=None, lib_name=''):
+    # type: (TemplateDB, Sequence[TemplateBase], Optional[Sequence[str]], str) -> List[Any]
+    """Returns the layout content of the given masters and all their descendants.
+
+    Children come before their parents, and every master is listed once.  Cell names are
+    formatted as in ``TemplateDB.batch_layout``.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    template_list : Sequence[TemplateBase]
+        the top level masters.
+    name_list : Optional[Sequence[str]]
+        if given, the cell names of the top level masters.
+    lib_name : str
+        the library name.  Defaults to the template database library name.
+
+    Returns
+    -------
+    content_list : List[Any]
+        the layout content of all masters, see :func:`get_master_content`.
+    """
+    lib_name = lib_name or temp_db.lib_name
+    rename_dict = {}
+    if name_list is not None:
+        for master, name in zip(template_list, name_list):
+            if name:
+                rename_dict[master.cell_name] = name
+
+    def rename_fun(name):
+        # type: (str) -> str
+        return rename_dict.get(name, None) or temp_db.format_cell_name(name)
+
+    content_list = []
+    visited = set()
+    stack = [(master, False) for master in reversed(template_list)]
+    while stack:
+        master, done = stack.pop()
+        key = master.key
+        if done:
+            content_list.append(get_master_content(master, lib_name, rename_fun))
+        elif key not in visited:
+            visited.add(key)
+            stack.append((master, True))
+            # children is a set; visit it in a stable order.
+            for child_key in sorted(master.children or (), key=repr, reverse=True):
+                child = temp_db.find_master(child_key)
+                if child is None:
+                    raise ValueError('Cannot find child master %s' % (child_key, ))
+                stack.append((child, False))
+    return content_list
+
+
+def get_via_boxes(via, via_map, resolution):
+    # type: (Dict[str, Any], ViaMap, float) -> List[Tuple[Any, ...]]
+    """Expands a via to its enclosure and cut rectangles.
+
+    Parameters
+    ----------
+    via : Dict[str, Any]
+        the via content dictionary.
+    via_map : Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]
+        the via ID to the (bottom, cut, top) layer/purpose pairs dictionary.
+    resolution : float
+        the layout resolution.
+
+    Returns
+    -------
+    box_list : List[Tuple[Any, ...]]
+        a list of (layer, x0, y0, x1, y1, nx, ny, spx, spy) tuples, in resolution units.  Each
+        entry is an array of rectangles with non-negative pitches; the cuts are one entry.
+        The via array given by the arr_* entries of the via is not expanded.
+    """
+    via_id = via['id']
+    try:
+        bot_lay, cut_lay, top_lay = via_map[via_id]
+    except KeyError:
+        raise ValueError('Via %s is not in the via map.' % via_id)
+    try:
+        xx, xy, yx, yy = _orient_matrix[via['orient']]
+    except KeyError:
+        raise ValueError('Unsupported orientation: %s' % via['orient'])
+
+    def to_db(val):
+        return int(round(val / resolution))
+
+    # the cut array and the enclosures, relative to the via center.
+    nc, nr = via['num_cols'], via['num_rows']
+    cw, ch = to_db(via['cut_width']), to_db(via['cut_height'])
+    pc, pr = cw + to_db(via['sp_cols']), ch + to_db(via['sp_rows'])
+    arr_w, arr_h = (nc - 1) * pc + cw, (nr - 1) * pr + ch
+    cx0, cy0 = -(arr_w // 2), -(arr_h // 2)
+    x_loc, y_loc = to_db(via['loc'][0]), to_db(via['loc'][1])
+
+    def transform(x0, y0, x1, y1):
+        # transform the box corners, then restore the lower left and upper right corners.
+        tx0, ty0 = xx * x0 + xy * y0, yx * x0 + yy * y0
+        tx1, ty1 = xx * x1 + xy * y1, yx * x1 + yy * y1
+        return (min(tx0, tx1) + x_loc, min(ty0, ty1) + y_loc, max(tx0, tx1) + x_loc,
+                max(ty0, ty1) + y_loc)
+
+    box_list = []
+    for lay, enc in ((bot_lay, via['enc1']), (top_lay, via['enc2'])):
+        enc_l, enc_r, enc_t, enc_b = (to_db(val) for val in enc)
+        box_list.append((lay, ) + transform(cx0 - enc_l, cy0 - enc_b, cx0 + arr_w + enc_r,
+                                           cy0 + arr_h + enc_t) + (1, 1, 0, 0))
+
+    # the column and row pitch vectors of the cut array, after transformation.  One of them
+    # is horizontal and the other is vertical.
+    dcx, dcy = xx * pc, yx * pc
+    drx, dry = xy * pr, yy * pr
+    if dcx == 0 and dry == 0:
+        nx, spx, ny, spy = nr, drx, nc, dcy
+    else:
+        nx, spx, ny, spy = nc, dcx, nr, dry
+    x0, y0, x1, y1 = transform(cx0, cy0, cx0 + cw, cy0 + ch)
+    # shift the first cut so both pitches are non-negative.
+    if spx < 0:
+        spx = -spx
+        x0 -= (nx - 1) * spx
+        x1 -= (nx - 1) * spx
+    if spy < 0:
+        spy = -spy
+        y0 -= (ny - 1) * spy
+        y1 -= (ny - 1) * spy
+    box_list.append((cut_lay, x0, y0, x1, y1, nx, ny, spx, spy))
+    return box_list
+
+
+def _pack_record(rec_type, data=b''):
+    # type: (int, bytes) -> bytes
+    return struct.pack('>HH', len(data) + 4, rec_type) + data
+
+
+def _pack_str(rec_type, val):
+    # type: (int, str) -> bytes
+    data = val.encode('ascii')
+    if len(data) % 2 == 1:
+        data += b'\0'
+    return _pack_record(rec_type, data)
+
+
+def _pack_real8(val):
+    # type: (float) -> bytes
+    """Encodes a GDS 8-byte real, with a sign bit, a base 16 excess 64 exponent and a 56-bit
+    mantissa."""
+    if val == 0:
+        return b'\0' * 8
+    sign = 0
+    if val < 0:
+        sign = 0x80
+        val = -val
+    exp = 64
+    while val >= 1:
+        val /= 16
+        exp += 1
+    while val < 0.0625:
+        val *= 16
+        exp -= 1
+    mant = int(round(val * (1 << 56)))
+    if mant >= (1 << 56):
+        mant >>= 4
+        exp += 1
+    return struct.pack('>Q', ((sign | exp) << 56) | mant)
+
+
+def _pack_time(now):
+    # type: (datetime.datetime) -> bytes
+    stamp = struct.pack('>6h', now.year, now.month, now.day, now.hour, now.minute, now.second)
+    return stamp + stamp
+
+
+class GdsWriter(object):
+    """Writes layout contents as GDS structures.
+
+    Parameters
+    ----------
+    f : Any
+        the binary output file.
+    lay_map : Dict[Tuple[str, str], Tuple[int, int]]
+        the (layer, purpose) to (GDS layer, GDS datatype) dictionary.
+    via_map : Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]
+        the via ID to the (bottom, cut, top) layer/purpose pairs dictionary.
+    resolution : float
+        the layout resolution, in layout units.
+    layout_unit : float
+        the layout unit, in meters.
+    """
+
+    def __init__(self, f, lay_map, via_map, resolution, layout_unit):
+        # type: (Any, LayerMap, ViaMap, float, float) -> None
+        self._f = f
+        self._lay_map = lay_map
+        self._via_map = via_map
+        self._res = resolution
+        self._layout_unit = layout_unit
+        self._now = _pack_time(datetime.datetime.now())
+        self.num_structures = 0
+        self.num_srefs = 0
+        self.num_arefs = 0
+        self.num_shapes = 0
+
+    def _to_db(self, val):
+        # type: (float) -> int
+        return int(round(val / self._res))
+
+    def _get_layer(self, lay):
+        # type: (Sequence[str]) -> Tuple[int, int]
+        try:
+            return self._lay_map[(lay[0], lay[1])]
+        except KeyError:
+            raise ValueError('Layer %s is not in the GDS layer map.' % (tuple(lay), ))
+
+    def write_header(self, lib_name, now=None):
+        # type: (str, Optional[datetime.datetime]) -> None
+        """Writes the GDS library header."""
+        if now is not None:
+            self._now = _pack_time(now)
+        self._f.write(b''.join((
+            _pack_record(_HEADER, struct.pack('>h', 600)),
+            _pack_record(_BGNLIB, self._now),
+            _pack_str(_LIBNAME, lib_name),
+            _pack_record(_UNITS, _pack_real8(self._res) +
+                         _pack_real8(self._res * self._layout_unit)),
+        )))
+
+    def write_footer(self):
+        # type: () -> None
+        """Writes the end of the GDS library."""
+        self._f.write(_pack_record(_ENDLIB))
+
+    def write_content(self, content):
+        # type: (Tuple[Any, ...]) -> None
+        """Writes the layout content of one master as a GDS structure."""
+        (cell_name, inst_list, rect_list, via_list, pin_list, path_list, _,
+         bnd_list, polygon_list) = content
+
+        parts = [_pack_record(_BGNSTR, self._now), _pack_str(_STRNAME, cell_name)]
+        for inst in inst_list:
+            self._add_inst(parts, inst)
+        for rect in rect_list:
+            gds_lay, gds_purp = self._get_layer(rect['layer'])
+            self._add_rect_array(parts, gds_lay, gds_purp, rect['bbox'], rect['arr_nx'],
+                                 rect['arr_ny'], rect['arr_spx'], rect['arr_spy'])
+        for via in via_list:
+            self._add_via(parts, via)
+        for pin in pin_list:
+            self._add_pin(parts, pin)
+        for path in path_list:
+            self._add_path(parts, path)
+        for polygon in polygon_list:
+            gds_lay, gds_purp = self._get_layer(polygon['layer'])
+            self._add_polygon(parts, gds_lay, gds_purp, polygon['points'])
+        for bnd in bnd_list:
+            gds_layer = self._lay_map.get(('prBoundary', bnd['type']), None)
+            if gds_layer is not None:
+                self._add_polygon(parts, gds_layer[0], gds_layer[1], bnd['points'])
+        parts.append(_pack_record(_ENDSTR))
+
+        self._f.write(b''.join(parts))
+        self.num_structures += 1
+
+    def _add_inst(self, parts, inst):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        orient = inst['orient']
+        try:
+            reflect, angle = _gds_orient[orient]
+        except KeyError:
+            raise ValueError('Unsupported orientation: %s' % orient)
+        nx, ny = inst['num_cols'], inst['num_rows']
+        x0, y0 = self._to_db(inst['loc'][0]), self._to_db(inst['loc'][1])
+
+        parts.append(_pack_record(_AREF if nx > 1 or ny > 1 else _SREF))
+        parts.append(_pack_str(_SNAME, inst['cell']))
+        if reflect or angle:
+            parts.append(_pack_record(_STRANS, struct.pack('>H', 0x8000 if reflect else 0)))
+            if angle:
+                parts.append(_pack_record(_ANGLE, _pack_real8(angle)))
+        if nx > 1 or ny > 1:
+            # the array lattice is given by the origin, and the points one past the last
+            # column and the last row.
+            spx, spy = self._to_db(inst['sp_cols']), self._to_db(inst['sp_rows'])
+            parts.append(_pack_record(_COLROW, struct.pack('>hh', nx, ny)))
+            parts.append(_pack_record(_XY, struct.pack('>6i', x0, y0, x0 + nx * spx, y0,
+                                                       x0, y0 + ny * spy)))
+            self.num_arefs += 1
+        else:
+            parts.append(_pack_record(_XY, struct.pack('>2i', x0, y0)))
+            self.num_srefs += 1
+        parts.append(_pack_record(_ENDEL))
+
+    def _add_rect(self, parts, gds_lay, gds_purp, x0, y0, x1, y1):
+        # type: (List[bytes], int, int, int, int, int, int) -> None
+        parts.append(_rect_struct.pack(4, _BOUNDARY, 6, _LAYER, gds_lay, 6, _DATATYPE, gds_purp,
+                                       44, _XY, x0, y0, x1, y0, x1, y1, x0, y1, x0, y0,
+                                       4, _ENDEL))
+        self.num_shapes += 1
+
+    def _add_rect_array(self, parts, gds_lay, gds_purp, bbox, nx, ny, spx, spy):
+        # type: (List[bytes], int, int, Sequence[Sequence[float]], int, int, float, float) -> None
+        self._add_rect_array_db(parts, gds_lay, gds_purp, self._to_db(bbox[0][0]),
+                                self._to_db(bbox[0][1]), self._to_db(bbox[1][0]),
+                                self._to_db(bbox[1][1]), nx, ny, self._to_db(spx),
+                                self._to_db(spy))
+
+    def _add_rect_array_db(self, parts, gds_lay, gds_purp, x0, y0, x1, y1, nx, ny, spx, spy):
+        # type: (List[bytes], int, int, int, int, int, int, int, int, int, int) -> None
+        for xidx in range(nx):
+            dx = xidx * spx
+            for yidx in range(ny):
+                dy = yidx * spy
+                self._add_rect(parts, gds_lay, gds_purp, x0 + dx, y0 + dy, x1 + dx, y1 + dy)
+
+    def _add_polygon(self, parts, gds_lay, gds_purp, points):
+        # type: (List[bytes], int, int, Sequence[Sequence[float]]) -> None
+        xy_list = [self._to_db(val) for pt in points for val in pt]
+        if xy_list[:2] != xy_list[-2:]:
+            xy_list.extend(xy_list[:2])
+        parts.append(_pack_record(_BOUNDARY))
+        parts.append(_pack_record(_LAYER, struct.pack('>H', gds_lay)))
+        parts.append(_pack_record(_DATATYPE, struct.pack('>H', gds_purp)))
+        parts.append(_pack_record(_XY, struct.pack('>%di' % len(xy_list), *xy_list)))
+        parts.append(_pack_record(_ENDEL))
+        self.num_shapes += 1
+
+    def _add_path(self, parts, path):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        gds_lay, gds_purp = self._get_layer(path['layer'])
+        path_type = _path_type.get(path.get('end_style', 'truncate'), 0)
+        xy_list = [self._to_db(val) for pt in path['points'] for val in pt]
+        parts.append(_pack_record(_PATH))
+        parts.append(_pack_record(_LAYER, struct.pack('>H', gds_lay)))
+        parts.append(_pack_record(_DATATYPE, struct.pack('>H', gds_purp)))
+        parts.append(_pack_record(_PATHTYPE, struct.pack('>h', path_type)))
+        parts.append(_pack_record(_WIDTH, struct.pack('>i', self._to_db(path['width']))))
+        parts.append(_pack_record(_XY, struct.pack('>%di' % len(xy_list), *xy_list)))
+        parts.append(_pack_record(_ENDEL))
+        self.num_shapes += 1
+
+    def _add_via(self, parts, via):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        arr_nx, arr_ny = via['arr_nx'], via['arr_ny']
+        arr_spx, arr_spy = self._to_db(via['arr_spx']), self._to_db(via['arr_spy'])
+        for lay, x0, y0, x1, y1, nx, ny, spx, spy in get_via_boxes(via, self._via_map,
+                                                                   self._res):
+            gds_lay, gds_purp = self._get_layer(lay)
+            for xidx in range(arr_nx):
+                for yidx in range(arr_ny):
+                    self._add_rect_array_db(parts, gds_lay, gds_purp,
+                                            x0 + xidx * arr_spx, y0 + yidx * arr_spy,
+                                            x1 + xidx * arr_spx, y1 + yidx * arr_spy,
+                                            nx, ny, spx, spy)
+
+    def _add_pin(self, parts, pin):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        gds_lay, gds_purp = self._get_layer(pin['layer'])
+        bbox = pin['bbox']
+        x0, y0 = self._to_db(bbox[0][0]), self._to_db(bbox[0][1])
+        x1, y1 = self._to_db(bbox[1][0]), self._to_db(bbox[1][1])
+        if pin.get('make_rect', True):
+            self._add_rect(parts, gds_lay, gds_purp, x0, y0, x1, y1)
+        # center the label in the pin rectangle.
+        label = pin['label'] or pin['net_name']
+        parts.append(_text_struct.pack(4, _TEXT, 6, _LAYER, gds_lay, 6, _TEXTTYPE, gds_purp,
+                                       6, _PRESENTATION, 0x0005, 12, _XY, (x0 + x1) // 2,
+                                       (y0 + y1) // 2))
+        parts.append(_pack_str(_STRING, label))
+        parts.append(_pack_record(_ENDEL))
+
+
+def write_gds(content_list, fname, lay_map, via_map, lib_name='LIB', resolution=0.001,
+              layout_unit=1.0e-6, buffer_size=1 << 20, now=None):
+    # type: (...) -> GdsWriter
+    """Writes the given layout contents to a GDS file.
+
+    Parameters
+    ----------
+    content_list : List[Tuple[Any, ...]]
+        the layout contents, as returned by :func:`get_content_list`.
+    fname : str
+        the GDS file name.
+    lay_map : Dict[Tuple[str, str], Tuple[int, int]]
+        the (layer, purpose) to (GDS layer, GDS datatype) dictionary.
+    via_map : Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]
+        the via ID to the (bottom, cut, top) layer/purpose pairs dictionary.
+    lib_name : str
+        the GDS library name.
+    resolution : float
+        the layout resolution, in layout units.
+    layout_unit : float
+        the layout unit, in meters.
+    buffer_size : int
+        the output buffer size, in bytes.
+    now : Optional[datetime.datetime]
+        the modification time stored in the file.  Defaults to the current time.  Give a fixed
+        time to write identical files for identical layouts.
+
+    Returns
+    -------
+    writer : GdsWriter
+        the writer, with the number of written structures, references and shapes.
+    """
+    with open(fname, 'wb', buffering=buffer_size) as f:
+        writer = GdsWriter(f, lay_map, via_map, resolution, layout_unit)
+        writer.write_header(lib_name, now=now)
+        for content in content_list:
+            writer.write_content(content)
+        writer.write_footer()
+    return writer
+
+
+def write_masters_gds(temp_db, template_list, fname, name_list=None, lib_name='',
+                      lay_map=None, via_map=None, **kwargs):
+    # type: (...) -> GdsWriter
+    """Writes the given masters and all their descendants to a GDS file.
+
+    This is the GDS equivalent of ``TemplateDB.batch_layout``.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    template_list : List[TemplateBase]
+        the top level masters.
+    fname : str
+        the GDS file name.
+    name_list : Optional[List[str]]
+        if given, the cell names of the top level masters.
+    lib_name : str
+        the GDS library name.  Defaults to the template database library name.
+    lay_map : Optional[Dict[Tuple[str, str], Tuple[int, int]]]
+        the layer map.  Defaults to the layer map of the technology.
+    via_map : Optional[Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]]
+        the via map.  Defaults to the via map of the technology.
+    **kwargs
+        additional arguments of :func:`write_gds`.
+
+    Returns
+    -------
+    writer : GdsWriter
+        the writer, with the number of written structures, references and shapes.
+    """
+    grid = temp_db.grid
+    lay_map, via_map = get_tech_maps(grid.tech_info, lay_map=lay_map, via_map=via_map)
+    lib_name = lib_name or temp_db.lib_name
+    content_list = get_content_list(temp_db, template_list, name_list=name_list,
+                                    lib_name=lib_name)
+    return write_gds(content_list, fname, lay_map, via_map=via_map, lib_name=lib_name,
+                     resolution=grid.resolution, layout_unit=grid.layout_unit, **kwargs)
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a LEF abstract writer for generated layout masters.
+
+The abstract of a master is built from its bounding box, the pins drawn by ``add_pin`` and
+``reexport`` and its routing blockages, so no abstract generation run on the OpenAccess view
+is needed.  Only pins drawn with ``show=True`` are written.  Pins are named by their labels;
+a trailing ``:`` marks a must-connect label, such as the ``VDD:`` and ``VSS:`` supply rails of
+:class:`~digital_ec.layout.stdcells.core.StdCellWrapper`, and each shape of a must-connect pin
+is written as its own port.
+
+Besides the routing blockages of the master, every layer given in obs_layers is covered by
+one obstruction over the whole bounding box.  By default these are all routing layers below
+the lowest layer with a pin that is not a must-connect pin, which contain the cell internals
+and the abutment supply shapes.  On the other routing layers, up to the top layer drawn in
+the hierarchy, the obstructions are the drawn rectangles, paths and polygons of the master
+and all of its descendants, except the pin shapes of the master, so pin access stays open.
+Vias and instances of cells that are not masters, such as primitives, are not flattened.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Sequence, Optional
+
+import os
+import math
+import itertools
+from collections import OrderedDict
+
+from .gds import get_master_content
+
+# instance orientation to the (x, y) scale factors.
+_orient_scale = {
+    'R0': (1, 1),
+    'MX': (1, -1),
+    'MY': (-1, 1),
+    'R180': (-1, -1),
+}
+
+if TYPE_CHECKING:
+    from bag.layout.template import TemplateBase
+
+# default supply pin names.
+power_names = ('VDD', )
+ground_names = ('VSS', )
+
+
+class _BoxIndex(object):
+    """A bucket grid of rectangles on one layer, used to find rectangles inside other ones.
+
+    Every rectangle is added to all buckets it overlaps, so a rectangle that contains a query
+    rectangle is always in the bucket of the query's lower left corner.
+
+    Parameters
+    ----------
+    bucket_size : int
+        the bucket width and height, in resolution units.
+    """
+
+    def __init__(self, bucket_size):
+        # type: (int) -> None
+        self._size = max(1, bucket_size)
+        self._table = {}  # type: Dict[Tuple[int, int], List[Tuple[int, int, int, int]]]
+
+    def add(self, box):
+        # type: (Tuple[int, int, int, int]) -> None
+        size = self._size
+        for col in range(box[0] // size, box[2] // size + 1):
+            for row in range(box[1] // size, box[3] // size + 1):
+                bucket = self._table.get((col, row), None)
+                if bucket is None:
+                    self._table[(col, row)] = [box]
+                else:
+                    bucket.append(box)
+
+    def contains(self, box):
+        # type: (Tuple[int, int, int, int]) -> bool
+        """Returns True if the given rectangle is inside one of the rectangles of this index."""
+        size = self._size
+        bucket = self._table.get((box[0] // size, box[1] // size), ())
+        return any(test[0] <= box[0] and test[1] <= box[1] and box[2] <= test[2] and
+                   box[3] <= test[3] for test in bucket)
+
+
+class LefWriter(object):
+    """Writes LEF macros of layout masters.
+
+    Parameters
+    ----------
+    f : Any
+        the text output file.
+    resolution : float
+        the layout resolution, in layout units.
+    layout_unit : float
+        the layout unit, in meters.
+    """
+
+    def __init__(self, f, resolution, layout_unit):
+        # type: (Any, float, float) -> None
+        self._f = f
+        self._res = resolution
+        # the size of a resolution unit in microns, and the number of decimal digits needed.
+        self._scale = resolution * layout_unit / 1.0e-6
+        self._fmt = '%%.%df' % max(0, int(math.ceil(-math.log10(self._scale) - 1e-9)))
+        self.num_macros = 0
+        # master key to the flattened routing layer shapes and pin shapes of the master.
+        self._shape_table = {}  # type: Dict[Any, Tuple[List[Tuple[int, Any]], List]]
+
+    def _to_unit(self, val):
+        # type: (float) -> int
+        return int(round(val / self._res))
+
+    def _fmt_pt(self, *vals):
+        # type: (*int) -> str
+        return ' '.join(self._fmt % (val * self._scale) for val in vals)
+
+    def write_header(self):
+        # type: () -> None
+        """Writes the LEF header.  Bus bits use angle brackets, as in BAG pin names."""
+        self._f.write('VERSION 5.8 ;\nBUSBITCHARS "<>" ;\nDIVIDERCHAR "/" ;\n\n')
+
+    def write_footer(self):
+        # type: () -> None
+        self._f.write('END LIBRARY\n')
+
+    def write_macro(self, master, cell_name='', macro_class='CORE', site='', symmetry='X Y',
+                    pin_dirs=None, obs_layers=None):
+        # type: (TemplateBase, str, str, str, str, Optional[Dict[str, str]], Any) -> None
+        """Writes the LEF macro of the given master.
+
+        Parameters
+        ----------
+        master : TemplateBase
+            the layout master.
+        cell_name : str
+            the macro name.  Defaults to the master cell name.
+        macro_class : str
+            the macro class.
+        site : str
+            if given, the placement site of the macro.
+        symmetry : str
+            the macro symmetry.
+        pin_dirs : Optional[Dict[str, str]]
+            pin name to pin direction dictionary.  Pins not in this dictionary are INOUT.
+        obs_layers : Optional[Sequence[int]]
+            routing layers fully covered by an obstruction.  Defaults to all routing layers
+            below the lowest layer with a pin that is not a must-connect pin.  Other routing
+            layers up to the top drawn layer are obstructed by the drawn shapes.
+        """
+        cell_name = cell_name or master.cell_name
+        pin_dirs = pin_dirs or {}
+        grid = master.grid
+        tech_info = grid.tech_info
+        bbox = master.bound_box
+        x0, y0, x1, y1 = bbox.left_unit, bbox.bottom_unit, bbox.right_unit, bbox.top_unit
+        temp_db = master.template_db
+
+        def rename_fun(name):
+            # type: (str) -> str
+            return cell_name if name == master.cell_name else temp_db.format_cell_name(name)
+
+        content = get_master_content(master, temp_db.lib_name, rename_fun)
+        pin_list, blockage_list = content[4], content[6]
+
+        # group pin shapes by pin name and layer, keeping the drawing order.
+        pin_table = OrderedDict()  # type: Dict[str, Tuple[bool, List[Tuple[str, Tuple]]]]
+        lay_table = {tech_info.get_layer_name(lay_id): lay_id for lay_id in grid.layers}
+        access_layers = set()
+        pin_boxes = set()
+        for pin in pin_list:
+            label = pin['label'] or pin['net_name']
+            must_join = label.endswith(':')
+            name = label.rstrip(':')
+            bnd = pin['bbox']
+            box = (self._to_unit(bnd[0][0]) - x0, self._to_unit(bnd[0][1]) - y0,
+                   self._to_unit(bnd[1][0]) - x0, self._to_unit(bnd[1][1]) - y0)
+            entry = pin_table.get(name, None)
+            if entry is None:
+                pin_table[name] = entry = (must_join, [])
+            entry[1].append((pin['layer'][0], box))
+            lay_id = lay_table.get(pin['layer'][0], None)
+            if lay_id is not None:
+                pin_boxes.add((lay_id, box))
+                if not must_join:
+                    access_layers.add(lay_id)
+
+        # shapes of the master and its descendants, relative to the bounding box origin.
+        drawn_shapes = []
+        for lay_id, geo in self._get_shapes(master, lay_table, rename_fun)[0]:
+            if isinstance(geo, tuple):
+                geo = (geo[0] - x0, geo[1] - y0, geo[2] - x0, geo[3] - y0)
+            else:
+                geo = [(pt[0] - x0, pt[1] - y0) for pt in geo]
+            drawn_shapes.append((lay_id, geo))
+        drawn_layers = {lay_id for lay_id, _ in drawn_shapes} | {lay_id for lay_id, _ in pin_boxes}
+        top_layer = max(drawn_layers) if drawn_layers else grid.layers[0]
+
+        if obs_layers is None:
+            bot_access_layer = min(access_layers) if access_layers else grid.layers[-1] + 1
+            obs_layers = [lay_id for lay_id in grid.layers
+                          if lay_id < bot_access_layer and lay_id <= top_layer]
+
+        lines = ['MACRO %s' % cell_name,
+                 '  CLASS %s ;' % macro_class,
+                 '  ORIGIN 0 0 ;',
+                 '  FOREIGN %s %s ;' % (cell_name, self._fmt_pt(-x0, -y0)),
+                 '  SIZE %s BY %s ;' % (self._fmt_pt(x1 - x0), self._fmt_pt(y1 - y0))]
+        if symmetry:
+            lines.append('  SYMMETRY %s ;' % symmetry)
+        if site:
+            lines.append('  SITE %s ;' % site)
+
+        for name, (must_join, shape_list) in pin_table.items():
+            if name in power_names:
+                use = 'POWER'
+            elif name in ground_names:
+                use = 'GROUND'
+            else:
+                use = 'SIGNAL'
+            lines.append('  PIN %s' % name)
+            lines.append('    DIRECTION %s ;' % pin_dirs.get(name, 'INOUT'))
+            lines.append('    USE %s ;' % use)
+            if must_join and use != 'SIGNAL':
+                lines.append('    SHAPE ABUTMENT ;')
+            port_list = [[shape] for shape in shape_list] if must_join else [shape_list]
+            for port_shapes in port_list:
+                lines.append('    PORT')
+                self._add_shapes(lines, port_shapes, '      ')
+                lines.append('    END')
+            lines.append('  END %s' % name)
+
+        obs_shapes = [(tech_info.get_layer_name(lay_id), (0, 0, x1 - x0, y1 - y0))
+                      for lay_id in obs_layers]
+        obs_set = set(obs_layers)
+        # skip rectangles inside larger rectangles or pin shapes.
+        drawn_shapes.sort(key=lambda shape: (shape[0], isinstance(shape[1], tuple) and
+                                             (shape[1][0] - shape[1][2]) *
+                                             (shape[1][3] - shape[1][1])))
+        box_table = {}  # type: Dict[int, _BoxIndex]
+
+        def _get_index(idx_lay_id):
+            # type: (int) -> _BoxIndex
+            box_index = box_table.get(idx_lay_id, None)
+            if box_index is None:
+                pitch = grid.get_track_pitch(idx_lay_id, unit_mode=True)
+                box_table[idx_lay_id] = box_index = _BoxIndex(4 * pitch)
+            return box_index
+
+        for lay_id, box in pin_boxes:
+            _get_index(lay_id).add(box)
+        for lay_id, geo in drawn_shapes:
+            if lay_id not in obs_set:
+                if isinstance(geo, tuple):
+                    box_index = _get_index(lay_id)
+                    if box_index.contains(geo):
+                        continue
+                    box_index.add(geo)
+                obs_shapes.append((tech_info.get_layer_name(lay_id), geo))
+        for blockage in blockage_list:
+            points = [(self._to_unit(pt[0]) - x0, self._to_unit(pt[1]) - y0)
+                      for pt in blockage['points']]
+            obs_shapes.append((blockage['layer'], points))
+        if obs_shapes:
+            lines.append('  OBS')
+            self._add_shapes(lines, obs_shapes, '    ')
+            lines.append('  END')
+        lines.append('END %s\n\n' % cell_name)
+
+        self._f.write('\n'.join(lines))
+        self.num_macros += 1
+
+    def _get_shapes(self, master, lay_table, rename_fun):
+        # type: (TemplateBase, Dict[str, int], Any) -> Tuple[List[Tuple[int, Any]], List]
+        """Returns the routing layer shapes of the given master and all of its descendants.
+
+        Shapes are given as (layer ID, geometry) tuples in resolution units, where the geometry
+        is a (x0, y0, x1, y1) tuple for rectangles or a list of points for polygons.  The pin
+        shapes of the given master are returned separately, the pin shapes of its descendants
+        are drawn shapes.  The result of every master is computed once per writer.
+
+        Returns
+        -------
+        shape_list : List[Tuple[int, Any]]
+            the drawn shapes.
+        pin_shape_list : List[Tuple[int, Any]]
+            the pin shapes of the given master.
+        """
+        key = master.key
+        if key in self._shape_table:
+            return self._shape_table[key]
+
+        temp_db = master.template_db
+        content = get_master_content(master, temp_db.lib_name, rename_fun)
+        inst_list, rect_list, pin_list, path_list, polygon_list = (content[1], content[2],
+                                                                   content[4], content[5],
+                                                                   content[8])
+        to_unit = self._to_unit
+        ans = []
+        for rect in rect_list:
+            lay_id = lay_table.get(rect['layer'][0], None)
+            if lay_id is not None:
+                (bx0, by0), (bx1, by1) = rect['bbox']
+                box = (to_unit(bx0), to_unit(by0), to_unit(bx1), to_unit(by1))
+                spx, spy = to_unit(rect['arr_spx']), to_unit(rect['arr_spy'])
+                for xidx in range(rect['arr_nx']):
+                    for yidx in range(rect['arr_ny']):
+                        dx, dy = xidx * spx, yidx * spy
+                        ans.append((lay_id, (box[0] + dx, box[1] + dy, box[2] + dx,
+                                             box[3] + dy)))
+        for path in path_list:
+            lay_id = lay_table.get(path['layer'][0], None)
+            if lay_id is not None:
+                # obstruct the bounding box of the path.
+                half_w = path['width'] / 2
+                xs = [pt[0] for pt in path['points']]
+                ys = [pt[1] for pt in path['points']]
+                ans.append((lay_id, (to_unit(min(xs) - half_w), to_unit(min(ys) - half_w),
+                                     to_unit(max(xs) + half_w), to_unit(max(ys) + half_w))))
+        for polygon in polygon_list:
+            lay_id = lay_table.get(polygon['layer'][0], None)
+            if lay_id is not None:
+                ans.append((lay_id, [(to_unit(pt[0]), to_unit(pt[1]))
+                                     for pt in polygon['points']]))
+        pin_ans = []
+        for pin in pin_list:
+            lay_id = lay_table.get(pin['layer'][0], None)
+            if lay_id is not None and pin.get('make_rect', True):
+                (bx0, by0), (bx1, by1) = pin['bbox']
+                pin_ans.append((lay_id, (to_unit(bx0), to_unit(by0), to_unit(bx1), to_unit(by1))))
+
+        # the pin shapes of a child master are drawn shapes of its parent.
+        child_table = {}
+        for child_key in sorted(master.children or (), key=repr):
+            child = temp_db.find_master(child_key)
+            child_table[rename_fun(child.cell_name)] = child
+        for inst in inst_list:
+            child = child_table.get(inst['cell'], None)
+            if child is None:
+                continue
+            try:
+                scale_x, scale_y = _orient_scale[inst['orient']]
+            except KeyError:
+                raise ValueError('Unsupported orientation: %s' % inst['orient'])
+            child_shapes, child_pins = self._get_shapes(child, lay_table, rename_fun)
+            loc_x, loc_y = to_unit(inst['loc'][0]), to_unit(inst['loc'][1])
+            spx, spy = to_unit(inst['sp_cols']), to_unit(inst['sp_rows'])
+            for xidx in range(inst['num_cols']):
+                for yidx in range(inst['num_rows']):
+                    dx, dy = loc_x + xidx * spx, loc_y + yidx * spy
+                    for lay_id, geo in itertools.chain(child_shapes, child_pins):
+                        if isinstance(geo, tuple):
+                            xa, xb = sorted((scale_x * geo[0], scale_x * geo[2]))
+                            ya, yb = sorted((scale_y * geo[1], scale_y * geo[3]))
+                            ans.append((lay_id, (xa + dx, ya + dy, xb + dx, yb + dy)))
+                        else:
+                            ans.append((lay_id, [(scale_x * pt[0] + dx, scale_y * pt[1] + dy)
+                                                 for pt in geo]))
+
+        self._shape_table[key] = ans, pin_ans
+        return ans, pin_ans
+
+    def _add_shapes(self, lines, shape_list, indent):
+        # type: (List[str], Sequence[Tuple[Any, Any]], str) -> None
+        """Adds LAYER statements followed by RECT or POLYGON statements."""
+        cur_layer = None
+        for lay, geo in shape_list:
+            if isinstance(lay, (list, tuple)):
+                lay = lay[0]
+            if lay != cur_layer:
+                lines.append('%sLAYER %s ;' % (indent, lay))
+                cur_layer = lay
+            if isinstance(geo, tuple):
+                lines.append('%s  RECT %s ;' % (indent, self._fmt_pt(*geo)))
+            else:
+                lines.append('%s  POLYGON %s ;' % (indent, self._fmt_pt(*(val for pt in geo
+                                                                         for val in pt))))
+
+
+def write_lef(master_list, fname, name_list=None, **kwargs):
+    # type: (Sequence[TemplateBase], str, Optional[Sequence[str]], **Any) -> LefWriter
+    """Writes the LEF abstracts of the given masters.
+
+    Parameters
+    ----------
+    master_list : Sequence[TemplateBase]
+        the layout masters.
+    fname : str
+        the LEF file name.
+    name_list : Optional[Sequence[str]]
+        if given, the macro names.  Defaults to the master cell names.
+    **kwargs
+        additional arguments of :meth:`LefWriter.write_macro`.
+
+    Returns
+    -------
+    writer : LefWriter
+        the writer.
+    """
+    if not master_list:
+        raise ValueError('No masters to write.')
+    if name_list is None:
+        name_list = [''] * len(master_list)
+    grid = master_list[0].grid
+
+    dir_name = os.path.dirname(fname)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    with open(fname, 'w') as f:
+        writer = LefWriter(f, grid.resolution, grid.layout_unit)
+        writer.write_header()
+        for master, name in zip(master_list, name_list):
+            writer.write_macro(master, cell_name=name, **kwargs)
+        writer.write_footer()
+    return writer
@@ -0,0 +1,514 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains an OASIS writer for generated layout masters.
+
+The writer is the OASIS counterpart of :mod:`digital_ec.layout.gds`, and uses the same layer
+and via maps.  Arrayed instances, such as blocks added with ``add_digital_block(nx=...)`` and
+substrate tap columns, arrayed rectangles and via cut arrays are written as OASIS repetitions
+instead of individual elements.  The records of every cell are compressed in a CBLOCK by
+default.  Modal layer, datatype and size variables are reused within a cell.
+
+Routing blockages are not written.  OASIS paths store the half width and have no round ends,
+so paths must have an even width in resolution units and a truncate or extend end style.
+"""
+
+from typing import TYPE_CHECKING, Dict, Any, List, Tuple, Sequence, Optional
+
+import zlib
+import struct
+
+from .gds import get_tech_maps, get_content_list, get_via_boxes, LayerMap, ViaMap
+
+if TYPE_CHECKING:
+    from bag.layout.template import TemplateBase, TemplateDB
+
+_magic = b'%SEMI-OASIS\r\n'
+
+# OASIS record IDs.
+_START = 1
+_END = 2
+_CELLNAME = 3
+_CELL = 13
+_PLACEMENT = 17
+_TEXT = 19
+_RECTANGLE = 20
+_POLYGON = 21
+_PATH = 22
+_CBLOCK = 34
+
+# the END record is padded to this length.
+_end_size = 256
+
+# orientation to the (rotation angle / 90, flip) of an OASIS placement.  The flip mirrors
+# about the x axis before the rotation.
+_oasis_orient = {
+    'R0': (0, 0),
+    'R90': (1, 0),
+    'R180': (2, 0),
+    'R270': (3, 0),
+    'MX': (0, 1),
+    'MY': (2, 1),
+    'MXR90': (1, 1),
+    'MYR90': (3, 1),
+}
+
+# BAG path end style to the OASIS extension scheme.  OASIS has no round path ends.
+_path_ext = {
+    'truncate': 1,
+    'extend': 2,
+}
+
+
+def _pack_uint(val):
+    # type: (int) -> bytes
+    out = bytearray()
+    while val > 0x7f:
+        out.append((val & 0x7f) | 0x80)
+        val >>= 7
+    out.append(val)
+    return bytes(out)
+
+
+def _pack_sint(val):
+    # type: (int) -> bytes
+    return _pack_uint((-val << 1) | 1 if val < 0 else val << 1)
+
+
+def _pack_str(val):
+    # type: (str) -> bytes
+    data = val.encode('ascii')
+    return _pack_uint(len(data)) + data
+
+
+def _pack_real(val):
+    # type: (float) -> bytes
+    if val == int(val) and val >= 0:
+        return _pack_uint(0) + _pack_uint(int(val))
+    return _pack_uint(7) + struct.pack('<d', val)
+
+
+def _pack_gdelta(dx, dy):
+    # type: (int, int) -> bytes
+    """Encodes a general direction delta, with the x sign and magnitude in the first integer."""
+    return _pack_uint((abs(dx) << 2) | (2 if dx < 0 else 0) | 1) + _pack_sint(dy)
+
+
+def _pack_repetition(nx, ny, spx, spy):
+    # type: (int, int, int, int) -> bytes
+    """Encodes a uniform array repetition.  Pitches must be positive if the count is above 1."""
+    if nx > 1 and ny > 1:
+        return (_pack_uint(1) + _pack_uint(nx - 2) + _pack_uint(ny - 2) + _pack_uint(spx) +
+                _pack_uint(spy))
+    if nx > 1:
+        return _pack_uint(2) + _pack_uint(nx - 2) + _pack_uint(spx)
+    return _pack_uint(3) + _pack_uint(ny - 2) + _pack_uint(spy)
+
+
+def _normalize_array(x0, y0, nx, ny, spx, spy):
+    # type: (int, int, int, int, int, int) -> Tuple[int, int, int, int, int, int]
+    """Moves the origin of an array so both pitches are non-negative.
+
+    Counts with zero pitch are reduced to 1, as all their elements coincide.
+    """
+    if nx > 1 and spx == 0:
+        nx = 1
+    if ny > 1 and spy == 0:
+        ny = 1
+    if spx < 0:
+        x0 += (nx - 1) * spx
+        spx = -spx
+    if spy < 0:
+        y0 += (ny - 1) * spy
+        spy = -spy
+    return x0, y0, nx, ny, spx, spy
+
+
+class OasisWriter(object):
+    """Writes layout contents as OASIS cells.
+
+    Parameters
+    ----------
+    f : Any
+        the binary output file.
+    lay_map : Dict[Tuple[str, str], Tuple[int, int]]
+        the (layer, purpose) to (layer number, datatype number) dictionary.
+    via_map : Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]
+        the via ID to the (bottom, cut, top) layer/purpose pairs dictionary.
+    resolution : float
+        the layout resolution, in layout units.
+    layout_unit : float
+        the layout unit, in meters.
+    compress : bool
+        True to compress the records of every cell in a CBLOCK.
+    level : int
+        the DEFLATE compression level.
+    """
+
+    def __init__(self, f, lay_map, via_map, resolution, layout_unit, compress=True, level=6):
+        # type: (Any, LayerMap, ViaMap, float, float, bool, int) -> None
+        self._f = f
+        self._lay_map = lay_map
+        self._via_map = via_map
+        self._res = resolution
+        self._layout_unit = layout_unit
+        self._compress = compress
+        self._level = level
+        self._cell_ids = {}  # type: Dict[str, int]
+        # modal variables of the current cell.
+        self._modal = {}  # type: Dict[str, Any]
+        self.num_cells = 0
+        self.num_placements = 0
+        self.num_repetitions = 0
+        self.num_shapes = 0
+
+    def _to_db(self, val):
+        # type: (float) -> int
+        return int(round(val / self._res))
+
+    def _get_layer(self, lay):
+        # type: (Sequence[str]) -> Tuple[int, int]
+        try:
+            return self._lay_map[(lay[0], lay[1])]
+        except KeyError:
+            raise ValueError('Layer %s is not in the OASIS layer map.' % (tuple(lay), ))
+
+    def _write_block(self, data):
+        # type: (bytes) -> None
+        if self._compress and data:
+            comp = zlib.compressobj(self._level, zlib.DEFLATED, -15)
+            comp_data = comp.compress(data) + comp.flush()
+            self._f.write(b''.join((_pack_uint(_CBLOCK), _pack_uint(0), _pack_uint(len(data)),
+                                    _pack_uint(len(comp_data)), comp_data)))
+        else:
+            self._f.write(data)
+
+    def write_header(self, cell_names):
+        # type: (Sequence[str]) -> None
+        """Writes the START record and the names of all cells.
+
+        Cells are referred to by the index of their name in cell_names.
+        """
+        # unit is the number of database units per micron.  Table offsets are all zero.
+        unit = round(1.0e-6 / (self._res * self._layout_unit), 9)
+        self._f.write(_magic + _pack_uint(_START) + _pack_str('1.0') + _pack_real(unit) +
+                      _pack_uint(0) + _pack_uint(0) * 12)
+        self._cell_ids = {name: idx for idx, name in enumerate(cell_names)}
+        self._write_block(b''.join(_pack_uint(_CELLNAME) + _pack_str(name)
+                                   for name in cell_names))
+
+    def write_footer(self):
+        # type: () -> None
+        """Writes the END record, without validation."""
+        head = _pack_uint(_END)
+        tail = _pack_uint(0)
+        # the padding string fills the record to its fixed size; its length takes two bytes.
+        pad_size = _end_size - len(head) - len(tail) - 2
+        self._f.write(head + _pack_uint(pad_size) + b'\0' * pad_size + tail)
+
+    def write_content(self, content):
+        # type: (Tuple[Any, ...]) -> None
+        """Writes the layout content of one master as an OASIS cell."""
+        (cell_name, inst_list, rect_list, via_list, pin_list, path_list, _,
+         bnd_list, polygon_list) = content
+
+        self._modal = {}
+        parts = [_pack_uint(_CELL), _pack_uint(self._get_cell_id(cell_name))]
+        for inst in inst_list:
+            self._add_inst(parts, inst)
+        for rect in rect_list:
+            lay = self._get_layer(rect['layer'])
+            bbox = rect['bbox']
+            self._add_rect(parts, lay, self._to_db(bbox[0][0]), self._to_db(bbox[0][1]),
+                           self._to_db(bbox[1][0]), self._to_db(bbox[1][1]), rect['arr_nx'],
+                           rect['arr_ny'], self._to_db(rect['arr_spx']),
+                           self._to_db(rect['arr_spy']))
+        for via in via_list:
+            self._add_via(parts, via)
+        for pin in pin_list:
+            self._add_pin(parts, pin)
+        for path in path_list:
+            self._add_path(parts, path)
+        for polygon in polygon_list:
+            self._add_polygon(parts, self._get_layer(polygon['layer']), polygon['points'])
+        for bnd in bnd_list:
+            lay = self._lay_map.get(('prBoundary', bnd['type']), None)
+            if lay is not None:
+                self._add_polygon(parts, lay, bnd['points'])
+
+        self._write_block(b''.join(parts))
+        self.num_cells += 1
+
+    def _get_cell_id(self, cell_name):
+        # type: (str) -> int
+        try:
+            return self._cell_ids[cell_name]
+        except KeyError:
+            raise ValueError('Cell %s is not in the cell name table.' % cell_name)
+
+    def _get_repetition(self, x0, y0, nx, ny, spx, spy):
+        # type: (int, int, int, int, int, int) -> Tuple[int, int, bytes]
+        """Returns the origin and the encoded repetition of an array, if any."""
+        x0, y0, nx, ny, spx, spy = _normalize_array(x0, y0, nx, ny, spx, spy)
+        if nx > 1 or ny > 1:
+            self.num_repetitions += 1
+            return x0, y0, _pack_repetition(nx, ny, spx, spy)
+        return x0, y0, b''
+
+    def _add_layer(self, out, info, lay, lay_bit, dt_bit):
+        # type: (List[bytes], int, Tuple[int, int], int, int) -> int
+        """Appends the layer and datatype, if they differ from the modal values."""
+        modal = self._modal
+        if modal.get('layer', None) != lay[0]:
+            modal['layer'] = lay[0]
+            info |= lay_bit
+            out.append(_pack_uint(lay[0]))
+        if modal.get('datatype', None) != lay[1]:
+            modal['datatype'] = lay[1]
+            info |= dt_bit
+            out.append(_pack_uint(lay[1]))
+        return info
+
+    def _add_inst(self, parts, inst):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        orient = inst['orient']
+        try:
+            rot, flip = _oasis_orient[orient]
+        except KeyError:
+            raise ValueError('Unsupported orientation: %s' % orient)
+        x0, y0, rep = self._get_repetition(self._to_db(inst['loc'][0]),
+                                           self._to_db(inst['loc'][1]), inst['num_cols'],
+                                           inst['num_rows'], self._to_db(inst['sp_cols']),
+                                           self._to_db(inst['sp_rows']))
+        # explicit cell reference number, x and y.
+        info = 0xf0 | (rot << 1) | flip
+        if rep:
+            info |= 0x08
+        parts.append(b''.join((_pack_uint(_PLACEMENT), bytes((info, )),
+                               _pack_uint(self._get_cell_id(inst['cell'])), _pack_sint(x0),
+                               _pack_sint(y0), rep)))
+        self.num_placements += 1
+
+    def _add_rect(self, parts, lay, x0, y0, x1, y1, nx=1, ny=1, spx=0, spy=0):
+        # type: (List[bytes], Tuple[int, int], int, int, int, int, int, int, int, int) -> None
+        w, h = x1 - x0, y1 - y0
+        x0, y0, rep = self._get_repetition(x0, y0, nx, ny, spx, spy)
+        # x, y and the repetition are always given.
+        info = 0x18
+        out = []  # type: List[bytes]
+        info = self._add_layer(out, info, lay, 0x01, 0x02)
+        modal = self._modal
+        if w == h:
+            # squares set both modal sizes to the width.
+            info |= 0x80
+            if modal.get('width', None) != w:
+                info |= 0x40
+                out.append(_pack_uint(w))
+        else:
+            if modal.get('width', None) != w:
+                info |= 0x40
+                out.append(_pack_uint(w))
+            if modal.get('height', None) != h:
+                info |= 0x20
+                out.append(_pack_uint(h))
+        modal['width'], modal['height'] = w, h
+        out.append(_pack_sint(x0))
+        out.append(_pack_sint(y0))
+        if rep:
+            info |= 0x04
+            out.append(rep)
+        parts.append(_pack_uint(_RECTANGLE))
+        parts.append(bytes((info, )))
+        parts.extend(out)
+        self.num_shapes += 1
+
+    def _add_polygon(self, parts, lay, points):
+        # type: (List[bytes], Tuple[int, int], Sequence[Sequence[float]]) -> None
+        pt_list = [(self._to_db(pt[0]), self._to_db(pt[1])) for pt in points]
+        if len(pt_list) > 1 and pt_list[0] == pt_list[-1]:
+            pt_list.pop()
+        xs = sorted({pt[0] for pt in pt_list})
+        ys = sorted({pt[1] for pt in pt_list})
+        if len(pt_list) == 4 and len(xs) == 2 and len(ys) == 2:
+            # write axis-aligned boxes as rectangles.
+            self._add_rect(parts, lay, xs[0], ys[0], xs[1], ys[1])
+            return
+
+        info = 0x38
+        out = []  # type: List[bytes]
+        info = self._add_layer(out, info, lay, 0x01, 0x02)
+        x0, y0 = pt_list[0]
+        # an all-angle point list, relative to the first point; the polygon closes itself.
+        out.append(_pack_uint(4))
+        out.append(_pack_uint(len(pt_list) - 1))
+        for (xa, ya), (xb, yb) in zip(pt_list, pt_list[1:]):
+            out.append(_pack_gdelta(xb - xa, yb - ya))
+        out.append(_pack_sint(x0))
+        out.append(_pack_sint(y0))
+        parts.append(_pack_uint(_POLYGON))
+        parts.append(bytes((info, )))
+        parts.extend(out)
+        self.num_shapes += 1
+
+    def _add_path(self, parts, path):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        lay = self._get_layer(path['layer'])
+        pt_list = [(self._to_db(pt[0]), self._to_db(pt[1])) for pt in path['points']]
+        end_style = path.get('end_style', 'truncate')
+        try:
+            ext = _path_ext[end_style]
+        except KeyError:
+            raise ValueError('Path end style %s is not supported in OASIS.' % end_style)
+        width = self._to_db(path['width'])
+        if width % 2 != 0:
+            # OASIS paths store the half width.
+            raise ValueError('Path width %d is odd; OASIS paths need an even width.' % width)
+
+        # half width, extension scheme, point list, x and y are always given.
+        info = 0xf8
+        out = []  # type: List[bytes]
+        info = self._add_layer(out, info, lay, 0x01, 0x02)
+        out.append(_pack_uint(width // 2))
+        out.append(_pack_uint((ext << 2) | ext))
+        out.append(_pack_uint(4))
+        out.append(_pack_uint(len(pt_list) - 1))
+        for (xa, ya), (xb, yb) in zip(pt_list, pt_list[1:]):
+            out.append(_pack_gdelta(xb - xa, yb - ya))
+        out.append(_pack_sint(pt_list[0][0]))
+        out.append(_pack_sint(pt_list[0][1]))
+        parts.append(_pack_uint(_PATH))
+        parts.append(bytes((info, )))
+        parts.extend(out)
+        self.num_shapes += 1
+
+    def _add_via(self, parts, via):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        arr_nx, arr_ny = via['arr_nx'], via['arr_ny']
+        arr_spx, arr_spy = self._to_db(via['arr_spx']), self._to_db(via['arr_spy'])
+        for lay, x0, y0, x1, y1, nx, ny, spx, spy in get_via_boxes(via, self._via_map,
+                                                                   self._res):
+            lay = self._get_layer(lay)
+            if nx == 1 and ny == 1:
+                # single cuts and enclosures take the via array repetition.
+                self._add_rect(parts, lay, x0, y0, x1, y1, arr_nx, arr_ny, arr_spx, arr_spy)
+            else:
+                for xidx in range(arr_nx):
+                    for yidx in range(arr_ny):
+                        dx, dy = xidx * arr_spx, yidx * arr_spy
+                        self._add_rect(parts, lay, x0 + dx, y0 + dy, x1 + dx, y1 + dy,
+                                       nx, ny, spx, spy)
+
+    def _add_pin(self, parts, pin):
+        # type: (List[bytes], Dict[str, Any]) -> None
+        lay = self._get_layer(pin['layer'])
+        bbox = pin['bbox']
+        x0, y0 = self._to_db(bbox[0][0]), self._to_db(bbox[0][1])
+        x1, y1 = self._to_db(bbox[1][0]), self._to_db(bbox[1][1])
+        if pin.get('make_rect', True):
+            self._add_rect(parts, lay, x0, y0, x1, y1)
+
+        # explicit text string, x and y; text layers are modal separately from shape layers.
+        info = 0x58
+        out = [_pack_str(pin['label'] or pin['net_name'])]
+        modal = self._modal
+        if modal.get('textlayer', None) != lay[0]:
+            modal['textlayer'] = lay[0]
+            info |= 0x01
+            out.append(_pack_uint(lay[0]))
+        if modal.get('texttype', None) != lay[1]:
+            modal['texttype'] = lay[1]
+            info |= 0x02
+            out.append(_pack_uint(lay[1]))
+        out.append(_pack_sint((x0 + x1) // 2))
+        out.append(_pack_sint((y0 + y1) // 2))
+        parts.append(_pack_uint(_TEXT))
+        parts.append(bytes((info, )))
+        parts.extend(out)
+
+
+def write_oasis(content_list, fname, lay_map, via_map, resolution=0.001,
+                layout_unit=1.0e-6, compress=True, level=6, buffer_size=1 << 20):
+    # type: (...) -> OasisWriter
+    """Writes the given layout contents to an OASIS file.
+
+    Parameters
+    ----------
+    content_list : List[Tuple[Any, ...]]
+        the layout contents, as returned by :func:`~digital_ec.layout.gds.get_content_list`.
+    fname : str
+        the OASIS file name.
+    lay_map : Dict[Tuple[str, str], Tuple[int, int]]
+        the (layer, purpose) to (layer number, datatype number) dictionary.
+    via_map : Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]
+        the via ID to the (bottom, cut, top) layer/purpose pairs dictionary.
+    resolution : float
+        the layout resolution, in layout units.
+    layout_unit : float
+        the layout unit, in meters.
+    compress : bool
+        True to compress the records of every cell in a CBLOCK.
+    level : int
+        the DEFLATE compression level.
+    buffer_size : int
+        the output buffer size, in bytes.
+
+    Returns
+    -------
+    writer : OasisWriter
+        the writer, with the number of written cells, placements, repetitions and shapes.
+
+    Raises
+    ------
+    ValueError
+        if a path has an odd width or a round end style, which OASIS cannot represent.
+    """
+    # instances of cells outside the content list, such as primitives, refer to their names.
+    cell_names = [content[0] for content in content_list]
+    name_set = set(cell_names)
+    for content in content_list:
+        for inst in content[1]:
+            if inst['cell'] not in name_set:
+                name_set.add(inst['cell'])
+                cell_names.append(inst['cell'])
+
+    with open(fname, 'wb', buffering=buffer_size) as f:
+        writer = OasisWriter(f, lay_map, via_map, resolution, layout_unit,
+                             compress=compress, level=level)
+        writer.write_header(cell_names)
+        for content in content_list:
+            writer.write_content(content)
+        writer.write_footer()
+    return writer
+
+
+def write_masters_oasis(temp_db, template_list, fname, name_list=None, lay_map=None,
+                        via_map=None, **kwargs):
+    # type: (...) -> OasisWriter
+    """Writes the given masters and all their descendants to an OASIS file.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+        the template database.
+    template_list : List[TemplateBase]
+        the top level masters.
+    fname : str
+        the OASIS file name.
+    name_list : Optional[List[str]]
+        if given, the cell names of the top level masters.
+    lay_map : Optional[Dict[Tuple[str, str], Tuple[int, int]]]
+        the layer map.  Defaults to the layer map of the technology.
+    via_map : Optional[Dict[str, Tuple[Tuple[str, str], Tuple[str, str], Tuple[str, str]]]]
+        the via map.  Defaults to the via map of the technology.
+    **kwargs
+        additional arguments of :func:`write_oasis`.
+
+    Returns
+    -------
+    writer : OasisWriter
+        the writer, with the number of written cells, placements, repetitions and shapes.
+    """
+    grid = temp_db.grid
+    lay_map, via_map = get_tech_maps(grid.tech_info, lay_map=lay_map, via_map=via_map)
+    content_list = get_content_list(temp_db, template_list, name_list=name_list)
+    return write_oasis(content_list, fname, lay_map, via_map=via_map,
+                       resolution=grid.resolution, layout_unit=grid.layout_unit, **kwargs)
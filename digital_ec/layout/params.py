@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains utility functions for handling generator parameters."""
+
+from typing import Dict, Any, Iterator, Optional
+
+import hashlib
+from numbers import Number
+from collections.abc import Mapping
+
+
+def freeze(val):
+    # type: (Any) -> Any
+    """Returns a canonical, hashable representation of the given parameter value.
+
+    Dictionaries become tuples of sorted key/value pairs, lists and tuples become tuples,
+    and sets become sorted tuples.  Integral floats are converted to integers so that
+    track indices such as ``3`` and ``3.0`` compare equal.
+
+    Parameters
+    ----------
+    val : Any
+        the parameter value.
+
+    Returns
+    -------
+    frozen_val : Any
+        the canonical hashable value.
+    """
+    if val is None or isinstance(val, (str, bool)):
+        return val
+    if isinstance(val, FrozenDict):
+        return val.get_immutable_key()
+    if isinstance(val, Number):
+        if isinstance(val, float) and val.is_integer():
+            return int(val)
+        return val
+    if isinstance(val, dict):
+        return tuple(((key, freeze(val[key])) for key in sorted(val.keys(), key=repr)))
+    if isinstance(val, (list, tuple)):
+        return tuple((freeze(item) for item in val))
+    if isinstance(val, (set, frozenset)):
+        return tuple(sorted((freeze(item) for item in val), key=repr))
+    if hasattr(val, 'get_immutable_key') and callable(val.get_immutable_key):
+        return val.get_immutable_key()
+    if isinstance(val, type):
+        return '%s.%s' % (val.__module__, val.__qualname__)
+    raise TypeError('Cannot freeze value %r with type %s' % (val, type(val)))
+
+
+class FrozenDict(Mapping):
+    """An immutable parameter dictionary whose immutable key and hash are computed once.
+
+    Use :func:`to_frozen` to create frozen dictionaries, so nested values are frozen as well.
+    Frozen dictionaries can be passed wherever generators read a parameter dictionary, and are
+    shared by child masters without copying.  :meth:`copy` returns a mutable shallow copy.
+
+    Parameters
+    ----------
+    table : Dict[str, Any]
+        the dictionary content.  It must not be modified afterwards.
+    """
+
+    __slots__ = ('_table', '_key', '_hash')
+
+    def __init__(self, table):
+        # type: (Dict[str, Any]) -> None
+        self._table = table
+        self._key = None  # type: Optional[Any]
+        self._hash = None  # type: Optional[int]
+
+    def __getitem__(self, key):
+        # type: (str) -> Any
+        return self._table[key]
+
+    def __iter__(self):
+        # type: () -> Iterator[str]
+        return iter(self._table)
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._table)
+
+    def __contains__(self, key):
+        # type: (Any) -> bool
+        return key in self._table
+
+    def get(self, key, default=None):
+        # type: (str, Any) -> Any
+        return self._table.get(key, default)
+
+    def __repr__(self):
+        # type: () -> str
+        return 'FrozenDict(%r)' % (self._table, )
+
+    def __eq__(self, other):
+        # type: (Any) -> bool
+        if self is other:
+            return True
+        if isinstance(other, FrozenDict):
+            return self.get_immutable_key() == other.get_immutable_key()
+        return Mapping.__eq__(self, other)
+
+    def __ne__(self, other):
+        # type: (Any) -> bool
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # type: () -> int
+        if self._hash is None:
+            self._hash = hash(self.get_immutable_key())
+        return self._hash
+
+    def __reduce__(self):
+        # the cached hash of strings is not valid in other processes, so only pickle the content.
+        return FrozenDict, (self._table, )
+
+    def get_immutable_key(self):
+        # type: () -> Any
+        """Returns the canonical hashable representation of this dictionary.
+
+        This is the same as :func:`freeze` of the equivalent plain dictionary.
+        """
+        if self._key is None:
+            table = self._table
+            self._key = tuple(((key, freeze(table[key])) for key in sorted(table.keys(),
+                                                                            key=repr)))
+        return self._key
+
+    def copy(self):
+        # type: () -> Dict[str, Any]
+        """Returns a mutable shallow copy of this dictionary."""
+        return dict(self._table)
+
+
+def to_frozen(val):
+    # type: (Any) -> Any
+    """Returns an immutable version of the given parameter value.
+
+    Dictionaries become :class:`FrozenDict` and lists become tuples, recursively.  Other values
+    are returned as is.
+
+    Parameters
+    ----------
+    val : Any
+        the parameter value.
+
+    Returns
+    -------
+    frozen_val : Any
+        the immutable parameter value.
+    """
+    if isinstance(val, FrozenDict):
+        return val
+    if isinstance(val, dict):
+        return FrozenDict({key: to_frozen(item) for key, item in val.items()})
+    if isinstance(val, (list, tuple)):
+        return tuple((to_frozen(item) for item in val))
+    return val
+
+
+def param_digest(val):
+    # type: (Any) -> str
+    """Returns a stable hex digest of the given parameter value.
+
+    Unlike the built-in ``hash()``, this digest is stable across processes, so it can be used
+    as part of an on-disk cache key.
+
+    Parameters
+    ----------
+    val : Any
+        the parameter value.
+
+    Returns
+    -------
+    digest : str
+        the SHA-1 hex digest of the canonical representation of the value.
+    """
+    return hashlib.sha1(repr(freeze(val)).encode('utf-8')).hexdigest()
+
+
+def fill_params(params_info, default_params, params):
+    # type: (Dict[str, str], Dict[str, Any], Dict[str, Any]) -> Dict[str, Any]
+    """Returns the given parameters with defaults filled in and unknown keys removed.
+
+    Required parameters that are not given are left out, so that the template reports the
+    missing parameter when it is created.
+
+    Parameters
+    ----------
+    params_info : Dict[str, str]
+        the parameter description dictionary of the template.
+    default_params : Dict[str, Any]
+        the default parameter values of the template.
+    params : Dict[str, Any]
+        the parameter values.
+
+    Returns
+    -------
+    ans : Dict[str, Any]
+        the filled parameter dictionary.
+    """
+    ans = {}
+    for key in params_info:
+        if key in params:
+            ans[key] = params[key]
+        elif key in default_params:
+            ans[key] = default_params[key]
+    return ans
+
+
+def set_param(params, key, val):
+    # type: (Dict[str, Any], str, Any) -> None
+    """Sets a parameter.  Dotted keys set parameters of nested parameter dictionaries.
+
+    Parameters
+    ----------
+    params : Dict[str, Any]
+        the parameter dictionary to update.
+    key : str
+        the parameter name.  ``'a.b'`` sets parameter ``b`` of the nested dictionary ``a``,
+        which is created if it does not exist.
+    val : Any
+        the parameter value.
+    """
+    key_list = key.split('.')
+    for name in key_list[:-1]:
+        params = params.setdefault(name, {})
+    params[key_list[-1]] = val
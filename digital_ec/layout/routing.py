@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains shared, memoized track planning utilities."""
+
+from typing import TYPE_CHECKING, Dict, Any, Tuple, Sequence, Union, Optional, Callable
+
+import math
+import weakref
+
+from bag.layout.routing import TrackManager, TrackID
+
+from .params import freeze, param_digest
+
+if TYPE_CHECKING:
+    from bag.layout.routing import RoutingGrid
+
+# routing grid -> {(tr_widths, tr_spaces, half_space): CachedTrackManager}
+_tr_manager_table = weakref.WeakKeyDictionary()
+# row layout information digest -> RowTrackTable
+_tr_table_table = {}  # type: Dict[str, RowTrackTable]
+# routing grid -> {id(row_layout_info): (row_layout_info, RowTrackTable)}
+_tr_table_id_table = weakref.WeakKeyDictionary()
+
+TrackIndexFun = Callable[[int, str, Union[float, int]], Union[float, int]]
+NumTable = Dict[Tuple[int, str], Union[float, int]]
+IndexTable = Dict[Tuple[int, str, Union[float, int]], Union[float, int]]
+
+
+def get_track_manager(grid, tr_widths, tr_spaces, half_space=True):
+    # type: (RoutingGrid, Dict[str, Any], Dict[str, Any], bool) -> CachedTrackManager
+    """Returns the shared track manager for the given routing grid and track width/spacing.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    tr_widths : Dict[str, Any]
+        the track width dictionary.
+    tr_spaces : Dict[str, Any]
+        the track spacing dictionary.
+    half_space : bool
+        True to allow half-integer spacing.
+
+    Returns
+    -------
+    tr_manager : CachedTrackManager
+        the shared track manager.  Treat all returned values as read-only.
+    """
+    grid_table = _tr_manager_table.get(grid, None)
+    if grid_table is None:
+        _tr_manager_table[grid] = grid_table = {}
+
+    key = (freeze(tr_widths), freeze(tr_spaces), half_space)
+    tr_manager = grid_table.get(key, None)
+    if tr_manager is None:
+        grid_table[key] = tr_manager = CachedTrackManager(grid, tr_widths, tr_spaces,
+                                                          half_space=half_space)
+    return tr_manager
+
+
+class CachedTrackManager(TrackManager):
+    """A TrackManager that memoizes track width and wire placement queries.
+
+    Use :func:`get_track_manager` to get the instance shared by all generators.  Results are
+    returned as tuples, so cached values cannot be modified by callers.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    tr_widths : Dict[str, Any]
+        the track width dictionary.
+    tr_spaces : Dict[str, Any]
+        the track spacing dictionary.
+    half_space : bool
+        True to allow half-integer spacing.
+    """
+
+    def __init__(self, grid, tr_widths, tr_spaces, half_space=True):
+        # type: (RoutingGrid, Dict[str, Any], Dict[str, Any], bool) -> None
+        TrackManager.__init__(self, grid, tr_widths, tr_spaces, half_space=half_space)
+        self._width_cache = {}
+        self._place_cache = {}
+        self._align_cache = {}
+
+    def get_width(self, layer_id, track_type):
+        # type: (int, Union[str, int]) -> int
+        key = (layer_id, track_type)
+        ans = self._width_cache.get(key, None)
+        if ans is None:
+            self._width_cache[key] = ans = TrackManager.get_width(self, layer_id, track_type)
+        return ans
+
+    def place_wires(self, layer_id, name_list, start_idx=0):
+        # type: (int, Sequence[Union[str, int]], Union[float, int]) -> Tuple[Any, Tuple[Any, ...]]
+        key = (layer_id, tuple(name_list), start_idx)
+        ans = self._place_cache.get(key, None)
+        if ans is None:
+            num_tracks, loc_list = TrackManager.place_wires(self, layer_id, name_list,
+                                                            start_idx=start_idx)
+            self._place_cache[key] = ans = (num_tracks, tuple(loc_list))
+        return ans
+
+    def align_wires(self, layer_id, name_list, tot_ntr, alignment=0, start_idx=0):
+        # type: (int, Sequence[Union[str, int]], Union[float, int], int, int) -> Tuple[Any, ...]
+        key = (layer_id, tuple(name_list), tot_ntr, alignment, start_idx)
+        ans = self._align_cache.get(key, None)
+        if ans is None:
+            loc_list = TrackManager.align_wires(self, layer_id, name_list, tot_ntr,
+                                                alignment=alignment, start_idx=start_idx)
+            self._align_cache[key] = ans = tuple(loc_list)
+        return ans
+
+
+def _get_track_table_key(grid, row_layout_info):
+    # type: (RoutingGrid, Dict[str, Any]) -> str
+    from .cache import get_grid_fingerprint
+    return param_digest((get_grid_fingerprint(grid), param_digest(row_layout_info)))
+
+
+def get_row_track_table(grid, row_layout_info):
+    # type: (RoutingGrid, Dict[str, Any]) -> Optional[RowTrackTable]
+    """Returns the track table registered for the given row layout, or None.
+
+    Parameters
+    ----------
+    grid : RoutingGrid
+        the routing grid.
+    row_layout_info : Dict[str, Any]
+        the row layout information dictionary.
+
+    Returns
+    -------
+    table : Optional[RowTrackTable]
+        the track table, or None if no table is registered.
+    """
+    grid_table = _tr_table_id_table.get(grid, None)
+    if grid_table is None:
+        _tr_table_id_table[grid] = grid_table = {}
+    entry = grid_table.get(id(row_layout_info), None)
+    if entry is not None:
+        return entry[1]
+
+    table = _tr_table_table.get(_get_track_table_key(grid, row_layout_info), None)
+    if table is not None:
+        # keep a reference to row_layout_info, so its id is not reused.
+        grid_table[id(row_layout_info)] = (row_layout_info, table)
+    return table
+
+
+def set_row_track_table(grid, row_layout_info, table):
+    # type: (RoutingGrid, Dict[str, Any], RowTrackTable) -> None
+    """Registers the track table of the given row layout."""
+    _tr_table_table[_get_track_table_key(grid, row_layout_info)] = table
+    grid_table = _tr_table_id_table.get(grid, None)
+    if grid_table is None:
+        _tr_table_id_table[grid] = grid_table = {}
+    grid_table[id(row_layout_info)] = (row_layout_info, table)
+
+
+class RowTrackTable(object):
+    """A table of absolute horizontal track indices of a standard cell row layout.
+
+    Use :meth:`from_template` to precompute all track indices of a laygo template.  The table is
+    attached to the row layout information, so all templates drawn with the same row layout
+    share the same table.
+
+    Parameters
+    ----------
+    layer_id : int
+        the horizontal routing layer ID.
+    num_table : NumTable
+        a dictionary from (row index, track type) to number of tracks.
+    index_table : IndexTable
+        a dictionary from (row index, track type, relative index) to absolute track index.
+    index_fun : Optional[TrackIndexFun]
+        if given, track indices missing from index_table are computed with this function
+        and memoized.  Only a weak reference is kept, so the table does not keep the template
+        of a bound method alive; use :meth:`set_index_fun` to attach a new function.
+    precomputed : bool
+        True if index_table contains all track indices within the track groups of the row
+        layout.
+    """
+
+    def __init__(self, layer_id, num_table, index_table, index_fun=None, precomputed=False):
+        # type: (int, NumTable, IndexTable, Optional[TrackIndexFun], bool) -> None
+        self._layer_id = layer_id
+        self._num_table = num_table
+        self._index_table = index_table
+        self._index_ref = None  # type: Optional[Callable[[], Optional[TrackIndexFun]]]
+        self._precomputed = precomputed
+        self.set_index_fun(index_fun)
+
+    @classmethod
+    def from_template(cls, template, num_rows, tr_types=('g', 'gb', 'ds')):
+        # type: (Any, int, Sequence[str]) -> RowTrackTable
+        """Precomputes all track indices of the given laygo template.
+
+        Both integer and half-integer relative indices are included, as well as negative
+        indices counting from the top of each track group.  Other indices are computed with
+        the template on demand, as long as the template is alive.
+
+        Parameters
+        ----------
+        template : LaygoBase
+            the laygo template, with row types already set.
+        num_rows : int
+            number of rows.
+        tr_types : Sequence[str]
+            the track types.
+
+        Returns
+        -------
+        table : RowTrackTable
+            the track table.
+        """
+        num_table = {}
+        index_table = {}
+        for row_idx in range(num_rows):
+            for tr_type in tr_types:
+                num_tr = template.get_num_tracks(row_idx, tr_type)
+                num_table[(row_idx, tr_type)] = num_tr
+                num_idx2 = int(math.ceil(2 * num_tr))
+                for idx2 in range(-num_idx2, num_idx2):
+                    idx = idx2 // 2 if idx2 % 2 == 0 else idx2 / 2
+                    index_table[(row_idx, tr_type, idx)] = template.get_track_index(row_idx,
+                                                                                    tr_type, idx)
+
+        return RowTrackTable(template.conn_layer + 1, num_table, index_table,
+                             index_fun=template.get_track_index, precomputed=True)
+
+    @property
+    def layer_id(self):
+        # type: () -> int
+        return self._layer_id
+
+    @property
+    def has_index_fun(self):
+        # type: () -> bool
+        """True if track indices missing from this table can be computed."""
+        return self._index_ref is not None and self._index_ref() is not None
+
+    @property
+    def is_precomputed(self):
+        # type: () -> bool
+        """True if this table contains all track indices of the row layout."""
+        return self._precomputed
+
+    def set_index_fun(self, index_fun):
+        # type: (Optional[TrackIndexFun]) -> None
+        """Sets the function used to compute track indices missing from this table.
+
+        Parameters
+        ----------
+        index_fun : Optional[TrackIndexFun]
+            the track index function.  Only a weak reference is kept.
+        """
+        if index_fun is None:
+            self._index_ref = None
+        elif hasattr(index_fun, '__self__'):
+            self._index_ref = weakref.WeakMethod(index_fun)
+        else:
+            self._index_ref = weakref.ref(index_fun)
+
+    def get_num_tracks(self, row_idx, tr_type):
+        # type: (int, str) -> Union[float, int]
+        """Returns the number of tracks of the given type in the given row."""
+        return self._num_table[(row_idx, tr_type)]
+
+    def get_index(self, row_idx, tr_type, tr_idx):
+        # type: (int, str, Union[float, int]) -> Union[float, int]
+        """Returns the absolute track index of the given relative track location.
+
+        Parameters
+        ----------
+        row_idx : int
+            the row index.
+        tr_type : str
+            the track type.
+        tr_idx : Union[float, int]
+            the relative track index.
+
+        Returns
+        -------
+        abs_idx : Union[float, int]
+            the absolute track index.
+        """
+        key = (row_idx, tr_type, tr_idx)
+        ans = self._index_table.get(key, None)
+        if ans is None:
+            index_fun = None if self._index_ref is None else self._index_ref()
+            if index_fun is None:
+                raise KeyError('Track (%d, %s, %s) is not in the track table.' % key)
+            self._index_table[key] = ans = index_fun(row_idx, tr_type, tr_idx)
+        return ans
+
+    def make_track_id(self, row_idx, tr_type, tr_idx, width=1, num=1, pitch=0):
+        # type: (int, str, Union[float, int], int, int, Union[float, int]) -> TrackID
+        """Returns the TrackID of the given relative track location."""
+        return TrackID(self._layer_id, self.get_index(row_idx, tr_type, tr_idx), width=width,
+                       num=num, pitch=pitch)
@@ -1,21 +1,569 @@
 # -*- coding: utf-8 -*-
 
-from typing import TYPE_CHECKING, Dict, Any, Set, Tuple
+from typing import TYPE_CHECKING, Dict, Any, Set, Tuple, List, Optional, Type, Sequence
 
 import abc
+import weakref
 import importlib
 
-from bag.layout.routing import TrackID
+from bag.layout.routing import TrackID, WireArray
 
 from abs_templates_ec.laygo.core import LaygoBase
 from abs_templates_ec.digital.core import DigitalBase
 
+from ..params import freeze, to_frozen, fill_params
+from ..cache import (MasterCache, get_master_cache, set_master_cache, get_row_layout_info,
+                     set_row_layout_info)
+from ..routing import RowTrackTable, get_row_track_table, set_row_track_table
+from ..trace import get_tracer, trace_phase
+from ..abstract import get_abstract_store
+
 if TYPE_CHECKING:
     from bag.core import BagProject
-    from bag.layout.template import TemplateDB
+    from bag.layout.objects import Instance
+    from bag.layout.template import TemplateDB, TemplateBase
+
+# substrate tap masters of each template database, keyed by frozen row layout information
+# and skeleton flag.
+_tap_master_table = weakref.WeakKeyDictionary()
+
+
+class StdTemplateMixin(object):
+    """A mixin class that creates child masters through the persistent master cache.
+
+    If a master cache is set with :func:`digital_ec.layout.cache.set_master_cache`, child
+    masters are looked up in the cache first, and are only drawn on a cache miss.
+
+    If a tracer is set with :func:`digital_ec.layout.trace.set_tracer`, child master creation
+    and the layout phases of this template are recorded.
+
+    Parameters of child masters that use this mixin are normalized with
+    :meth:`normalize_params` before lookup, so that equivalent parameters share one master.
+    Shared configuration dictionaries are frozen, so their immutable keys are only computed
+    once for the whole hierarchy.
+
+    Templates with a skeleton parameter set to True only draw placement, supply and pin
+    wires: signal connections between instances are skipped by the templates, and
+    connect_to_tracks draws the target track wires only, without vias.  Supply and pin wires
+    are connected as in the full layout, so the bounding box and pin tracks match the full
+    layout, and skeleton masters can be used to iterate on floorplans.  Child masters inherit
+    the skeleton flag.
+
+    If an abstract store is set with :func:`digital_ec.layout.abstract.set_abstract_store`,
+    the geometry of finished child masters is moved to the spill file, and only their bounding
+    boxes and ports are kept in memory.
+    """
+
+    # parameters with a None default that mean the row width from the laygo configuration.
+    row_width_params = ('wp', 'wn')
+    # shared configuration parameters passed to child masters as frozen dictionaries.
+    frozen_params = ('config', 'tr_widths', 'tr_spaces', 'row_layout_info')
+
+    def new_template(self, lib_name='', temp_name='', params=None, temp_cls=None, debug=False,
+                     **kwargs):
+        # type: (str, str, Optional[Dict[str, Any]], Optional[Type], bool, **Any) -> TemplateBase
+        tracer = get_tracer()
+        if tracer is None:
+            master = self._new_template(lib_name, temp_name, params, temp_cls, debug, kwargs)[0]
+        else:
+            span_name = temp_name if temp_cls is None else temp_cls.__name__
+            with tracer.span(span_name, cat='master') as span:
+                master, cache_status = self._new_template(lib_name, temp_name, params, temp_cls,
+                                                          debug, kwargs)
+                span.args.update(
+                    basename=master.get_layout_basename(),
+                    cell_name=master.cell_name,
+                    cache=cache_status,
+                    reused=tracer.check_seen(master.key),
+                )
+
+        store = get_abstract_store()
+        if store is not None:
+            store.spill(self.template_db, master)
+        return master
+
+    def _new_template(self, lib_name, temp_name, params, temp_cls, debug, kwargs):
+        # type: (...) -> Tuple[TemplateBase, str]
+        """Creates a child master.
+
+        Returns
+        -------
+        master : TemplateBase
+            the child master.
+        cache_status : str
+            'hit' if the master is loaded from the master cache, 'miss' if it is not in the
+            master cache, or 'off' if the master cache is not used.
+        """
+        if params is not None and temp_cls is not None and issubclass(temp_cls, StdTemplateMixin):
+            params = self._share_frozen_params(params)
+            if self.skeleton:
+                params = dict(params, skeleton=True)
+            params = temp_cls.normalize_params(params)
+
+        cache = get_master_cache()
+        if cache is None or temp_cls is None or params is None or lib_name or temp_name or kwargs:
+            master = super().new_template(lib_name=lib_name, temp_name=temp_name, params=params,
+                                          temp_cls=temp_cls, debug=debug, **kwargs)
+            return master, 'off'
+
+        temp_db = self.template_db
+        key = cache.get_key(temp_cls, params, self.grid)
+        master = cache.get_master(temp_db, key)
+        if master is None:
+            master = super().new_template(params=params, temp_cls=temp_cls, debug=debug)
+            cache.put_master(temp_db, key, master)
+            return master, 'miss'
+
+        if debug:
+            print('master %s loaded from cache' % master.cell_name)
+        return master, 'hit'
+
+    @property
+    def skeleton(self):
+        # type: () -> bool
+        """True if this template skips signal routing."""
+        return self.params.get('skeleton', False)
+
+    def _share_frozen_params(self, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        """Replaces shared configuration parameters copied from this master by frozen ones.
+
+        The frozen dictionaries are created once per master, so their immutable keys are
+        computed once, not once per child master.
+        """
+        frozen_table = self.__dict__.get('_frozen_table', None)
+        if frozen_table is None:
+            self._frozen_table = frozen_table = {}
+        my_params = self.params
+        ans = None
+        for key in self.frozen_params:
+            val = params.get(key, None)
+            if isinstance(val, dict) and val is my_params.get(key, None):
+                frozen_val = frozen_table.get(key, None)
+                if frozen_val is None:
+                    frozen_table[key] = frozen_val = to_frozen(val)
+                if ans is None:
+                    ans = params.copy()
+                ans[key] = frozen_val
+        return params if ans is None else ans
+
+    @classmethod
+    def normalize_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        """Returns the canonical form of the given layout parameters.
+
+        Default values are filled in and parameters unknown to this template are removed.
+        Row widths equal to the laygo configuration row width are replaced by None, and
+        signal location dictionaries without any location are replaced by None.  The
+        parameters listed in frozen_params are converted with
+        :func:`digital_ec.layout.params.to_frozen`.  Subclasses with other equivalent parameter
+        values should override this method.
+
+        Parameters
+        ----------
+        params : Dict[str, Any]
+            the layout parameters.
+
+        Returns
+        -------
+        ans : Dict[str, Any]
+            the normalized layout parameters.  The given dictionary is not modified.
+        """
+        default_params = cls.get_default_param_values()
+        ans = fill_params(cls.get_params_info(), default_params, params)
+
+        config = ans.get('config', None)
+        if isinstance(config, dict):
+            for key in cls.row_width_params:
+                val = ans.get(key, None)
+                if val is not None and default_params.get(key, 0) is None and \
+                        val == config.get(key, None):
+                    ans[key] = None
+
+        sig_locs = ans.get('sig_locs', None)
+        if sig_locs is not None and default_params.get('sig_locs', 0) is None:
+            sig_locs = {key: val for key, val in sig_locs.items() if val is not None}
+            ans['sig_locs'] = sig_locs or None
+
+        for key in cls.frozen_params:
+            if key in ans:
+                ans[key] = to_frozen(ans[key])
+        return ans
+
+    @classmethod
+    def to_immutable_id(cls, val):
+        # type: (Any) -> Any
+        """Returns the canonical hashable representation of the given parameter value.
+
+        Uses :func:`digital_ec.layout.params.freeze`, so frozen dictionaries reuse their
+        cached immutable keys, and a frozen dictionary has the same key as the equivalent plain
+        dictionary.
+        """
+        return freeze(val)
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        """Returns the size of this template, computed from the parameters alone.
+
+        No layout is drawn, so this method can be used to floorplan large arrays or to sweep
+        area quickly.  Use :func:`check_size_info` to compare the result against a drawn master.
+
+        Parameters
+        ----------
+        params : Dict[str, Any]
+            the layout parameters.  Only parameters affecting the size are needed.
+        sub_columns : Optional[int]
+            number of columns of a substrate tap.  Only needed by templates with taps.
+
+        Returns
+        -------
+        size_info : Dict[str, Any]
+            a dictionary with the num_cols and num_rows entries, as well as the derived
+            segment sizes of child cells.
+        """
+        raise NotImplementedError('%s has no size model.' % cls.__name__)
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        """Returns the schematic parameters of this template, computed from the parameters alone.
+
+        Only the sizing logic runs; no layout is drawn and no master is created, so schematic
+        generation and netlist-level sweeps do not pay for the layout.  The result is equal to
+        the sch_params property of the drawn master.  Use :func:`check_sch_params` to compare
+        the result against a drawn master.
+
+        Parameters
+        ----------
+        params : Dict[str, Any]
+            the layout parameters.  Parameters not affecting the schematic, such as track
+            dictionaries, are not needed.
+
+        Returns
+        -------
+        sch_params : Dict[str, Any]
+            the schematic parameters.
+        """
+        raise NotImplementedError('%s has no schematic parameter model.' % cls.__name__)
+
+    @classmethod
+    def get_row_widths(cls, params):
+        # type: (Dict[str, Any]) -> Tuple[int, int]
+        """Returns the PMOS and NMOS widths.  None means the laygo configuration row width."""
+        config = params['config']
+        wp = params.get('wp', None)
+        wn = params.get('wn', None)
+        return config['wp'] if wp is None else wp, config['wn'] if wn is None else wn
+
+    def compute_row_layout_info(self, config):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        """Returns the standard cell row layout information of the given configuration.
+
+        Only the row floorplan is computed; no master is drawn or added to the template
+        database.  Results are shared through the row layout information cache.
+
+        Parameters
+        ----------
+        config : Dict[str, Any]
+            the laygo configuration dictionary.
+
+        Returns
+        -------
+        row_layout_info : Dict[str, Any]
+            the row layout information dictionary.
+        """
+        with trace_phase('floorplan'):
+            row_layout_info = get_row_layout_info(self.grid, config)
+            if row_layout_info is None:
+                temp_db = self.template_db
+                probe = StdRowFloorplan(temp_db, temp_db.lib_name, dict(config=config), set())
+                probe.setup_floorplan(config, None, probe.laygo_info.sub_columns)
+                row_layout_info = probe.row_layout_info
+        return row_layout_info
+
+    def get_track_table(self):
+        # type: () -> RowTrackTable
+        """Returns the track table of the current row layout.
+
+        The table is shared by all templates with the same row layout, so composite cells reuse
+        the track indices computed by their children.
+        """
+        row_layout_info = self.row_layout_info
+        table = get_row_track_table(self.grid, row_layout_info)
+        if table is None:
+            # no laygo cell with this row layout was drawn in this process; resolve track
+            # indices on demand.
+            table = RowTrackTable(self.conn_layer + 1, {}, {}, index_fun=self.get_track_index)
+            set_row_track_table(self.grid, row_layout_info, table)
+        elif not table.has_index_fun:
+            # the template that created the table is gone; compute missing indices with this one.
+            table.set_index_fun(self.get_track_index)
+        return table
+
+    # the methods below only mark layout phases for the tracer.
+
+    def initialize(self, *args, **kwargs):
+        with trace_phase('floorplan'):
+            return super().initialize(*args, **kwargs)
+
+    def set_digital_size(self, *args, **kwargs):
+        with trace_phase('floorplan'):
+            return super().set_digital_size(*args, **kwargs)
+
+    def add_laygo_mos(self, *args, **kwargs):
+        with trace_phase('placement'):
+            return super().add_laygo_mos(*args, **kwargs)
+
+    def add_digital_block(self, *args, **kwargs):
+        with trace_phase('placement'):
+            return super().add_digital_block(*args, **kwargs)
+
+    def fill_space(self, *args, **kwargs):
+        with trace_phase('fill_space'):
+            return super().fill_space(*args, **kwargs)
+
+    def add_wires(self, *args, **kwargs):
+        with trace_phase('routing'):
+            return super().add_wires(*args, **kwargs)
+
+    def extend_wires(self, *args, **kwargs):
+        with trace_phase('routing'):
+            return super().extend_wires(*args, **kwargs)
+
+    def connect_wires(self, *args, **kwargs):
+        with trace_phase('routing'):
+            return super().connect_wires(*args, **kwargs)
+
+    def connect_to_tracks(self, *args, **kwargs):
+        with trace_phase('routing'):
+            if self.skeleton:
+                return self._draw_skeleton_track(*args, **kwargs)
+            return super().connect_to_tracks(*args, **kwargs)
+
+    def connect_to_track_wires(self, *args, **kwargs):
+        with trace_phase('routing'):
+            return super().connect_to_track_wires(*args, **kwargs)
+
+    def _draw_skeleton_track(self, wire_arr_list, track_id, wire_lower=None, wire_upper=None,
+                             track_lower=None, track_upper=None, unit_mode=False,
+                             min_len_mode=None, return_wires=False, debug=False):
+        # type: (...) -> Any
+        """Draws the wires connect_to_tracks would draw, without the vias.
+
+        The given wires are extended to the track span and to wire_lower/wire_upper, and the
+        track wire spans the given wires and track bounds, extended to the minimum length
+        according to min_len_mode, so pins drawn on these wires match the full layout.
+        """
+        if isinstance(wire_arr_list, WireArray):
+            wire_arr_list = [wire_arr_list]
+        else:
+            wire_arr_list = list(wire_arr_list)
+        if not wire_arr_list:
+            return (None, []) if return_wires else None
+
+        grid = self.grid
+        res = grid.resolution
+
+        def _to_unit(val):
+            return int(round(val)) if unit_mode else int(round(val / res))
+
+        def _get_span(tid):
+            span_lower = span_upper = None
+            for idx in tid:
+                wl, wu = grid.get_wire_bounds(tid.layer_id, idx, width=tid.width, unit_mode=True)
+                span_lower = wl if span_lower is None else min(span_lower, wl)
+                span_upper = wu if span_upper is None else max(span_upper, wu)
+            return span_lower, span_upper
+
+        tr_lower, tr_upper = _get_span(track_id)
+        lower = upper = None
+        new_wires = []
+        for warr in wire_arr_list:
+            tid = warr.track_id
+            wl, wu = _get_span(tid)
+            lower = wl if lower is None else min(lower, wl)
+            upper = wu if upper is None else max(upper, wu)
+            w_lower = min(warr.lower_unit, tr_lower)
+            w_upper = max(warr.upper_unit, tr_upper)
+            if wire_lower is not None:
+                w_lower = min(w_lower, _to_unit(wire_lower))
+            if wire_upper is not None:
+                w_upper = max(w_upper, _to_unit(wire_upper))
+            if w_lower != warr.lower_unit or w_upper != warr.upper_unit:
+                warr = self.add_wires(tid.layer_id, tid.base_index, w_lower, w_upper,
+                                      width=tid.width, num=tid.num, pitch=tid.pitch,
+                                      unit_mode=True)
+            new_wires.append(warr)
+
+        if track_lower is not None:
+            lower = min(lower, _to_unit(track_lower))
+        if track_upper is not None:
+            upper = max(upper, _to_unit(track_upper))
+        if min_len_mode is not None:
+            min_len = grid.get_min_length(track_id.layer_id, track_id.width, unit_mode=True)
+            extra = min_len - (upper - lower)
+            if extra > 0:
+                if min_len_mode < 0:
+                    lower -= extra
+                elif min_len_mode > 0:
+                    upper += extra
+                else:
+                    lower -= extra // 2
+                    upper += extra - extra // 2
+
+        track_warr = self.add_wires(track_id.layer_id, track_id.base_index, lower, upper,
+                                    width=track_id.width, num=track_id.num,
+                                    pitch=track_id.pitch, unit_mode=True)
+        if return_wires:
+            return track_warr, new_wires
+        return track_warr
+
+    def add_pin(self, *args, **kwargs):
+        with trace_phase('pin export'):
+            return super().add_pin(*args, **kwargs)
+
+    def reexport(self, *args, **kwargs):
+        with trace_phase('pin export'):
+            return super().reexport(*args, **kwargs)
+
+
+def check_size_info(master):
+    # type: (TemplateBase) -> Dict[str, Tuple[Any, Any]]
+    """Compares the size model of the given master against its drawn layout.
+
+    Parameters
+    ----------
+    master : TemplateBase
+        the standard cell master.
+
+    Returns
+    -------
+    mismatch : Dict[str, Tuple[Any, Any]]
+        a dictionary from size entry name to (estimated, actual) values.  Empty if the size
+        model is correct.
+
+    Raises
+    ------
+    NotImplementedError
+        if the master has no size model.
+    """
+    if not hasattr(master, 'get_size_info') or not hasattr(master, 'digital_size'):
+        raise NotImplementedError('%s has no size model.' % type(master).__name__)
+    if hasattr(master, 'laygo_info'):
+        sub_columns = master.laygo_info.sub_columns
+    else:
+        sub_columns = getattr(master, 'sub_columns', None)
+    size_info = master.get_size_info(master.params, sub_columns=sub_columns)
+
+    num_cols, num_rows = master.digital_size
+    actual = dict(num_cols=num_cols, num_rows=num_rows)
+    seg_in = getattr(master, 'seg_in', None)
+    if seg_in is not None and 'seg_in' in size_info:
+        actual['seg_in'] = seg_in
+
+    mismatch = {}
+    for key, val in actual.items():
+        if size_info[key] != val:
+            mismatch[key] = (size_info[key], val)
+    return mismatch
 
 
-class StdCellWrapper(DigitalBase):
+def check_sch_params(master):
+    # type: (TemplateBase) -> Dict[str, Tuple[Any, Any]]
+    """Compares the schematic parameter model of the given master against its drawn layout.
+
+    Parameters
+    ----------
+    master : TemplateBase
+        the standard cell master.
+
+    Returns
+    -------
+    mismatch : Dict[str, Tuple[Any, Any]]
+        a dictionary from schematic parameter name to (computed, actual) values.  Empty if the
+        schematic parameter model is correct.
+
+    Raises
+    ------
+    NotImplementedError
+        if the master cannot compute its schematic parameters without drawing the layout.
+    """
+    est_params = master.compute_sch_params(master.params)
+    sch_params = master.sch_params
+    mismatch = {}
+    for key in set(est_params.keys()) | set(sch_params.keys()):
+        est = est_params.get(key, None)
+        val = sch_params.get(key, None)
+        if freeze(est) != freeze(val):
+            mismatch[key] = (est, val)
+    return mismatch
+
+
+def _get_pin_shapes(master):
+    # type: (TemplateBase) -> Dict[str, List[Tuple[Any, ...]]]
+    """Returns the sorted pin shapes of every port of the given master."""
+    ans = {}
+    for name in master.port_names_iter():
+        shapes = []
+        for pin in master.get_port(name).get_pins():
+            if isinstance(pin, WireArray):
+                tid = pin.track_id
+                shapes.append((tid.layer_id, tid.base_index, tid.width, tid.num, tid.pitch,
+                               pin.lower_unit, pin.upper_unit))
+            else:
+                shapes.append((pin.left_unit, pin.bottom_unit, pin.right_unit, pin.top_unit))
+        ans[name] = sorted(shapes)
+    return ans
+
+
+def check_skeleton_pins(master):
+    # type: (TemplateBase) -> Dict[str, Tuple[Any, Any]]
+    """Compares the skeleton layout of the given master against its full layout.
+
+    The skeleton master is created in the template database of the given master, which must
+    be drawn with the skeleton parameter set to False.
+
+    Parameters
+    ----------
+    master : TemplateBase
+        the standard cell master.
+
+    Returns
+    -------
+    mismatch : Dict[str, Tuple[Any, Any]]
+        a dictionary from port name to (skeleton, full) pin shapes.  The bbox entry holds the
+        bounding boxes if they differ.  Empty if the skeleton layout matches.
+
+    Raises
+    ------
+    NotImplementedError
+        if the master has no skeleton mode.
+    """
+    temp_cls = type(master)
+    if 'skeleton' not in temp_cls.get_params_info():
+        raise NotImplementedError('%s has no skeleton mode.' % temp_cls.__name__)
+    params = dict(master.params, skeleton=True)
+    skel_master = master.template_db.new_template(params=params, temp_cls=temp_cls)
+
+    mismatch = {}
+    box, skel_box = master.bound_box, skel_master.bound_box
+    full_val = (box.left_unit, box.bottom_unit, box.right_unit, box.top_unit)
+    skel_val = (skel_box.left_unit, skel_box.bottom_unit, skel_box.right_unit,
+                skel_box.top_unit)
+    if full_val != skel_val:
+        mismatch['bbox'] = (skel_val, full_val)
+    full_pins = _get_pin_shapes(master)
+    skel_pins = _get_pin_shapes(skel_master)
+    for name in set(full_pins.keys()) | set(skel_pins.keys()):
+        full_val = full_pins.get(name, None)
+        skel_val = skel_pins.get(name, None)
+        if full_val != skel_val:
+            mismatch[name] = (skel_val, full_val)
+    return mismatch
+
+
+class StdCellWrapper(StdTemplateMixin, DigitalBase):
     """A class that wraps a given standard cell with proper boundaries.
 
     This class is usually used just for layout debugging (i.e. DRC checking).
@@ -46,8 +594,11 @@ class StdCellWrapper(DigitalBase):
         return self._sch_params
 
     @classmethod
-    def generate_cells(cls, prj, specs, **kwargs):
-        # type: (BagProject, Dict[str, Any], **kwargs) -> None
+    def generate_cells(cls, prj, specs, cache_dir=None, **kwargs):
+        # type: (BagProject, Dict[str, Any], Optional[str], **kwargs) -> None
+        if cache_dir is not None:
+            set_master_cache(MasterCache(cache_dir))
+
         mod_name = specs['module']
         cls_name = specs['class']
 
@@ -64,6 +615,7 @@ class StdCellWrapper(DigitalBase):
             'class': 'standard cell class name.',
             'params': 'standard cell layout parameters.',
             'guard_ring_nf': 'number of guard rings in boundary.',
+            'skeleton': 'True to skip signal routing.',
         }
 
     @classmethod
@@ -71,8 +623,37 @@ class StdCellWrapper(DigitalBase):
         # type: () -> Dict[str, Any]
         return dict(
             guard_ring_nf=0,
+            skeleton=False,
         )
 
+    @classmethod
+    def normalize_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        ans = super().normalize_params(params)
+        inner_params = ans.get('params', None)
+        if 'module' in ans and 'class' in ans and isinstance(inner_params, dict):
+            temp_cls = getattr(importlib.import_module(ans['module']), ans['class'])
+            if issubclass(temp_cls, StdTemplateMixin):
+                ans['params'] = temp_cls.normalize_params(inner_params)
+        return ans
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        cls_mod = importlib.import_module(params['module'])
+        temp_cls = getattr(cls_mod, params['class'])
+        size_info = temp_cls.get_size_info(params['params'], sub_columns=sub_columns)
+        return dict(
+            num_cols=-(-size_info['num_cols'] // 2) * 2,
+            num_rows=size_info['num_rows'],
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        temp_cls = getattr(importlib.import_module(params['module']), params['class'])
+        return temp_cls.compute_sch_params(params['params'])
+
     def draw_layout(self):
         mod = self.params['module']
         cls = self.params['class']
@@ -108,7 +689,7 @@ class StdCellWrapper(DigitalBase):
             self._sch_params = None
 
 
-class StdLaygoTemplate(LaygoBase, metaclass=abc.ABCMeta):
+class StdLaygoTemplate(StdTemplateMixin, LaygoBase, metaclass=abc.ABCMeta):
     """The base class of all laygo standard cell generators.
 
     Parameters
@@ -134,10 +715,17 @@ class StdLaygoTemplate(LaygoBase, metaclass=abc.ABCMeta):
         # type: (Dict[str, Any], Dict[str, Any], int, bool) -> Tuple[TrackID, TrackID]
         """draw the standard cell floorplan.
         """
+        with trace_phase('floorplan'):
+            return self._setup_floorplan(config, row_layout_info, num_col, debug=debug)
+
+    def _setup_floorplan(self, config, row_layout_info, num_col, debug=False):
+        # type: (Dict[str, Any], Dict[str, Any], int, bool) -> Tuple[TrackID, TrackID]
         tr_w_sup = config['tr_w_supply']
 
         # specify row types
         hm_layer = self.conn_layer + 1
+        if row_layout_info is None:
+            row_layout_info = get_row_layout_info(self.grid, config)
         if row_layout_info is not None:
             self.set_rows_direct(row_layout_info, num_col=num_col,
                                  draw_boundaries=False, end_mode=0)
@@ -177,6 +765,12 @@ class StdLaygoTemplate(LaygoBase, metaclass=abc.ABCMeta):
             self.set_row_types(row_list, w_list, orient_list, thres_list, False, 0,
                                num_g_tracks, num_gb_tracks, num_ds_tracks, guard_ring_nf=0,
                                row_kwargs=row_kwargs, num_col=num_col, row_sub_widths=sub_w_list)
+            set_row_layout_info(self.grid, config, self.row_layout_info)
+
+        table = get_row_track_table(self.grid, self.row_layout_info)
+        if table is None or not table.is_precomputed:
+            set_row_track_table(self.grid, self.row_layout_info,
+                                RowTrackTable.from_template(self, 2))
 
         if debug:
             for row_idx, row_name in [(0, 'nch'), (1, 'pch')]:
@@ -195,6 +789,44 @@ class StdLaygoTemplate(LaygoBase, metaclass=abc.ABCMeta):
         return vss_tid, vdd_tid
 
 
+class StdRowFloorplan(StdLaygoTemplate):
+    """An empty standard cell row, used to compute the row layout information.
+
+    Use :meth:`StdTemplateMixin.compute_row_layout_info` instead of creating this template
+    directly.
+
+    Parameters
+    ----------
+    temp_db : TemplateDB
+            the template database.
+    lib_name : str
+        the layout library name.
+    params : Dict[str, Any]
+        the parameter values.
+    used_names : Set[str]
+        a set of already used cell names.
+    **kwargs
+        dictionary of optional parameters.  See documentation of
+        :class:`bag.layout.template.TemplateBase` for details.
+    """
+
+    def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
+        # type: (TemplateDB, str, Dict[str, Any], Set[str], **kwargs) -> None
+        StdLaygoTemplate.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
+
+    @classmethod
+    def get_params_info(cls):
+        # type: () -> Dict[str, str]
+        return dict(
+            config='laygo configuration dictionary.',
+        )
+
+    def draw_layout(self):
+        """Set up the row floorplan only.
+        """
+        self.setup_floorplan(self.params['config'], None, self.laygo_info.sub_columns)
+
+
 class StdCellTap(StdLaygoTemplate):
     """A standard cell substrate tap.
 
@@ -224,6 +856,7 @@ class StdCellTap(StdLaygoTemplate):
             config='laygo configuration dictionary.',
             row_layout_info='Row layout information dictionary.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -232,6 +865,7 @@ class StdCellTap(StdLaygoTemplate):
         return dict(
             row_layout_info=None,
             show_pins=True,
+            skeleton=False,
         )
 
     def draw_layout(self):
@@ -261,7 +895,7 @@ class StdCellTap(StdLaygoTemplate):
         self.add_pin('VDD', vdd_warr, show=show_pins)
 
 
-class StdDigitalTemplate(DigitalBase, metaclass=abc.ABCMeta):
+class StdDigitalTemplate(StdTemplateMixin, DigitalBase, metaclass=abc.ABCMeta):
     """The base class of all standard cell generators.
 
     Parameters
@@ -282,18 +916,185 @@ class StdDigitalTemplate(DigitalBase, metaclass=abc.ABCMeta):
     def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
         # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
         DigitalBase.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
+        self._tap_row_info = None  # type: Optional[Dict[str, Any]]
+        self._tap_master = None  # type: Optional[StdCellTap]
+
+    def get_substrate_tap_master(self):
+        # type: () -> StdCellTap
+        """Returns the substrate tap master of the current row layout.
+
+        Tap masters are shared by all templates of a template database with the same row layout
+        information, so the tap parameters are only hashed and looked up once.
+
+        Returns
+        -------
+        tap_master : StdCellTap
+            the substrate tap master.
+        """
+        row_layout_info = self._row_layout_info
+        if self._tap_master is not None and self._tap_row_info is row_layout_info:
+            return self._tap_master
+
+        temp_db = self.template_db
+        db_table = _tap_master_table.get(temp_db, None)
+        if db_table is None:
+            _tap_master_table[temp_db] = db_table = {}
+        row_info = to_frozen(row_layout_info)
+        tap_key = (row_info, self.skeleton)
+        tap_master = db_table.get(tap_key, None)
+        if tap_master is None:
+            params = dict(
+                config=row_info['config'],
+                row_layout_info=row_info,
+                show_pins=False,
+            )
+            db_table[tap_key] = tap_master = self.new_template(params=params,
+                                                               temp_cls=StdCellTap)
+
+        self._tap_row_info = row_layout_info
+        self._tap_master = tap_master
+        return tap_master
 
     def add_substrate_tap(self, loc, nx=1):
         nsub = self._laygo_info.sub_columns
-        params = dict(
-            config=self._row_layout_info['config'],
-            row_layout_info=self._row_layout_info,
-            show_pins=False,
-        )
-        tap_master = self.new_template(params=params, temp_cls=StdCellTap)
+        tap_master = self.get_substrate_tap_master()
         return self.add_digital_block(tap_master, loc=loc, nx=nx, spx=nsub)
 
+    def add_substrate_tap_columns(self, row_start=0, num_rows=None):
+        # type: (int, Optional[int]) -> Tuple[List[WireArray], List[WireArray]]
+        """Adds substrate tap columns on the left and right edges of the given rows.
+
+        Parameters
+        ----------
+        row_start : int
+            the first row index.
+        num_rows : Optional[int]
+            number of rows.  Defaults to all rows from row_start.
+
+        Returns
+        -------
+        vdd_list : List[WireArray]
+            the VDD wires of all taps.
+        vss_list : List[WireArray]
+            the VSS wires of all taps.
+
+        Raises
+        ------
+        ValueError
+            if the block is too narrow for two tap columns.
+        """
+        num_cols, tot_rows = self.digital_size
+        if num_rows is None:
+            num_rows = tot_rows - row_start
+        tap_ncol = self._laygo_info.sub_columns
+        if num_cols < 2 * tap_ncol:
+            raise ValueError('%d columns is too narrow for two %d-column substrate taps.' %
+                             (num_cols, tap_ncol))
+        tap_master = self.get_substrate_tap_master()
+
+        vdd_list, vss_list = [], []
+        for ridx in range(row_start, row_start + num_rows):
+            # one instance per row, with the left and right taps as its two columns.
+            tap = self.add_digital_block(tap_master, loc=(0, ridx), nx=2,
+                                         spx=num_cols - tap_ncol)
+            vdd_list.extend(tap.port_pins_iter('VDD'))
+            vss_list.extend(tap.port_pins_iter('VSS'))
+        return vdd_list, vss_list
+
+    def add_bus_pin(self, name, warr_list, start=0, show=True):
+        # type: (str, Sequence[WireArray], int, bool) -> int
+        """Exports the given wires as bits of the indexed bus name<...>.
+
+        The i-th wire is exported as name<start + i>.  Each bit still gets its own pin and
+        label, as required by LVS against a name<N-1:0> schematic bus.
+
+        Parameters
+        ----------
+        name : str
+            the bus base name.
+        warr_list : Sequence[WireArray]
+            the wires of each bit, in bit order.
+        start : int
+            the index of the first bit.
+        show : bool
+            True to draw pin geometries.
+
+        Returns
+        -------
+        stop : int
+            the index after the last exported bit.
+        """
+        fmt = name + '<%d>'
+        for idx, warr in enumerate(warr_list):
+            self.add_pin(fmt % (start + idx), warr, show=show)
+        return start + len(warr_list)
+
+    def add_array_bus_pin(self, inst, port_name, name, start=0, reverse=False, show=True):
+        # type: (Instance, str, str, int, bool, bool) -> int
+        """Exports a port of an arrayed instance as bits of the indexed bus name<...>.
+
+        All pins are collected from the instance in one pass, instead of one port lookup per
+        array element.
+
+        Parameters
+        ----------
+        inst : Instance
+            the arrayed instance.  The port must have exactly one pin per array element.
+        port_name : str
+            the port name.
+        name : str
+            the bus base name.
+        start : int
+            the index of the first bit.
+        reverse : bool
+            True to assign bits from the last array element to the first one.
+        show : bool
+            True to draw pin geometries.
+
+        Returns
+        -------
+        stop : int
+            the index after the last exported bit.
+        """
+        warr_list = list(inst.port_pins_iter(port_name))
+        if len(warr_list) != inst.nx * inst.ny:
+            raise ValueError('Port %s must have exactly one pin per array element.' % port_name)
+        if reverse:
+            warr_list.reverse()
+        return self.add_bus_pin(name, warr_list, start=start, show=show)
+
+    def reexport_bus(self, inst, name, num, start=0, show=True):
+        # type: (Instance, str, int, int, bool) -> int
+        """Re-exports the bus name<num-1:0> of an instance as bits name<start + num - 1:start>.
+
+        Parameters
+        ----------
+        inst : Instance
+            the instance.
+        name : str
+            the bus base name.
+        num : int
+            number of bits.
+        start : int
+            the index of the first exported bit.
+        show : bool
+            True to draw pin geometries.
+
+        Returns
+        -------
+        stop : int
+            the index after the last exported bit.
+        """
+        fmt = name + '<%d>'
+        for idx in range(num):
+            self.reexport(inst.get_port(fmt % idx), net_name=fmt % (start + idx), show=show)
+        return start + num
+
     def fill_space(self, port_cols=None):
+        with trace_phase('fill_space'):
+            return self._fill_space(port_cols=port_cols)
+
+    def _fill_space(self, port_cols=None):
         result = DigitalBase.fill_space(self, port_cols=port_cols)
 
         if self.laygo_info.draw_boundaries:
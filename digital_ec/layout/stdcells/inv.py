@@ -2,10 +2,11 @@
 
 """This module contains layout generator for various kinds of inverters."""
 
-from typing import TYPE_CHECKING, Dict, Any, Set, Union, Iterable
+from typing import TYPE_CHECKING, Dict, Any, Set, List, Tuple, Union, Iterable, Optional
 
-from bag.layout.routing import TrackManager, TrackID
+from bag.layout.routing import TrackID
 
+from ..routing import get_track_manager
 from .core import StdLaygoTemplate
 
 if TYPE_CHECKING:
@@ -55,6 +56,7 @@ class Inverter(StdLaygoTemplate):
             sig_locs='Signal track location dictionary.',
             out_vm='True to draw output on vertical metal layer.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -68,6 +70,33 @@ class Inverter(StdLaygoTemplate):
             sig_locs=None,
             out_vm=True,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        seg = params['seg']
+        return dict(
+            num_cols=seg * 2 if params.get('stack', False) else seg,
+            num_rows=1,
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        seg = params['seg']
+        wp, wn = cls.get_row_widths(params)
+        return dict(
+            lch=config['lch'],
+            wp=wp,
+            wn=wn,
+            thp=config['thp'],
+            thn=config['thn'],
+            segp=seg,
+            segn=seg,
+            stack=params.get('stack', False),
         )
 
     def get_layout_basename(self):
@@ -102,10 +131,11 @@ class Inverter(StdLaygoTemplate):
         nout_tidx = sig_locs.get('nout', None)
         out_tidx = sig_locs.get('out', None)
 
-        fg = seg * 2 if stack else seg
+        fg = self.get_size_info(self.params)['num_cols']
         vss_tid, vdd_tid = self.setup_floorplan(config, row_layout_info, fg)
 
-        tr_manager = TrackManager(self.grid, tr_widths, tr_spaces, half_space=True)
+        tr_manager = get_track_manager(self.grid, tr_widths, tr_spaces)
+        tr_table = self.get_track_table()
 
         # get track information
         hm_layer = self.conn_layer + 1
@@ -130,18 +160,18 @@ class Inverter(StdLaygoTemplate):
         # connect input
         if in_tidx is None:
             loc = tr_manager.place_wires(hm_layer, ['in'])[1][0]
-            in_tidx = self.get_track_index(0, 'g', loc)
+            in_tidx = tr_table.get_index(0, 'g', loc)
         tid = TrackID(hm_layer, in_tidx, width=tr_w_in)
         in_warr = self.connect_to_tracks([pin, nin], tid)
 
         # connect output
         out_loc = tr_manager.place_wires(hm_layer, ['out'])[1][0]
         if pout_tidx is None:
-            pout_tidx = self.get_track_index(1, 'gb', out_loc)
+            pout_tidx = tr_table.get_index(1, 'gb', out_loc)
         tid = TrackID(hm_layer, pout_tidx, width=tr_w_out_h)
         pout_warr = self.connect_to_tracks(pout, tid, min_len_mode=0)
         if nout_tidx is None:
-            nout_tidx = self.get_track_index(0, 'gb', out_loc)
+            nout_tidx = tr_table.get_index(0, 'gb', out_loc)
         tid = TrackID(hm_layer, nout_tidx, width=tr_w_out_h)
         nout_warr = self.connect_to_tracks(nout, tid, min_len_mode=0)
         if out_vm:
@@ -164,16 +194,7 @@ class Inverter(StdLaygoTemplate):
         self.add_pin('nout', nout_warr, label='out', show=False)
 
         # set properties
-        self._sch_params = dict(
-            lch=config['lch'],
-            wp=wp,
-            wn=wn,
-            thp=config['thp'],
-            thn=config['thn'],
-            segp=seg,
-            segn=seg,
-            stack=stack,
-        )
+        self._sch_params = self.compute_sch_params(self.params)
 
 
 class InverterTristate(StdLaygoTemplate):
@@ -219,6 +240,7 @@ class InverterTristate(StdLaygoTemplate):
             out_vm='True to draw output on vertical metal layer.',
             pmos_switch='True to add PMOS enable switch.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -232,6 +254,33 @@ class InverterTristate(StdLaygoTemplate):
             out_vm=True,
             pmos_switch=True,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        return dict(
+            num_cols=params['seg'] * 2,
+            num_rows=1,
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        seg = params['seg']
+        pmos_switch = params.get('pmos_switch', True)
+        wp, wn = cls.get_row_widths(params)
+        return dict(
+            lch=config['lch'],
+            wp=wp,
+            wn=wn,
+            thp=config['thp'],
+            thn=config['thn'],
+            segp=seg if pmos_switch else 2 * seg,
+            segn=seg,
+            pmos_switch=pmos_switch,
         )
 
     def get_layout_basename(self):
@@ -262,7 +311,8 @@ class InverterTristate(StdLaygoTemplate):
         if wp < 0 or wp > wp_row or wn < 0 or wn > wn_row:
             raise ValueError('Invalid choice of wp and/or wn.')
 
-        vss_tid, vdd_tid = self.setup_floorplan(config, row_layout_info, seg * 2)
+        fg = self.get_size_info(self.params)['num_cols']
+        vss_tid, vdd_tid = self.setup_floorplan(config, row_layout_info, fg)
 
         if sig_locs is None:
             sig_locs = {}
@@ -273,7 +323,8 @@ class InverterTristate(StdLaygoTemplate):
         enb_tidx = sig_locs.get('enb', None)
         en_tidx = sig_locs.get('en', None)
 
-        tr_manager = TrackManager(self.grid, tr_widths, tr_spaces, half_space=True)
+        tr_manager = get_track_manager(self.grid, tr_widths, tr_spaces)
+        tr_table = self.get_track_table()
 
         # get track information
         hm_layer = self.conn_layer + 1
@@ -301,13 +352,13 @@ class InverterTristate(StdLaygoTemplate):
 
         # get track locations
         if en_tidx is None:
-            ntr = self.get_num_tracks(0, 'g')
+            ntr = tr_table.get_num_tracks(0, 'g')
             loc = tr_manager.align_wires(hm_layer, ['en'], ntr, alignment=1)[0]
-            en_tidx = self.get_track_index(0, 'g', loc)
+            en_tidx = tr_table.get_index(0, 'g', loc)
         if enb_tidx is None:
-            ntr = self.get_num_tracks(1, 'g')
+            ntr = tr_table.get_num_tracks(1, 'g')
             loc = tr_manager.align_wires(hm_layer, ['en'], ntr, alignment=1)[0]
-            enb_tidx = self.get_track_index(1, 'g', loc)
+            enb_tidx = tr_table.get_index(1, 'g', loc)
         if in_tidx is None:
             in_tidx2 = int(round(2 * (en_tidx + enb_tidx)))
             if in_tidx2 % 4 == 0:
@@ -318,9 +369,9 @@ class InverterTristate(StdLaygoTemplate):
                 in_tidx = (in_tidx2 + 1) / 4
         out_loc = tr_manager.place_wires(hm_layer, ['out'])[1][0]
         if pout_tidx is None:
-            pout_tidx = self.get_track_index(1, 'gb', out_loc)
+            pout_tidx = tr_table.get_index(1, 'gb', out_loc)
         if nout_tidx is None:
-            nout_tidx = self.get_track_index(0, 'gb', out_loc)
+            nout_tidx = tr_table.get_index(0, 'gb', out_loc)
 
         # connect wires
         in_warr_list = [pin, nin]
@@ -362,16 +413,7 @@ class InverterTristate(StdLaygoTemplate):
         self.add_pin('nout', nout_warr, label='out', show=False)
 
         # set properties
-        self._sch_params = dict(
-            lch=config['lch'],
-            wp=wp,
-            wn=wn,
-            thp=config['thp'],
-            thn=config['thn'],
-            segp=pseg,
-            segn=seg,
-            pmos_switch=pmos_switch,
-        )
+        self._sch_params = self.compute_sch_params(self.params)
 
 
 class InvChain(StdLaygoTemplate):
@@ -424,6 +466,7 @@ class InvChain(StdLaygoTemplate):
             sig_locs='Signal track location dictionary.',
             row_layout_info='Row layout information dictionary.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -436,33 +479,53 @@ class InvChain(StdLaygoTemplate):
             sig_locs=None,
             row_layout_info=None,
             show_pins=True,
+            skeleton=False,
         )
 
-    def get_layout_basename(self):
-        seg_list = self.params['seg_list']
-        return 'inv_chain_n%d_%dx' % (len(seg_list), seg_list[-1])
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        return dict(
+            num_cols=cls.compute_num_cols(params['seg_list'],
+                                          stack_list=params.get('stack_list', None)),
+            num_rows=1,
+        )
 
-    def draw_layout(self):
-        config = self.params['config']
-        seg_list = self.params['seg_list']
-        stack_list = self.params['stack_list']
-        tr_widths = self.params['tr_widths']
-        tr_spaces = self.params['tr_spaces']
-        wp_list = self.params['wp_list']
-        wn_list = self.params['wn_list']
-        sig_locs = self.params['sig_locs']
-        row_layout_info = self.params['row_layout_info']
-        show_pins = self.params['show_pins']
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        seg_list = params['seg_list']
+        wp_list, wn_list, stack_list = cls._get_device_lists(config, seg_list,
+                                                             params.get('wp_list', None),
+                                                             params.get('wn_list', None),
+                                                             params.get('stack_list', None))
+        return dict(
+            lch=config['lch'],
+            thp=config['thp'],
+            thn=config['thn'],
+            segp_list=seg_list,
+            segn_list=seg_list,
+            wp_list=wp_list,
+            wn_list=wn_list,
+            stack_list=stack_list,
+        )
+
+    @classmethod
+    def _get_device_lists(cls, config, seg_list, wp_list, wn_list, stack_list):
+        # type: (Dict[str, Any], List[int], Any, Any, Any) -> Tuple[List, List, List]
+        """Returns the transistor width and stack lists, with None replaced by the defaults.
 
+        Raises a ValueError for lists of the wrong length, or an unsupported number of
+        inverters.
+        """
         ninv = len(seg_list)
-        wp_row = config['wp']
-        wn_row = config['wn']
         if wp_list is None:
-            wp_list = [wp_row] * ninv
+            wp_list = [config['wp']] * ninv
         elif len(wp_list) != ninv:
             raise ValueError('length of wp_list != %d' % ninv)
         if wn_list is None:
-            wn_list = [wn_row] * ninv
+            wn_list = [config['wn']] * ninv
         elif len(wn_list) != ninv:
             raise ValueError('length of wn_list != %d' % ninv)
         if stack_list is None:
@@ -473,13 +536,34 @@ class InvChain(StdLaygoTemplate):
         # TODO: remove restriction
         if ninv != 2:
             raise ValueError('Now only 2 inverters are supported.')
+        return wp_list, wn_list, stack_list
+
+    def get_layout_basename(self):
+        seg_list = self.params['seg_list']
+        return 'inv_chain_n%d_%dx' % (len(seg_list), seg_list[-1])
+
+    def draw_layout(self):
+        config = self.params['config']
+        seg_list = self.params['seg_list']
+        stack_list = self.params['stack_list']
+        tr_widths = self.params['tr_widths']
+        tr_spaces = self.params['tr_spaces']
+        wp_list = self.params['wp_list']
+        wn_list = self.params['wn_list']
+        sig_locs = self.params['sig_locs']
+        row_layout_info = self.params['row_layout_info']
+        show_pins = self.params['show_pins']
+
+        wp_list, wn_list, stack_list = self._get_device_lists(config, seg_list, wp_list, wn_list,
+                                                              stack_list)
 
         seg_in, seg_out = seg_list
         stack_in, stack_out = stack_list
         seg_tot = self.compute_num_cols(seg_list, stack_list=stack_list)
         vss_tid, vdd_tid = self.setup_floorplan(config, row_layout_info, seg_tot)
 
-        tr_manager = TrackManager(self.grid, tr_widths, tr_spaces, half_space=True)
+        tr_manager = get_track_manager(self.grid, tr_widths, tr_spaces)
+        tr_table = self.get_track_table()
 
         if sig_locs is None:
             sig_locs = {}
@@ -492,12 +576,12 @@ class InvChain(StdLaygoTemplate):
         vm_w_d = tr_manager.get_width(vm_layer, 'out')
         g_locs = tr_manager.place_wires(hm_layer, ['in', 'in'])[1]
         d_locs = tr_manager.place_wires(hm_layer, ['out', 'out'])[1]
-        ng0_tid = self.make_track_id(0, 'g', g_locs[0], width=hm_w_g)
-        pg0_tid = self.make_track_id(1, 'g', g_locs[0], width=hm_w_g)
-        nd0_tid = self.make_track_id(0, 'gb', d_locs[0], width=hm_w_d)
-        nd1_tid = self.make_track_id(0, 'gb', d_locs[1], width=hm_w_d)
-        pd0_tid = self.make_track_id(1, 'gb', d_locs[0], width=hm_w_d)
-        pd1_tid = self.make_track_id(1, 'gb', d_locs[1], width=hm_w_d)
+        ng0_tid = tr_table.make_track_id(0, 'g', g_locs[0], width=hm_w_g)
+        pg0_tid = tr_table.make_track_id(1, 'g', g_locs[0], width=hm_w_g)
+        nd0_tid = tr_table.make_track_id(0, 'gb', d_locs[0], width=hm_w_d)
+        nd1_tid = tr_table.make_track_id(0, 'gb', d_locs[1], width=hm_w_d)
+        pd0_tid = tr_table.make_track_id(1, 'gb', d_locs[0], width=hm_w_d)
+        pd1_tid = tr_table.make_track_id(1, 'gb', d_locs[1], width=hm_w_d)
 
         if 'mid' in sig_locs:
             mid_tid = TrackID(hm_layer, sig_locs['mid'])
@@ -560,16 +644,7 @@ class InvChain(StdLaygoTemplate):
         self.add_pin('VDD', vdd_warr, show=show_pins)
 
         # set properties
-        self._sch_params = dict(
-            lch=config['lch'],
-            thp=config['thp'],
-            thn=config['thn'],
-            segp_list=seg_list,
-            segn_list=seg_list,
-            wp_list=wp_list,
-            wn_list=wn_list,
-            stack_list=stack_list,
-        )
+        self._sch_params = self.compute_sch_params(self.params)
         self._mid_tidx = mid_tidx
 
     @classmethod
@@ -3,10 +3,11 @@
 
 """This module contains layout generator for various kinds of flip-flops."""
 
-from typing import TYPE_CHECKING, Dict, Any, Set
+from typing import TYPE_CHECKING, Dict, Any, Set, Tuple, Optional
 
-from bag.layout.routing import TrackManager, TrackID
+from bag.layout.routing import TrackID
 
+from ..routing import get_track_manager
 from .core import StdDigitalTemplate
 from .inv import Inverter, InverterTristate
 
@@ -32,6 +33,10 @@ class LatchCK2(StdDigitalTemplate):
         :class:`bag.layout.template.TemplateBase` for details.
     """
 
+    blk_sp = 2
+    in_fanout = 4
+    fb_fanout = 8
+
     def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
         # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
         StdDigitalTemplate.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
@@ -62,6 +67,7 @@ class LatchCK2(StdDigitalTemplate):
             sig_locs='Signal track location dictionary.',
             pass_zero='True to allow a 0 input to pass straight through.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -74,6 +80,65 @@ class LatchCK2(StdDigitalTemplate):
             sig_locs=None,
             pass_zero=False,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def compute_seg(cls, seg):
+        # type: (int) -> Tuple[int, int]
+        """Returns the input and feedback tristate inverter segments.
+
+        Parameters
+        ----------
+        seg : int
+            the output inverter segments.
+
+        Returns
+        -------
+        seg_t0 : int
+            the input tristate inverter segments.
+        seg_t1 : int
+            the feedback tristate inverter segments.
+        """
+        seg_t1 = max(1, int(round(seg / (2 * cls.fb_fanout))) * 2)
+        seg_t0 = max(2 * seg_t1, max(2, int(round(seg / (2 * cls.in_fanout))) * 2))
+        return seg_t0, seg_t1
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        seg = params['seg']
+        seg_t0, seg_t1 = cls.compute_seg(seg)
+        t0_ncol = InverterTristate.get_size_info(dict(seg=seg_t0))['num_cols']
+        t1_ncol = InverterTristate.get_size_info(dict(seg=seg_t1))['num_cols']
+        inv_ncol = Inverter.get_size_info(dict(seg=seg))['num_cols']
+        return dict(
+            num_cols=t0_ncol + t1_ncol + inv_ncol + cls.blk_sp * 2,
+            num_rows=1,
+            seg_t0=seg_t0,
+            seg_t1=seg_t1,
+            seg_in=seg_t0,
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        seg = params['seg']
+        pass_zero = params.get('pass_zero', False)
+        wp, wn = cls.get_row_widths(params)
+        seg_t0, seg_t1 = cls.compute_seg(seg)
+        t0_params = InverterTristate.compute_sch_params(dict(config=config, seg=seg_t0, wp=wp,
+                                                             wn=wn, pmos_switch=not pass_zero))
+        return dict(
+            lch=config['lch'],
+            wp=wp,
+            wn=wn,
+            thp=config['thp'],
+            thn=config['thn'],
+            seg_dict=dict(pinv=seg, ninv=seg, pt0=t0_params['segp'], nt0=seg_t0, pt1=seg_t1,
+                          nt1=seg_t1),
+            pass_zero=pass_zero,
         )
 
     def get_layout_basename(self):
@@ -83,9 +148,7 @@ class LatchCK2(StdDigitalTemplate):
             return 'latch_ck2_%dx' % self.params['seg']
 
     def draw_layout(self):
-        blk_sp = 2
-        in_fanout = 4
-        fb_fanout = 8
+        blk_sp = self.blk_sp
 
         config = self.params['config']
 
@@ -117,28 +180,27 @@ class LatchCK2(StdDigitalTemplate):
         params['show_pins'] = False
         params['sig_locs'] = None
         params['out_vm'] = True
-        if row_layout_info is not None:
-            self.initialize(row_layout_info, 1)
-        else:
-            inv_master = self.new_template(params=params, temp_cls=Inverter)
-            params['row_layout_info'] = row_layout_info = inv_master.row_layout_info
-            self.initialize(row_layout_info, 1)
+        if row_layout_info is None:
+            row_layout_info = self.compute_row_layout_info(config)
+            params['row_layout_info'] = row_layout_info
+        self.initialize(row_layout_info, 1)
 
         # compute track locations
         hm_layer = self.conn_layer + 1
         ym_layer = hm_layer + 1
-        tr_manager = TrackManager(self.grid, tr_widths, tr_spaces, half_space=True)
+        tr_manager = get_track_manager(self.grid, tr_widths, tr_spaces)
+        tr_table = self.get_track_table()
         ym_w_in = tr_manager.get_width(ym_layer, 'in')
         g_locs = tr_manager.place_wires(hm_layer, ['in', 'in'])[1]
         d_locs = tr_manager.place_wires(hm_layer, ['out', 'out'])[1]
-        ng0_tidx = self.get_track_index(0, 'g', g_locs[0])
-        ng1_tidx = self.get_track_index(0, 'g', g_locs[1])
-        pg0_tidx = self.get_track_index(1, 'g', g_locs[0])
-        pg1_tidx = self.get_track_index(1, 'g', g_locs[1])
-        nd0_tidx = self.get_track_index(0, 'gb', d_locs[0])
-        nd1_tidx = self.get_track_index(0, 'gb', d_locs[1])
-        pd0_tidx = self.get_track_index(1, 'gb', d_locs[0])
-        pd1_tidx = self.get_track_index(1, 'gb', d_locs[1])
+        ng0_tidx = tr_table.get_index(0, 'g', g_locs[0])
+        ng1_tidx = tr_table.get_index(0, 'g', g_locs[1])
+        pg0_tidx = tr_table.get_index(1, 'g', g_locs[0])
+        pg1_tidx = tr_table.get_index(1, 'g', g_locs[1])
+        nd0_tidx = tr_table.get_index(0, 'gb', d_locs[0])
+        nd1_tidx = tr_table.get_index(0, 'gb', d_locs[1])
+        pd0_tidx = tr_table.get_index(1, 'gb', d_locs[0])
+        pd1_tidx = tr_table.get_index(1, 'gb', d_locs[1])
 
         t0_in_tidx = sig_locs.get('in', pg1_tidx)
         t0_enb_tidx = sig_locs.get('pclkb', pg0_tidx)
@@ -148,8 +210,7 @@ class LatchCK2(StdDigitalTemplate):
         clkb_tidx = sig_locs.get('clkb', None)
 
         # make masters
-        seg_t1 = max(1, int(round(seg / (2 * fb_fanout))) * 2)
-        seg_t0 = max(2 * seg_t1, max(2, int(round(seg / (2 * in_fanout))) * 2))
+        seg_t0, seg_t1 = self.compute_seg(seg)
         params['sig_locs'] = {'in': t0_en_tidx, 'pout': pd1_tidx, 'nout': nd1_tidx}
         inv_master = self.new_template(params=params, temp_cls=Inverter)
         params['seg'] = seg_t0
@@ -194,17 +255,19 @@ class LatchCK2(StdDigitalTemplate):
         # connect output
         out = inv.get_pin('out')
         in2 = t1.get_pin('in')
-        self.connect_to_track_wires(in2, out)
+        if not self.skeleton:
+            self.connect_to_track_wires(in2, out)
         self.add_pin('out', out, show=show_pins)
         self.add_pin('out_hm', in2, label='out', show=show_pins)
 
         # connect middle node
         lay_info = self.laygo_info
-        col = inv_col - blk_sp // 2
-        ym_tid = TrackID(ym_layer, lay_info.col_to_track(ym_layer, col), width=ym_w_in)
-        warrs = [t0.get_pin('pout'), t0.get_pin('nout'), t1.get_pin('pout'), t1.get_pin('nout'),
-                 inv.get_pin('in')]
-        self.connect_to_tracks(warrs, ym_tid)
+        if not self.skeleton:
+            col = inv_col - blk_sp // 2
+            ym_tid = TrackID(ym_layer, lay_info.col_to_track(ym_layer, col), width=ym_w_in)
+            warrs = [t0.get_pin('pout'), t0.get_pin('nout'), t1.get_pin('pout'),
+                     t1.get_pin('nout'), inv.get_pin('in')]
+            self.connect_to_tracks(warrs, ym_tid)
 
         # connect clocks
         clk_col = t1_col + 1
@@ -234,16 +297,7 @@ class LatchCK2(StdDigitalTemplate):
         self.add_pin('nclkb', t1_en, label='clkb', show=False)
 
         # set properties
-        pseg_t0 = t0_master.sch_params['segp']
-        self._sch_params = dict(
-            lch=config['lch'],
-            wp=wp,
-            wn=wn,
-            thp=config['thp'],
-            thn=config['thn'],
-            seg_dict=dict(pinv=seg, ninv=seg, pt0=pseg_t0, nt0=seg_t0, pt1=seg_t1, nt1=seg_t1),
-            pass_zero=pass_zero,
-        )
+        self._sch_params = self.compute_sch_params(self.params)
         self._seg_in = seg_t0
 
 
@@ -265,6 +319,9 @@ class DFlipFlopCK2(StdDigitalTemplate):
         :class:`bag.layout.template.TemplateBase` for details.
     """
 
+    blk_sp = 2
+    fanout = 4
+
     def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
         # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
         StdDigitalTemplate.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
@@ -295,6 +352,7 @@ class DFlipFlopCK2(StdDigitalTemplate):
             sig_locs='Signal track location dictionary.',
             pass_zero='True to allow a 0 input to pass straight through.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -307,6 +365,60 @@ class DFlipFlopCK2(StdDigitalTemplate):
             sig_locs=None,
             pass_zero=False,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def compute_seg(cls, seg):
+        # type: (int) -> int
+        """Returns the master latch segments.
+
+        Parameters
+        ----------
+        seg : int
+            the slave latch segments.
+
+        Returns
+        -------
+        seg_m : int
+            the master latch segments.
+        """
+        seg_in = LatchCK2.compute_seg(seg)[0]
+        return max(2, int(round(seg_in / (2 * cls.fanout))) * 2)
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        seg = params['seg']
+        seg_m = cls.compute_seg(seg)
+        m_info = LatchCK2.get_size_info(dict(seg=seg_m))
+        s_info = LatchCK2.get_size_info(dict(seg=seg))
+        return dict(
+            num_cols=m_info['num_cols'] + s_info['num_cols'] + cls.blk_sp,
+            num_rows=1,
+            seg_m=seg_m,
+            seg_in=m_info['seg_in'],
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        seg = params['seg']
+        pass_zero = params.get('pass_zero', False)
+        wp, wn = cls.get_row_widths(params)
+        latch_params = dict(config=config, wp=wp, wn=wn, pass_zero=pass_zero)
+        m_params = LatchCK2.compute_sch_params(dict(latch_params, seg=cls.compute_seg(seg)))
+        s_params = LatchCK2.compute_sch_params(dict(latch_params, seg=seg))
+        return dict(
+            lch=config['lch'],
+            wp=wp,
+            wn=wn,
+            thp=config['thp'],
+            thn=config['thn'],
+            seg_m=m_params['seg_dict'],
+            seg_s=s_params['seg_dict'],
+            pass_zero=pass_zero,
         )
 
     def get_layout_basename(self):
@@ -316,8 +428,7 @@ class DFlipFlopCK2(StdDigitalTemplate):
             return 'dff_ck2_%dx' % self.params['seg']
 
     def draw_layout(self):
-        blk_sp = 2
-        fanout = 4
+        blk_sp = self.blk_sp
 
         config = self.params['config']
         tr_widths = self.params['tr_widths']
@@ -346,21 +457,20 @@ class DFlipFlopCK2(StdDigitalTemplate):
         params['wn'] = wn
         params['show_pins'] = False
         params['sig_locs'] = None
-        if row_layout_info is not None:
-            self.initialize(row_layout_info, 1)
-        else:
-            m_master = self.new_template(params=params, temp_cls=LatchCK2)
-            params['row_layout_info'] = row_layout_info = m_master.row_layout_info
-            self.initialize(row_layout_info, 1)
+        if row_layout_info is None:
+            row_layout_info = self.compute_row_layout_info(config)
+            params['row_layout_info'] = row_layout_info
+        self.initialize(row_layout_info, 1)
 
         # compute track locations
         hm_layer = self.conn_layer + 1
-        tr_manager = TrackManager(self.grid, tr_widths, tr_spaces, half_space=True)
+        tr_manager = get_track_manager(self.grid, tr_widths, tr_spaces)
+        tr_table = self.get_track_table()
         g_locs = tr_manager.place_wires(hm_layer, ['in', 'in'])[1]
-        ng0_tidx = self.get_track_index(0, 'g', g_locs[0])
-        ng1_tidx = self.get_track_index(0, 'g', g_locs[1])
-        pg0_tidx = self.get_track_index(1, 'g', g_locs[0])
-        pg1_tidx = self.get_track_index(1, 'g', g_locs[1])
+        ng0_tidx = tr_table.get_index(0, 'g', g_locs[0])
+        ng1_tidx = tr_table.get_index(0, 'g', g_locs[1])
+        pg0_tidx = tr_table.get_index(1, 'g', g_locs[0])
+        pg1_tidx = tr_table.get_index(1, 'g', g_locs[1])
 
         in_tidx = sig_locs.get('in', pg0_tidx)
         pclkb_tidx = sig_locs.get('pclkb', pg1_tidx)
@@ -368,7 +478,7 @@ class DFlipFlopCK2(StdDigitalTemplate):
         # make masters
         params['sig_locs'] = {'nclk': ng1_tidx, 'nclkb': ng0_tidx}
         s_master = self.new_template(params=params, temp_cls=LatchCK2)
-        seg_m = max(2, int(round(s_master.seg_in / (2 * fanout))) * 2)
+        seg_m = self.compute_seg(self.params['seg'])
         params['seg'] = seg_m
         params['sig_locs'] = {'in': in_tidx, 'pclkb': pclkb_tidx,
                               'clkb': sig_locs.get('clk', None),
@@ -396,14 +506,15 @@ class DFlipFlopCK2(StdDigitalTemplate):
         self.add_pin('VSS', self.connect_wires(vss_list), show=show_pins)
         self.add_pin('VDD', self.connect_wires(vdd_list), show=show_pins)
 
-        # connect intermediate node
-        self.connect_wires([s_inst.get_pin('in'), m_inst.get_pin('out_hm')])
-        # connect clocks
-        self.connect_wires([s_inst.get_pin('nclk'), m_inst.get_pin('nclkb')])
-        if pass_zero:
-            self.connect_to_track_wires(s_inst.get_pin('clkb'), m_inst.get_pin('pclk'))
-        else:
-            self.connect_wires([s_inst.get_pin('pclkb'), m_inst.get_pin('pclk')])
+        if not self.skeleton:
+            # connect intermediate node
+            self.connect_wires([s_inst.get_pin('in'), m_inst.get_pin('out_hm')])
+            # connect clocks
+            self.connect_wires([s_inst.get_pin('nclk'), m_inst.get_pin('nclkb')])
+            if pass_zero:
+                self.connect_to_track_wires(s_inst.get_pin('clkb'), m_inst.get_pin('pclk'))
+            else:
+                self.connect_wires([s_inst.get_pin('pclkb'), m_inst.get_pin('pclk')])
         # add pins
         self.add_pin('in', m_inst.get_pin('in'), show=show_pins)
         self.add_pin('out', s_inst.get_pin('out'), show=show_pins)
@@ -414,14 +525,5 @@ class DFlipFlopCK2(StdDigitalTemplate):
         self.add_pin('clk_hm', m_inst.get_pin('nclkb'), label='clk', show=show_pins)
 
         # set properties
-        self._sch_params = dict(
-            lch=config['lch'],
-            wp=wp,
-            wn=wn,
-            thp=config['thp'],
-            thn=config['thn'],
-            seg_m=m_master.sch_params['seg_dict'],
-            seg_s=s_master.sch_params['seg_dict'],
-            pass_zero=pass_zero,
-        )
+        self._sch_params = self.compute_sch_params(self.params)
         self._seg_in = m_master.seg_in
@@ -2,10 +2,11 @@
 
 """This module contains layout generator for various kinds of muxes."""
 
-from typing import TYPE_CHECKING, Dict, Any, Set
+from typing import TYPE_CHECKING, Dict, Any, Set, Tuple, Optional
 
-from bag.layout.routing import TrackManager, TrackID
+from bag.layout.routing import TrackID
 
+from ..routing import get_track_manager
 from .core import StdLaygoTemplate, StdDigitalTemplate
 from .inv import Inverter, InverterTristate
 
@@ -53,6 +54,7 @@ class Passgate(StdLaygoTemplate):
             wn='nmos width.',
             row_layout_info='Row layout information dictionary.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -63,6 +65,31 @@ class Passgate(StdLaygoTemplate):
             wn=None,
             row_layout_info=None,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        return dict(
+            num_cols=params['seg'],
+            num_rows=1,
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        seg = params['seg']
+        wp, wn = cls.get_row_widths(params)
+        return dict(
+            lch=config['lch'],
+            wp=wp,
+            wn=wn,
+            thp=config['thp'],
+            thn=config['thn'],
+            segp=seg,
+            segn=seg,
         )
 
     def get_layout_basename(self):
@@ -91,17 +118,18 @@ class Passgate(StdLaygoTemplate):
 
         vss_tid, vdd_tid = self.setup_floorplan(config, row_layout_info, seg)
 
-        tr_manager = TrackManager(self.grid, tr_widths, tr_spaces, half_space=True)
+        tr_manager = get_track_manager(self.grid, tr_widths, tr_spaces)
+        tr_table = self.get_track_table()
 
         # get track information
         hm_layer = self.conn_layer + 1
         vm_layer = hm_layer + 1
         hm_w_out = tr_manager.get_width(hm_layer, 'out')
         vm_w_out = tr_manager.get_width(vm_layer, 'out')
-        pg_tid = self.make_track_id(1, 'g', -1, width=hm_w_out)
-        ng_tid = self.make_track_id(0, 'g', -1, width=hm_w_out)
-        pd_tid = self.make_track_id(1, 'gb', 0, width=hm_w_out)
-        nd_tid = self.make_track_id(0, 'gb', 0, width=hm_w_out)
+        pg_tid = tr_table.make_track_id(1, 'g', -1, width=hm_w_out)
+        ng_tid = tr_table.make_track_id(0, 'g', -1, width=hm_w_out)
+        pd_tid = tr_table.make_track_id(1, 'gb', 0, width=hm_w_out)
+        nd_tid = tr_table.make_track_id(0, 'gb', 0, width=hm_w_out)
         mid_tidx = self.grid.get_middle_track(pg_tid.base_index, ng_tid.base_index)
         mid_tid = TrackID(hm_layer, mid_tidx, width=hm_w_out)
         vm_coord = self.laygo_info.col_to_coord(seg // 2, unit_mode=True)
@@ -137,15 +165,7 @@ class Passgate(StdLaygoTemplate):
         self.add_pin('VDD', vdd, show=show_pins)
 
         # set properties
-        self._sch_params = dict(
-            lch=config['lch'],
-            wp=wp,
-            wn=wn,
-            thp=config['thp'],
-            thn=config['thn'],
-            segp=seg,
-            segn=seg,
-        )
+        self._sch_params = self.compute_sch_params(self.params)
 
 
 class MuxTristate(StdDigitalTemplate):
@@ -166,6 +186,9 @@ class MuxTristate(StdDigitalTemplate):
         :class:`bag.layout.template.TemplateBase` for details.
     """
 
+    blk_sp = 2
+    fanout = 4
+
     def __init__(self, temp_db, lib_name, params, used_names, **kwargs):
         # type: (TemplateDB, str, Dict[str, Any], Set[str], **Any) -> None
         StdDigitalTemplate.__init__(self, temp_db, lib_name, params, used_names, **kwargs)
@@ -195,6 +218,7 @@ class MuxTristate(StdDigitalTemplate):
             row_layout_info='Row layout information dictionary.',
             sig_locs='Signal track location dictionary.',
             show_pins='True to draw pin geometries.',
+            skeleton='True to skip signal routing.',
         )
 
     @classmethod
@@ -206,14 +230,71 @@ class MuxTristate(StdDigitalTemplate):
             row_layout_info=None,
             sig_locs=None,
             show_pins=True,
+            skeleton=False,
+        )
+
+    @classmethod
+    def compute_seg(cls, seg):
+        # type: (int) -> Tuple[int, int]
+        """Returns the tristate inverter and select inverter segments.
+
+        Parameters
+        ----------
+        seg : int
+            the output inverter segments.
+
+        Returns
+        -------
+        seg_in : int
+            the tristate inverter segments.
+        seg_sel : int
+            the select inverter segments.
+        """
+        seg_in = max(1, int(round(seg / (cls.fanout // 2))))
+        seg_sel = max(1, int(round(seg_in // cls.fanout)))
+        return seg_in, seg_sel
+
+    @classmethod
+    def get_size_info(cls, params, sub_columns=None):
+        # type: (Dict[str, Any], Optional[int]) -> Dict[str, Any]
+        seg = params['seg']
+        seg_in, seg_sel = cls.compute_seg(seg)
+        sel_ncol = Inverter.get_size_info(dict(seg=seg_sel))['num_cols']
+        sel_sep = cls.blk_sp + 1 if sel_ncol % 2 == 1 else cls.blk_sp
+        t_ncol = InverterTristate.get_size_info(dict(seg=seg_in))['num_cols']
+        inv_ncol = Inverter.get_size_info(dict(seg=seg))['num_cols']
+        return dict(
+            num_cols=sel_ncol + sel_sep + 2 * t_ncol + inv_ncol + 2 * cls.blk_sp,
+            num_rows=1,
+            seg_in=seg_in,
+            seg_sel=seg_sel,
+        )
+
+    @classmethod
+    def compute_sch_params(cls, params):
+        # type: (Dict[str, Any]) -> Dict[str, Any]
+        config = params['config']
+        seg = params['seg']
+        wp, wn = cls.get_row_widths(params)
+        seg_in, seg_sel = cls.compute_seg(seg)
+        child_params = dict(config=config, wp=wp, wn=wn)
+        t_params = InverterTristate.compute_sch_params(dict(child_params, seg=seg_in))
+        sel_params = Inverter.compute_sch_params(dict(child_params, seg=seg_sel))
+        return dict(
+            lch=config['lch'],
+            wp=wp,
+            wn=wn,
+            thp=config['thp'],
+            thn=config['thn'],
+            seg_dict=dict(pinv=seg, ninv=seg, pt0=t_params['segp'], nt0=t_params['segn'],
+                          psel=sel_params['segp'], nsel=sel_params['segn']),
         )
 
     def get_layout_basename(self):
         return 'mux_inv_%dx' % self.params['seg']
 
     def draw_layout(self):
-        blk_sp = 2
-        fanout = 4
+        blk_sp = self.blk_sp
 
         config = self.params['config']
 
@@ -244,27 +325,26 @@ class MuxTristate(StdDigitalTemplate):
         params['show_pins'] = False
         params['sig_locs'] = None
         params['out_vm'] = True
-        if row_layout_info is not None:
-            self.initialize(row_layout_info, 1)
-        else:
-            inv_master = self.new_template(params=params, temp_cls=Inverter)
-            params['row_layout_info'] = row_layout_info = inv_master.row_layout_info
-            self.initialize(row_layout_info, 1)
+        if row_layout_info is None:
+            row_layout_info = self.compute_row_layout_info(config)
+            params['row_layout_info'] = row_layout_info
+        self.initialize(row_layout_info, 1)
 
         # compute track locations
         hm_layer = self.conn_layer + 1
         ym_layer = hm_layer + 1
-        tr_manager = TrackManager(self.grid, tr_widths, tr_spaces, half_space=True)
+        tr_manager = get_track_manager(self.grid, tr_widths, tr_spaces)
+        tr_table = self.get_track_table()
         g_locs = tr_manager.place_wires(hm_layer, ['in', 'in'])[1]
         d_locs = tr_manager.place_wires(hm_layer, ['out', 'out'])[1]
-        ng0_tidx = self.get_track_index(0, 'g', g_locs[0])
-        ng1_tidx = self.get_track_index(0, 'g', g_locs[1])
-        pg0_tidx = self.get_track_index(1, 'g', g_locs[0])
-        pg1_tidx = self.get_track_index(1, 'g', g_locs[1])
-        nd0_tidx = self.get_track_index(0, 'gb', d_locs[0])
-        nd1_tidx = self.get_track_index(0, 'gb', d_locs[1])
-        pd0_tidx = self.get_track_index(1, 'gb', d_locs[0])
-        pd1_tidx = self.get_track_index(1, 'gb', d_locs[1])
+        ng0_tidx = tr_table.get_index(0, 'g', g_locs[0])
+        ng1_tidx = tr_table.get_index(0, 'g', g_locs[1])
+        pg0_tidx = tr_table.get_index(1, 'g', g_locs[0])
+        pg1_tidx = tr_table.get_index(1, 'g', g_locs[1])
+        nd0_tidx = tr_table.get_index(0, 'gb', d_locs[0])
+        nd1_tidx = tr_table.get_index(0, 'gb', d_locs[1])
+        pd0_tidx = tr_table.get_index(1, 'gb', d_locs[0])
+        pd1_tidx = tr_table.get_index(1, 'gb', d_locs[1])
 
         pen_tidx = sig_locs.get('pen', pg1_tidx)
         nen_tidx = sig_locs.get('nen', ng1_tidx)
@@ -273,8 +353,7 @@ class MuxTristate(StdDigitalTemplate):
         out_vm_tidx = sig_locs.get('out', None)
 
         # make masters
-        seg_in = max(1, int(round(seg / (fanout // 2))))
-        seg_sel = max(1, int(round(seg_in // fanout)))
+        seg_in, seg_sel = self.compute_seg(seg)
         params['sig_locs'] = {'in': pen_tidx, 'pout': pd0_tidx, 'nout': nd0_tidx}
         params['out_vm'] = False
         inv_master = self.new_template(params=params, temp_cls=Inverter)
@@ -333,11 +412,12 @@ class MuxTristate(StdDigitalTemplate):
         self.add_pin('out', out, show=show_pins)
 
         # connect middle node
-        col_idx = inv_col - blk_sp // 2
-        tr_idx = self.laygo_info.col_to_track(ym_layer, col_idx)
-        hm_list = [t0.get_pin('pout'), t0.get_pin('nout'), t1.get_pin('pout'), t1.get_pin('nout'),
-                   inv.get_pin('in')]
-        self.connect_to_tracks(hm_list, TrackID(ym_layer, tr_idx))
+        if not self.skeleton:
+            col_idx = inv_col - blk_sp // 2
+            tr_idx = self.laygo_info.col_to_track(ym_layer, col_idx)
+            hm_list = [t0.get_pin('pout'), t0.get_pin('nout'), t1.get_pin('pout'),
+                       t1.get_pin('nout'), inv.get_pin('in')]
+            self.connect_to_tracks(hm_list, TrackID(ym_layer, tr_idx))
 
         # connect enables
         sel0l = self.extend_wires(t0.get_pin('en'), min_len_mode=0)[0]
@@ -346,7 +426,8 @@ class MuxTristate(StdDigitalTemplate):
         sel1r = self.extend_wires(t1.get_pin('en'), min_len_mode=0)[0]
         self.add_pin('sel1_hm', sel1l, label='sel1', show=False)
 
-        self.connect_to_track_wires(sel.get_pin('out'), sel0l)
+        if not self.skeleton:
+            self.connect_to_track_wires(sel.get_pin('out'), sel0l)
 
         ym_tidx = self.grid.coord_to_nearest_track(ym_layer, sel0l.middle_unit, mode=1,
                                                    half_track=True, unit_mode=True)
@@ -354,26 +435,16 @@ class MuxTristate(StdDigitalTemplate):
         sel0l = self.connect_to_tracks(sel0l, ym_tid, min_len_mode=-1)
         sel1l = self.connect_to_tracks(sel1l, ym_tid, min_len_mode=1)
         self.add_pin('sel1', sel1l, show=show_pins)
-        sel0l = self.connect_to_tracks(sel0l, TrackID(hm_layer, nd0_tidx), min_len_mode=1)
-        sel1l = self.connect_to_tracks(sel1l, TrackID(hm_layer, pd0_tidx), min_len_mode=1)
+        if not self.skeleton:
+            sel0l = self.connect_to_tracks(sel0l, TrackID(hm_layer, nd0_tidx), min_len_mode=1)
+            sel1l = self.connect_to_tracks(sel1l, TrackID(hm_layer, pd0_tidx), min_len_mode=1)
 
-        sel0_tidx = self.grid.find_next_track(ym_layer, sel0r.middle_unit, mode=-1, half_track=True,
-                                              unit_mode=True)
-        sel1_tidx = sel0_tidx + 1
-        self.connect_to_tracks([sel0l, sel0r], TrackID(ym_layer, sel0_tidx))
-        self.connect_to_tracks([sel1l, sel1r], TrackID(ym_layer, sel1_tidx))
+            sel0_tidx = self.grid.find_next_track(ym_layer, sel0r.middle_unit, mode=-1,
+                                                  half_track=True, unit_mode=True)
+            sel1_tidx = sel0_tidx + 1
+            self.connect_to_tracks([sel0l, sel0r], TrackID(ym_layer, sel0_tidx))
+            self.connect_to_tracks([sel1l, sel1r], TrackID(ym_layer, sel1_tidx))
 
         # set properties
-        pseg_t0 = t0_master.sch_params['segp']
-        nseg_t0 = t0_master.sch_params['segn']
-        psel = sel_master.sch_params['segp']
-        nsel = sel_master.sch_params['segn']
-        self._sch_params = dict(
-            lch=config['lch'],
-            wp=wp,
-            wn=wn,
-            thp=config['thp'],
-            thn=config['thn'],
-            seg_dict=dict(pinv=seg, ninv=seg, pt0=pseg_t0, nt0=nseg_t0, psel=psel, nsel=nsel),
-        )
+        self._sch_params = self.compute_sch_params(self.params)
         self._seg_in = seg_in
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains an opt-in tracer of layout master construction.
+
+Set a tracer with :func:`set_tracer` to record a span for every master created by the standard
+cell templates, with the class name, layout base name and cache status, as well as nested
+layout phase spans (floorplan, placement, fill_space, routing and pin export).  Consecutive
+calls of the same phase are merged into one span.  :meth:`Tracer.write` saves the trace in
+Chrome trace event format, which can be opened in ``chrome://tracing`` or Perfetto.
+
+When no tracer is set, instrumented methods only enter a shared do-nothing context manager.
+"""
+
+from typing import Dict, Any, List, Optional
+
+import os
+import json
+import time
+import threading
+
+# the current tracer.
+_tracer = None  # type: Optional[Tracer]
+
+
+def get_tracer():
+    # type: () -> Optional[Tracer]
+    """Returns the current tracer, or None if tracing is disabled."""
+    return _tracer
+
+
+def set_tracer(tracer):
+    # type: (Optional[Tracer]) -> None
+    """Sets the current tracer.  Set to None to disable tracing."""
+    global _tracer
+    _tracer = tracer
+
+
+class _NullContext(object):
+    """A do-nothing context manager, used when tracing is disabled."""
+
+    @property
+    def args(self):
+        # type: () -> Dict[str, Any]
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_null_context = _NullContext()
+
+
+def trace_span(name, cat='', **kwargs):
+    # type: (str, str, **Any) -> Any
+    """Returns a context manager recording a span with the current tracer, if any.
+
+    The returned object has an args dictionary, which may be updated before the span ends.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _null_context
+    return tracer.span(name, cat=cat, args=kwargs)
+
+
+def trace_phase(name):
+    # type: (str) -> Any
+    """Returns a context manager marking a layout phase of the current master, if tracing."""
+    tracer = _tracer
+    if tracer is None:
+        return _null_context
+    return tracer.phase(name)
+
+
+class _Frame(object):
+    """An open span."""
+
+    __slots__ = ('name', 'cat', 'args', 'ts', 'phase', 'phase_ts', 'phase_depth', 'last_phase')
+
+    def __init__(self, name, cat, args, ts):
+        # type: (str, str, Dict[str, Any], float) -> None
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.ts = ts
+        self.phase = None  # type: Optional[str]
+        self.phase_ts = 0.0
+        self.phase_depth = 0
+        self.last_phase = None  # type: Optional[str]
+
+
+class _SpanContext(object):
+    def __init__(self, tracer, name, cat, args):
+        # type: (Tracer, str, str, Dict[str, Any]) -> None
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self.args = args
+        self._frame = None  # type: Optional[_Frame]
+
+    def __enter__(self):
+        self._frame = self._tracer.begin(self._name, cat=self._cat, args=self.args)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self._tracer.end(self._frame)
+        return False
+
+
+class _PhaseContext(object):
+    def __init__(self, tracer, name):
+        # type: (Tracer, str) -> None
+        self._tracer = tracer
+        self._name = name
+        self._frame = None  # type: Optional[_Frame]
+
+    def __enter__(self):
+        self._frame = self._tracer.enter_phase(self._name)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._frame is not None:
+            self._frame.phase_depth -= 1
+        return False
+
+
+class Tracer(object):
+    """Records nested spans in Chrome trace event format.
+
+    Parameters
+    ----------
+    process_name : str
+        the process name shown in the trace viewer.
+    """
+
+    def __init__(self, process_name='layout'):
+        # type: (str) -> None
+        self._events = []  # type: List[Dict[str, Any]]
+        self._stack = []  # type: List[_Frame]
+        self._seen_keys = set()  # type: set
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+        self._tid = threading.get_ident()
+        self._events.append(dict(name='process_name', ph='M', pid=self._pid, tid=self._tid,
+                                 args=dict(name=process_name)))
+
+    @property
+    def events(self):
+        # type: () -> List[Dict[str, Any]]
+        return self._events
+
+    def _now(self):
+        # type: () -> float
+        return (time.perf_counter() - self._t0) * 1.0e6
+
+    def _add_event(self, name, cat, ts, dur, args):
+        # type: (str, str, float, float, Optional[Dict[str, Any]]) -> None
+        event = dict(name=name, cat=cat, ph='X', ts=ts, dur=dur, pid=self._pid, tid=self._tid)
+        if args:
+            event['args'] = args
+        self._events.append(event)
+
+    def _close_phase(self, frame, ts):
+        # type: (_Frame, float) -> None
+        if frame.phase is not None:
+            self._add_event(frame.phase, 'phase', frame.phase_ts, ts - frame.phase_ts, None)
+            frame.last_phase = frame.phase
+            frame.phase = None
+
+    def span(self, name, cat='', args=None):
+        # type: (str, str, Optional[Dict[str, Any]]) -> _SpanContext
+        """Returns a context manager recording a span."""
+        return _SpanContext(self, name, cat, {} if args is None else args)
+
+    def phase(self, name):
+        # type: (str) -> _PhaseContext
+        """Returns a context manager marking a layout phase of the innermost span.
+
+        Phases do not nest; a phase entered while another phase is active is part of the
+        active phase.
+        """
+        return _PhaseContext(self, name)
+
+    def begin(self, name, cat='', args=None):
+        # type: (str, str, Optional[Dict[str, Any]]) -> _Frame
+        """Opens a span.  The open phase of the parent span, if any, is closed."""
+        ts = self._now()
+        if self._stack:
+            self._close_phase(self._stack[-1], ts)
+        frame = _Frame(name, cat, {} if args is None else args, ts)
+        self._stack.append(frame)
+        return frame
+
+    def end(self, frame):
+        # type: (_Frame) -> None
+        """Closes the given span, which must be the innermost open span."""
+        ts = self._now()
+        top = self._stack.pop()
+        if top is not frame:
+            raise ValueError('Span %s is not the innermost open span.' % frame.name)
+        self._close_phase(frame, ts)
+        self._add_event(frame.name, frame.cat, frame.ts, ts - frame.ts, frame.args)
+        if self._stack:
+            # resume the phase the child span was created in.
+            parent = self._stack[-1]
+            if parent.phase_depth > 0 and parent.last_phase is not None:
+                parent.phase = parent.last_phase
+                parent.phase_ts = ts
+
+    def enter_phase(self, name):
+        # type: (str) -> Optional[_Frame]
+        if not self._stack:
+            return None
+        frame = self._stack[-1]
+        if frame.phase_depth == 0 and frame.phase != name:
+            ts = self._now()
+            self._close_phase(frame, ts)
+            frame.phase = name
+            frame.phase_ts = ts
+        frame.phase_depth += 1
+        return frame
+
+    def check_seen(self, key):
+        # type: (Any) -> bool
+        """Returns True if a master with the given key was already traced, then marks it."""
+        if key in self._seen_keys:
+            return True
+        self._seen_keys.add(key)
+        return False
+
+    def to_dict(self):
+        # type: () -> Dict[str, Any]
+        return dict(traceEvents=self._events, displayTimeUnit='ms')
+
+    def write(self, fname):
+        # type: (str) -> None
+        """Writes the trace as a Chrome trace event JSON file."""
+        dir_name = os.path.dirname(fname)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        with open(fname, 'w') as f:
+            json.dump(self.to_dict(), f)
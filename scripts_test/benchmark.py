@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import argparse
+
+from digital_ec import headless
+
+headless.install()
+
+from digital_ec.flow.bench import (load_suite, run_suite, write_results, load_results,
+                                   compare_results)
+from digital_ec.layout.trace import Tracer
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the layout generators.')
+    parser.add_argument('suite', nargs='?', default='specs_test_sample/benchmark.yaml',
+                        help='benchmark suite specification file.')
+    parser.add_argument('-o', '--out-dir', default='bench_results', help='output directory.')
+    parser.add_argument('-c', '--case', action='append', default=None,
+                        help='only run the given case.  May be repeated.')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of timed runs.')
+    parser.add_argument('--no-mem', action='store_true', help='do not record peak memory.')
+    parser.add_argument('-b', '--baseline', default=None,
+                        help='baseline JSON result file to compare against.')
+    parser.add_argument('-t', '--trace', default=None,
+                        help='write a Chrome trace of the first run of each case to this file.')
+    args = parser.parse_args()
+
+    suite_specs = load_suite(args.suite)
+    tracer = None if args.trace is None else Tracer(process_name='benchmark')
+    results = run_suite(suite_specs, case_names=args.case, repeat=args.repeat,
+                        trace_mem=not args.no_mem, log_fun=print, tracer=tracer)
+    if tracer is not None:
+        tracer.write(args.trace)
+        print('trace written to %s' % args.trace)
+    json_fname, csv_fname = write_results(results, args.out_dir)
+    print('results written to %s and %s' % (json_fname, csv_fname))
+
+    if args.baseline is not None:
+        msg_list = compare_results(load_results(args.baseline), results)
+        for msg in msg_list:
+            print('REGRESSION %s' % msg)
+        if msg_list:
+            sys.exit(1)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+
+import yaml
+
+from digital_ec.flow.deps import DependencyGraph
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='List the top cells that must be rebuilt if '
+                                                 'some generators change.')
+    parser.add_argument('deps_file', help='master dependency graph file.')
+    parser.add_argument('-c', '--class', dest='cls_name', default='',
+                        help='changed generator class.')
+    parser.add_argument('-m', '--module', default='', help='changed module or package.')
+    parser.add_argument('-p', '--param', action='append', default=[],
+                        help='only masters with this parameter value, as key=value.  Dotted '
+                             'keys select nested parameters.')
+    args = parser.parse_args()
+
+    params = {}
+    for entry in args.param:
+        key, val = entry.split('=', 1)
+        params[key] = yaml.safe_load(val)
+
+    graph = DependencyGraph.load(args.deps_file)
+    masters = graph.find_masters(cls_name=args.cls_name, module=args.module, params=params)
+    print('%d matching masters: %s' % (len(masters), ' '.join(masters)))
+    for top_name in graph.get_affected_tops(cls_name=args.cls_name, module=args.module,
+                                            params=params):
+        print(top_name)
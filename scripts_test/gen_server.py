@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from bag.core import BagProject
+
+from digital_ec.flow.server import GenerationServer, get_default_socket_path
+from digital_ec.layout.gds import load_layer_map, load_via_map
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a warm layout generation server.')
+    parser.add_argument('-s', '--socket', default=get_default_socket_path(),
+                        help='server socket path.')
+    parser.add_argument('--layer-map', default=None,
+                        help='GDS layer map file.  Defaults to the layer map of the technology.')
+    parser.add_argument('--via-map', default=None,
+                        help='GDS via map file.  Defaults to the via map of the technology.')
+    args = parser.parse_args()
+    lay_map = load_layer_map(args.layer_map) if args.layer_map else None
+    via_map = load_via_map(args.via_map) if args.via_map else None
+
+    print('creating BAG project')
+    bprj = BagProject()
+    server = GenerationServer(bprj, args.socket, log_fun=print, lay_map=lay_map,
+                              via_map=via_map)
+    print('listening on %s' % server.socket_path)
+    server.run()
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from digital_ec.flow.server import GenerationClient, get_default_socket_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a cell on a running generation '
+                                                 'server.')
+    parser.add_argument('spec_file', help='cell specification file.')
+    parser.add_argument('-s', '--socket', default=get_default_socket_path(),
+                        help='server socket path.')
+    parser.add_argument('-m', '--module', default=None, help='generator module name.')
+    parser.add_argument('-c', '--class', dest='cls_name', default=None,
+                        help='generator class name.  Defaults to StdCellWrapper.')
+    parser.add_argument('--gds', default=None, help='write a GDS file instead of OpenAccess.')
+    parser.add_argument('--lef', default=None, help='write a LEF file instead of OpenAccess.')
+    args = parser.parse_args()
+
+    with GenerationClient(args.socket) as client:
+        info = client.generate(spec_file=args.spec_file, module=args.module,
+                               cls_name=args.cls_name, gds_fname=args.gds, lef_fname=args.lef)
+    print('%s/%s (%.3f s): %s' % (info['lib_name'], info['cell_name'], info['total_time'],
+                                  info['sch_params']))
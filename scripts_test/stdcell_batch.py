@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+from bag.core import BagProject
+
+from digital_ec.flow.batch import load_spec_files, generate_batch
+
+
+if __name__ == '__main__':
+    spec_dir = sys.argv[1] if len(sys.argv) > 1 else 'specs_test/stdcell_batch'
+    gds_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    spec_list = load_spec_files(spec_dir)
+
+    local_dict = locals()
+    if 'bprj' not in local_dict:
+        print('creating BAG project')
+        bprj = BagProject()
+
+    else:
+        print('loading BAG project')
+        bprj = local_dict['bprj']
+
+    for info in generate_batch(bprj, spec_list, debug=True, gds_dir=gds_dir):
+        print('%s/%s: %s' % (info['lib_name'], info['cell_name'], info['sch_params']))
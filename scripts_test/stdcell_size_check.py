@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import importlib
+
+from bag.core import BagProject
+
+from digital_ec.flow.batch import load_spec_files, make_grid, make_tdb
+from digital_ec.layout.stdcells.core import check_size_info, check_sch_params
+
+
+def run_check(prj, spec_list):
+    num_err = 0
+    for fname, specs in spec_list:
+        grid = make_grid(prj.tech_info, specs['routing_grid'])
+        temp_db = make_tdb(grid, specs['impl_lib'])
+
+        cls_mod = importlib.import_module(specs['module'])
+        temp_cls = getattr(cls_mod, specs['class'])
+        master = temp_db.new_template(params=specs['params'], temp_cls=temp_cls)
+        try:
+            mismatch = check_size_info(master)
+            sch_mismatch = check_sch_params(master)
+        except NotImplementedError as ex:
+            print('%s: skipped, %s' % (fname, ex))
+            continue
+        if mismatch or sch_mismatch:
+            num_err += 1
+            for key, (est, val) in sorted(mismatch.items()):
+                print('%s: %s estimated = %s, actual = %s' % (fname, key, est, val))
+            for key, (est, val) in sorted(sch_mismatch.items()):
+                print('%s: sch_params %s computed = %s, actual = %s' % (fname, key, est, val))
+        else:
+            print('%s: OK' % fname)
+
+    return num_err
+
+
+if __name__ == '__main__':
+    spec_dir = sys.argv[1] if len(sys.argv) > 1 else 'specs_test/digital_ec/stdcells'
+    block_spec_list = load_spec_files(spec_dir)
+
+    local_dict = locals()
+    if 'bprj' not in local_dict:
+        print('creating BAG project')
+        bprj = BagProject()
+
+    else:
+        print('loading BAG project')
+        bprj = local_dict['bprj']
+
+    run_check(bprj, block_spec_list)
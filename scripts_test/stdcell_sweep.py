@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from bag.core import BagProject
+
+from digital_ec.flow.sweep import load_sweep_file, run_sweep
+from digital_ec.layout.gds import load_layer_map, load_via_map
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate all points of a parameter sweep.')
+    parser.add_argument('sweep_file', nargs='?', default='specs_test_sample/stdcell_sweep.yaml',
+                        help='sweep specification file.')
+    parser.add_argument('-m', '--module', default=None, help='generator module name.')
+    parser.add_argument('-c', '--class', dest='cls_name', default=None,
+                        help='generator class name.  Defaults to StdCellWrapper.')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='number of worker processes.  Use 0 for the number of CPUs.')
+    parser.add_argument('--gds-dir', default=None,
+                        help='write a GDS file to this directory instead of OpenAccess.')
+    parser.add_argument('--layer-map', default=None,
+                        help='GDS layer map file.  Defaults to the layer map of the technology.')
+    parser.add_argument('--via-map', default=None,
+                        help='GDS via map file.  Defaults to the via map of the technology.')
+    parser.add_argument('-t', '--table', default='', help='write the results to this CSV file.')
+    parser.add_argument('--sch-only', action='store_true',
+                        help='only compute schematic parameters, without drawing layouts.')
+    args = parser.parse_args()
+
+    lay_map = load_layer_map(args.layer_map) if args.layer_map else None
+    via_map = load_via_map(args.via_map) if args.via_map else None
+    print('creating BAG project')
+    bprj = BagProject()
+    result_list = run_sweep(bprj, load_sweep_file(args.sweep_file), module=args.module,
+                            cls_name=args.cls_name, num_workers=args.workers or None,
+                            gds_dir=args.gds_dir, table_fname=args.table, log_fun=print,
+                            sch_only=args.sch_only, lay_map=lay_map, via_map=via_map)
+    for info in result_list:
+        print('%s: %s cols, %d new masters, %.3f s, %s' %
+              (info['cell_name'], info['num_cols'], info['num_new_masters'], info['gen_time'],
+               info['sweep']))
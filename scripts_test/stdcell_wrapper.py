@@ -6,6 +6,8 @@ import yaml
 from bag.core import BagProject
 from bag.layout import RoutingGrid, TemplateDB
 
+from digital_ec.flow.batch import write_library
+from digital_ec.layout.cache import MasterCache, set_master_cache
 from digital_ec.layout.stdcells.core import StdCellWrapper
 
 
@@ -24,6 +26,10 @@ def make_tdb(prj, target_lib, specs):
 def generate(prj, specs):
     impl_lib = specs['impl_lib']
     impl_cell = specs['impl_cell']
+    cache_dir = specs.get('cache_dir', None)
+
+    if cache_dir is not None:
+        set_master_cache(MasterCache(cache_dir))
 
     temp_db = make_tdb(prj, impl_lib, specs)
     params = specs['params']
@@ -31,7 +37,7 @@ def generate(prj, specs):
     temp = temp_db.new_template(params=params, temp_cls=StdCellWrapper, debug=False)
 
     print('creating layout')
-    temp_db.batch_layout(prj, [temp], [impl_cell])
+    write_library(prj, temp_db, [temp], [impl_cell])
     print('done')
 
 
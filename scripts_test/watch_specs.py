@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+
+from bag.core import BagProject
+
+from digital_ec.flow.watch import SpecWatcher
+from digital_ec.layout.gds import load_layer_map, load_via_map
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regenerate cells when their specification '
+                                                 'files change.')
+    parser.add_argument('spec_files', nargs='+', help='cell specification files.')
+    parser.add_argument('-m', '--module', default=None, help='generator module name.')
+    parser.add_argument('-c', '--class', dest='cls_name', default=None,
+                        help='generator class name.  Defaults to StdCellWrapper.')
+    parser.add_argument('--gds-dir', default=None,
+                        help='write GDS files to this directory instead of OpenAccess.')
+    parser.add_argument('--layer-map', default=None,
+                        help='GDS layer map file.  Defaults to the layer map of the technology.')
+    parser.add_argument('--via-map', default=None,
+                        help='GDS via map file.  Defaults to the via map of the technology.')
+    parser.add_argument('-i', '--interval', type=float, default=0.5,
+                        help='polling interval, in seconds.')
+    args = parser.parse_args()
+
+    lay_map = load_layer_map(args.layer_map) if args.layer_map else None
+    via_map = load_via_map(args.via_map) if args.via_map else None
+    print('creating BAG project')
+    bprj = BagProject()
+    watcher = SpecWatcher(bprj, args.spec_files, module=args.module, cls_name=args.cls_name,
+                          gds_dir=args.gds_dir, log_fun=print, lay_map=lay_map,
+                          via_map=via_map)
+    print('watching %d specification files' % len(args.spec_files))
+    watcher.run(interval=args.interval)
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+"""Runs the tests on the headless BAG stand-in if BAG is not installed."""
+
+try:
+    import bag
+except ImportError:
+    from digital_ec import headless
+    headless.install()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the GDS record encoders."""
+
+import io
+import struct
+import datetime
+
+import pytest
+
+from digital_ec.layout.gds import _pack_real8, _pack_str, GdsWriter, write_gds
+
+_lay_map = {('M1', 'drawing'): (31, 0), ('M2', 'drawing'): (32, 0)}
+_now = datetime.datetime(2020, 1, 2, 3, 4, 5)
+
+
+def _unpack_real8(data):
+    """Decodes a GDS 8-byte real."""
+    val = struct.unpack('>Q', data)[0]
+    sign = -1 if val >> 63 else 1
+    exp = ((val >> 56) & 0x7f) - 64
+    return sign * (val & ((1 << 56) - 1)) / (1 << 56) * 16.0 ** exp
+
+
+def _read_records(data):
+    """Returns the list of (record type, record data) of a GDS stream."""
+    ans = []
+    idx = 0
+    while idx < len(data):
+        size, rec_type = struct.unpack('>HH', data[idx:idx + 4])
+        assert size >= 4 and size % 2 == 0
+        ans.append((rec_type, data[idx + 4:idx + size]))
+        idx += size
+    assert idx == len(data)
+    return ans
+
+
+def _make_content(inst_list=(), rect_list=(), path_list=()):
+    return ('TOP', list(inst_list), list(rect_list), [], [], list(path_list), [], [], [])
+
+
+def _make_inst(nx=1, ny=1, orient='R0'):
+    return dict(cell='SUB', loc=(1.0, 0.5), orient=orient, num_cols=nx, num_rows=ny,
+                sp_cols=2.0, sp_rows=1.0)
+
+
+def _write_content(content):
+    f = io.BytesIO()
+    writer = GdsWriter(f, _lay_map, {}, 0.001, 1.0e-6)
+    writer.write_content(content)
+    return writer, _read_records(f.getvalue())
+
+
+@pytest.mark.parametrize(('val', 'expected'), [
+    (0.0, '0000000000000000'),
+    (1.0, '4110000000000000'),
+    (0.5, '4080000000000000'),
+    (-2.0, 'c120000000000000'),
+    (90.0, '425a000000000000'),
+    (1.0e-3, '3e4189374bc6a7f0'),
+    (1.0e-9, '3944b82fa09b5a54'),
+])
+def test_pack_real8_golden(val, expected):
+    assert _pack_real8(val).hex() == expected
+
+
+@pytest.mark.parametrize('val', [1.0e-6, 0.005, 0.0625, 15.999999, 16.0, 123456.789, -7.25])
+def test_pack_real8_round_trip(val):
+    assert _unpack_real8(_pack_real8(val)) == pytest.approx(val, rel=1.0e-15)
+
+
+def test_pack_str_even_length():
+    assert _pack_str(0x0606, 'ABC') == b'\x00\x08\x06\x06ABC\x00'
+    assert _pack_str(0x0606, 'AB') == b'\x00\x06\x06\x06AB'
+
+
+def test_sref():
+    _, records = _write_content(_make_content([_make_inst(orient='MX')]))
+    types = [rec[0] for rec in records]
+    assert types == [0x0502, 0x0606, 0x0A00, 0x1206, 0x1A01, 0x1003, 0x1100, 0x0700]
+    assert records[4][1] == b'\x80\x00'
+    assert struct.unpack('>2i', records[5][1]) == (1000, 500)
+
+
+def test_sref_angle():
+    _, records = _write_content(_make_content([_make_inst(orient='MYR90')]))
+    rec_table = dict(records)
+    assert rec_table[0x1A01] == b'\x80\x00'
+    assert rec_table[0x1C05] == _pack_real8(270)
+
+
+def test_aref_lattice():
+    writer, records = _write_content(_make_content([_make_inst(nx=3, ny=2)]))
+    assert writer.num_arefs == 1 and writer.num_srefs == 0
+    rec_table = dict(records)
+    assert 0x0A00 not in rec_table and 0x0B00 in rec_table
+    assert struct.unpack('>hh', rec_table[0x1302]) == (3, 2)
+    # origin, one past the last column, and one past the last row.
+    assert struct.unpack('>6i', rec_table[0x1003]) == (1000, 500, 7000, 500, 1000, 2500)
+
+
+def test_rect_array():
+    rect = dict(layer=('M1', 'drawing'), bbox=((0.0, 0.0), (0.1, 0.2)), arr_nx=2, arr_ny=1,
+                arr_spx=0.5, arr_spy=0.0)
+    writer, records = _write_content(_make_content(rect_list=[rect]))
+    assert writer.num_shapes == 2
+    xy_list = [struct.unpack('>10i', data) for rec_type, data in records if rec_type == 0x1003]
+    assert xy_list == [(0, 0, 100, 0, 100, 200, 0, 200, 0, 0),
+                       (500, 0, 600, 0, 600, 200, 500, 200, 500, 0)]
+    assert [data for rec_type, data in records if rec_type == 0x0D02] == [b'\x00\x1f'] * 2
+
+
+def test_path():
+    path = dict(layer=('M2', 'drawing'), points=((0.0, 0.0), (1.0, 0.0), (1.0, 2.0)),
+                width=0.05, end_style='round')
+    _, records = _write_content(_make_content(path_list=[path]))
+    rec_table = dict(records)
+    assert struct.unpack('>h', rec_table[0x2102]) == (1, )
+    assert struct.unpack('>i', rec_table[0x0F03]) == (50, )
+    assert struct.unpack('>6i', rec_table[0x1003]) == (0, 0, 1000, 0, 1000, 2000)
+
+
+def test_write_gds(tmp_path):
+    fname = str(tmp_path / 'test.gds')
+    content_list = [('SUB', [], [], [], [], [], [], [], []), _make_content([_make_inst()])]
+    writer = write_gds(content_list, fname, _lay_map, {}, lib_name='LIB', now=_now)
+    assert writer.num_structures == 2
+    with open(fname, 'rb') as f:
+        records = _read_records(f.read())
+
+    types = [rec[0] for rec in records]
+    assert types[:4] == [0x0002, 0x0102, 0x0206, 0x0305]
+    assert types[-1] == 0x0400
+    assert types.count(0x0502) == types.count(0x0700) == 2
+    assert records[1][1] == struct.pack('>6h', 2020, 1, 2, 3, 4, 5) * 2
+    assert records[3][1] == _pack_real8(0.001) + _pack_real8(1.0e-9)
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""Tests of the OASIS record encoders."""
+
+import io
+import zlib
+
+import pytest
+
+from digital_ec.layout.oasis import (_pack_uint, _pack_sint, _pack_real, _pack_gdelta,
+                                     _pack_repetition, _normalize_array, OasisWriter,
+                                     write_oasis, _magic, _end_size)
+
+_lay_map = {('M1', 'drawing'): (31, 0), ('M2', 'drawing'): (32, 0)}
+
+
+def _read_uint(data, idx):
+    """Returns the unsigned integer at the given index, and the index after it."""
+    val = shift = 0
+    while True:
+        byte = data[idx]
+        idx += 1
+        val |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return val, idx
+
+
+def _make_content(inst_list=(), rect_list=(), path_list=()):
+    return ('TOP', list(inst_list), list(rect_list), [], [], list(path_list), [], [], [])
+
+
+def _make_inst(nx=1, ny=1, spx=2.0, spy=1.0):
+    return dict(cell='SUB', loc=(1.0, 0.5), orient='R0', num_cols=nx, num_rows=ny,
+                sp_cols=spx, sp_rows=spy)
+
+
+def _make_rect(nx=1, ny=1):
+    return dict(layer=('M1', 'drawing'), bbox=((0.0, 0.0), (0.1, 0.2)), arr_nx=nx, arr_ny=ny,
+                arr_spx=0.5, arr_spy=0.4)
+
+
+def _make_path(width=0.05, end_style='truncate'):
+    return dict(layer=('M2', 'drawing'), points=((0.0, 0.0), (1.0, 0.0), (1.0, -2.0)),
+                width=width, end_style=end_style)
+
+
+def _write_records(content, compress=False):
+    f = io.BytesIO()
+    writer = OasisWriter(f, _lay_map, {}, 0.001, 1.0e-6, compress=compress)
+    writer._cell_ids = {'SUB': 0, 'TOP': 1}
+    writer.write_content(content)
+    return writer, f.getvalue()
+
+
+@pytest.mark.parametrize(('val', 'expected'), [
+    (0, b'\x00'),
+    (1, b'\x01'),
+    (127, b'\x7f'),
+    (128, b'\x80\x01'),
+    (300, b'\xac\x02'),
+    (16384, b'\x80\x80\x01'),
+])
+def test_pack_uint(val, expected):
+    assert _pack_uint(val) == expected
+    assert _read_uint(expected, 0) == (val, len(expected))
+
+
+@pytest.mark.parametrize(('val', 'expected'), [
+    (0, b'\x00'),
+    (1, b'\x02'),
+    (-1, b'\x03'),
+    (63, b'\x7e'),
+    (-64, b'\x81\x01'),
+    (64, b'\x80\x01'),
+])
+def test_pack_sint(val, expected):
+    assert _pack_sint(val) == expected
+
+
+def test_pack_real():
+    assert _pack_real(1000.0) == b'\x00\xe8\x07'
+    assert _pack_real(0.5) == b'\x07\x00\x00\x00\x00\x00\x00\xe0\x3f'
+
+
+@pytest.mark.parametrize(('dx', 'dy', 'expected'), [
+    (3, -2, b'\x0d\x05'),
+    (-3, 0, b'\x0f\x00'),
+    (0, 5, b'\x01\x0a'),
+    (100, -100, b'\x91\x03\xc9\x01'),
+])
+def test_pack_gdelta(dx, dy, expected):
+    assert _pack_gdelta(dx, dy) == expected
+
+
+@pytest.mark.parametrize(('args', 'expected'), [
+    ((3, 2, 10, 20), b'\x01\x01\x00\x0a\x14'),
+    ((4, 1, 5, 0), b'\x02\x02\x05'),
+    ((1, 3, 0, 7), b'\x03\x01\x07'),
+    ((2, 1, 200, 0), b'\x02\x00\xc8\x01'),
+])
+def test_pack_repetition(args, expected):
+    assert _pack_repetition(*args) == expected
+
+
+def test_normalize_array():
+    assert _normalize_array(100, 50, 3, 2, -10, 20) == (80, 50, 3, 2, 10, 20)
+    assert _normalize_array(100, 50, 3, 4, 10, -5) == (100, 35, 3, 4, 10, 5)
+    # zero pitch arrays collapse to a single element.
+    assert _normalize_array(100, 50, 3, 2, 0, 20) == (100, 50, 1, 2, 0, 20)
+
+
+def test_placement():
+    writer, data = _write_records(_make_content([_make_inst()]))
+    assert writer.num_placements == 1 and writer.num_repetitions == 0
+    # cell 1, then a placement of cell 0 at (1000, 500).
+    assert data == b'\x0d\x01' + b'\x11\xf0\x00' + _pack_sint(1000) + _pack_sint(500)
+
+
+def test_placement_lattice():
+    writer, data = _write_records(_make_content([_make_inst(nx=3, ny=2, spx=-2.0)]))
+    assert writer.num_repetitions == 1
+    # the origin moves to the last column, so both pitches are positive.
+    assert data == (b'\x0d\x01' + b'\x11\xf8\x00' + _pack_sint(-3000) + _pack_sint(500) +
+                    _pack_repetition(3, 2, 2000, 1000))
+
+
+def test_rect_modal():
+    writer, data = _write_records(_make_content(rect_list=[_make_rect(), _make_rect(nx=2)]))
+    assert writer.num_shapes == 2 and writer.num_repetitions == 1
+    first = b'\x14\x7b\x1f\x00\x64\xc8\x01\x00\x00'
+    # the second rectangle reuses the layer, datatype, width and height.
+    second = b'\x14\x1c\x00\x00' + _pack_repetition(2, 1, 500, 0)
+    assert data == b'\x0d\x01' + first + second
+
+
+def test_path():
+    _, data = _write_records(_make_content(path_list=[_make_path(end_style='extend')]))
+    expected = (b'\x16\xfb\x20\x00' + _pack_uint(25) + b'\x0a' + b'\x04\x02' +
+                _pack_gdelta(1000, 0) + _pack_gdelta(0, -2000) + b'\x00\x00')
+    assert data == b'\x0d\x01' + expected
+
+
+@pytest.mark.parametrize('path', [_make_path(width=0.051), _make_path(end_style='round')])
+def test_path_unsupported(path):
+    with pytest.raises(ValueError):
+        _write_records(_make_content(path_list=[path]))
+
+
+def test_cblock():
+    content = _make_content([_make_inst(nx=3, ny=2)], [_make_rect(), _make_rect(nx=2)],
+                            [_make_path()])
+    _, raw = _write_records(content, compress=False)
+    _, data = _write_records(content, compress=True)
+
+    rec_id, idx = _read_uint(data, 0)
+    assert rec_id == 34
+    comp_type, idx = _read_uint(data, idx)
+    assert comp_type == 0
+    raw_size, idx = _read_uint(data, idx)
+    comp_size, idx = _read_uint(data, idx)
+    assert raw_size == len(raw)
+    assert comp_size == len(data) - idx
+    assert zlib.decompress(data[idx:], -15) == raw
+
+
+def test_write_oasis(tmp_path):
+    fname = str(tmp_path / 'test.oas')
+    content_list = [('SUB', [], [], [], [], [], [], [], []), _make_content([_make_inst()])]
+    writer = write_oasis(content_list, fname, _lay_map, {}, compress=False)
+    assert writer.num_cells == 2
+    with open(fname, 'rb') as f:
+        data = f.read()
+
+    # START with version 1.0, 1000 units per micron, and table offsets at the end.
+    start = _magic + b'\x01\x031.0\x00\xe8\x07\x00' + b'\x00' * 12
+    assert data.startswith(start)
+    names = b'\x03\x03SUB\x03\x03TOP'
+    assert data[len(start):len(start) + len(names)] == names
+
+    # END is padded to 256 bytes, with no validation.
+    end = data[-_end_size:]
+    assert end[0] == 2
+    pad_size, idx = _read_uint(end, 1)
+    assert idx == 3
+    assert end[idx:idx + pad_size] == b'\0' * pad_size
+    assert idx + pad_size == _end_size - 1
+    assert end[-1] == 0